@@ -7,12 +7,16 @@ from alembic import context
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.config import settings  # noqa: E402
 from app.database import Base  # noqa: E402
 import app.models  # noqa: E402, F401 — registers all models with Base
 
 config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
+# MXBCASH_DATABASE_URL (e.g. PostgreSQL) overrides the SQLite URL in alembic.ini
+if settings.database_url:
+    config.set_main_option("sqlalchemy.url", settings.database_url.replace("%", "%%"))
 
 target_metadata = Base.metadata
 
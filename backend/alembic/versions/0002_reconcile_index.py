@@ -0,0 +1,27 @@
+"""Index splits for reconciliation balances
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_splits_account_reconciled",
+        "splits",
+        ["account_id", "reconciled", "quantity_minor"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_splits_account_reconciled", table_name="splits")
@@ -0,0 +1,48 @@
+"""Scheduled transaction templates
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "scheduled_transactions",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(128), nullable=False),
+        sa.Column("description", sa.String(256), nullable=False, default=""),
+        sa.Column("notes", sa.String(1024), nullable=True),
+        sa.Column("currency_id", sa.Integer, sa.ForeignKey("commodities.id"), nullable=False),
+        sa.Column("frequency", sa.Enum("DAILY", "WEEKLY", "MONTHLY", "YEARLY", name="frequency"), nullable=False),
+        sa.Column("interval", sa.Integer, nullable=False, default=1),
+        sa.Column("start_date", sa.Date, nullable=False),
+        sa.Column("end_date", sa.Date, nullable=True),
+        sa.Column("enabled", sa.Boolean, nullable=False, default=True),
+        sa.Column("generated_through", sa.Date, nullable=True),
+    )
+
+    op.create_table(
+        "scheduled_splits",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("scheduled_transaction_id", sa.Integer, sa.ForeignKey("scheduled_transactions.id"), nullable=False),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+        sa.Column("value_minor", sa.Integer, nullable=False),
+        sa.Column("quantity_minor", sa.Integer, nullable=False),
+        sa.Column("memo", sa.String(512), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("scheduled_splits")
+    op.drop_table("scheduled_transactions")
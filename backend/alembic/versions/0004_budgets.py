@@ -0,0 +1,40 @@
+"""Budgets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "budgets",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(128), nullable=False),
+        sa.Column("description", sa.String(512), nullable=True),
+    )
+
+    op.create_table(
+        "budget_amounts",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("budget_id", sa.Integer, sa.ForeignKey("budgets.id"), nullable=False),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+        sa.Column("period", sa.Date, nullable=False),
+        sa.Column("amount_minor", sa.Integer, nullable=False),
+        sa.UniqueConstraint("budget_id", "account_id", "period", name="uq_budget_amounts_period"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("budget_amounts")
+    op.drop_table("budgets")
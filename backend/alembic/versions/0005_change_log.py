@@ -0,0 +1,33 @@
+"""Change log for incremental sync
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "changes",
+        sa.Column("seq", sa.Integer, primary_key=True),
+        sa.Column("entity", sa.String(32), nullable=False),
+        sa.Column("entity_id", sa.Integer, nullable=False),
+        sa.Column("op", sa.String(8), nullable=False),
+        sa.Column("account_ids", sa.JSON, nullable=True),
+        sa.Column("created_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sqlite_autoincrement=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("changes")
@@ -0,0 +1,55 @@
+"""Period close snapshots
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "period_closes",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("close_date", sa.Date, nullable=False, unique=True),
+        sa.Column("archived", sa.Boolean, nullable=False, default=False),
+        sa.Column("archive_path", sa.String(1024), nullable=True),
+        sa.Column("created_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+
+    op.create_table(
+        "closing_balances",
+        sa.Column("close_id", sa.Integer, sa.ForeignKey("period_closes.id"), primary_key=True),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), primary_key=True),
+        sa.Column("quantity_minor", sa.Integer, nullable=False),
+    )
+
+    op.create_table(
+        "closed_period_aggregates",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("close_id", sa.Integer, sa.ForeignKey("period_closes.id"), nullable=False),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+        sa.Column("period", sa.Date, nullable=False),
+        sa.Column("quantity_minor", sa.Integer, nullable=False),
+    )
+    op.create_index(
+        "ix_closed_period_aggregates_account_period",
+        "closed_period_aggregates",
+        ["account_id", "period"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_closed_period_aggregates_account_period", table_name="closed_period_aggregates")
+    op.drop_table("closed_period_aggregates")
+    op.drop_table("closing_balances")
+    op.drop_table("period_closes")
@@ -0,0 +1,30 @@
+"""Per-month ledger checksums for incremental verification
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_checksums",
+        sa.Column("period", sa.Date, primary_key=True),
+        sa.Column("checksum", sa.String(64), nullable=False),
+        sa.Column("split_count", sa.Integer, nullable=False),
+        sa.Column("verified_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("ledger_checksums")
@@ -0,0 +1,69 @@
+"""Commodity namespaces and investment lots
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("commodities") as batch:
+        batch.add_column(
+            sa.Column("namespace", sa.String(32), nullable=False, server_default="CURRENCY")
+        )
+
+    op.create_table(
+        "lot_accounts",
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), primary_key=True),
+        sa.Column("method", sa.Enum("FIFO", "LIFO", "AVERAGE", name="costmethod"), nullable=False),
+        sa.Column("dirty_from", sa.Date, nullable=True),
+    )
+
+    op.create_table(
+        "lots",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+        sa.Column("split_id", sa.Integer, nullable=False),
+        sa.Column("opened", sa.Date, nullable=False),
+        sa.Column("currency_id", sa.Integer, sa.ForeignKey("commodities.id"), nullable=False),
+        sa.Column("quantity_minor", sa.Integer, nullable=False),
+        sa.Column("cost_minor", sa.Integer, nullable=False),
+        sa.Column("remaining_minor", sa.Integer, nullable=False),
+        sa.Column("remaining_cost_minor", sa.Integer, nullable=False),
+    )
+    op.create_index("ix_lots_account_opened", "lots", ["account_id", "opened"])
+
+    op.create_table(
+        "lot_disposals",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+        sa.Column("lot_id", sa.Integer, sa.ForeignKey("lots.id"), nullable=True),
+        sa.Column("split_id", sa.Integer, nullable=False),
+        sa.Column("date", sa.Date, nullable=False),
+        sa.Column("currency_id", sa.Integer, sa.ForeignKey("commodities.id"), nullable=False),
+        sa.Column("quantity_minor", sa.Integer, nullable=False),
+        sa.Column("cost_minor", sa.Integer, nullable=False),
+        sa.Column("proceeds_minor", sa.Integer, nullable=False),
+        sa.Column("gain_minor", sa.Integer, nullable=False),
+    )
+    op.create_index("ix_lot_disposals_account_date", "lot_disposals", ["account_id", "date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lot_disposals_account_date", table_name="lot_disposals")
+    op.drop_table("lot_disposals")
+    op.drop_index("ix_lots_account_opened", table_name="lots")
+    op.drop_table("lots")
+    op.drop_table("lot_accounts")
+    with op.batch_alter_table("commodities") as batch:
+        batch.drop_column("namespace")
@@ -0,0 +1,27 @@
+"""Index splits by (account, amount) for duplicate detection
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_splits_account_quantity",
+        "splits",
+        ["account_id", "quantity_minor", "transaction_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_splits_account_quantity", table_name="splits")
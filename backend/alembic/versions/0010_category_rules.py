@@ -0,0 +1,35 @@
+"""Auto-categorization rules
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "category_rules",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(128), nullable=False),
+        sa.Column("priority", sa.Integer, nullable=False, server_default="100"),
+        sa.Column("pattern", sa.String(256), nullable=False, server_default=""),
+        sa.Column("min_amount_minor", sa.Integer, nullable=True),
+        sa.Column("max_amount_minor", sa.Integer, nullable=True),
+        sa.Column("source_account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=True),
+        sa.Column("target_account_id", sa.Integer, sa.ForeignKey("accounts.id"), nullable=False),
+        sa.Column("enabled", sa.Boolean, nullable=False, server_default=sa.true()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("category_rules")
@@ -0,0 +1,23 @@
+"""Index splits by transaction for batched split loading
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_splits_transaction", "splits", ["transaction_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_splits_transaction", table_name="splits")
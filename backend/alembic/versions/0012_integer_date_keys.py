@@ -0,0 +1,55 @@
+"""Integer day number and period keys on transactions and splits
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("transactions") as batch:
+        batch.add_column(sa.Column("date_num", sa.Integer, nullable=True))
+        batch.add_column(sa.Column("month_key", sa.Integer, nullable=True))
+        batch.add_column(sa.Column("year_key", sa.Integer, nullable=True))
+    with op.batch_alter_table("splits") as batch:
+        batch.add_column(sa.Column("date_num", sa.Integer, nullable=True))
+        batch.add_column(sa.Column("month_key", sa.Integer, nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        day_number = "(date - DATE '1970-01-01')"
+        year, month = "CAST(EXTRACT(YEAR FROM date) AS INTEGER)", "CAST(EXTRACT(MONTH FROM date) AS INTEGER)"
+    else:
+        day_number = "CAST(julianday(date) - 2440587.5 AS INTEGER)"
+        year, month = "CAST(strftime('%Y', date) AS INTEGER)", "CAST(strftime('%m', date) AS INTEGER)"
+    op.execute(
+        f"UPDATE transactions SET date_num = {day_number}, month_key = {year} * 100 + {month}, year_key = {year}"
+    )
+    op.execute(
+        "UPDATE splits SET "
+        "date_num = (SELECT t.date_num FROM transactions t WHERE t.id = splits.transaction_id), "
+        "month_key = (SELECT t.month_key FROM transactions t WHERE t.id = splits.transaction_id)"
+    )
+    op.create_index(
+        "ix_splits_account_period", "splits", ["account_id", "month_key", "date_num", "quantity_minor"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_splits_account_period", table_name="splits")
+    with op.batch_alter_table("splits") as batch:
+        batch.drop_column("month_key")
+        batch.drop_column("date_num")
+    with op.batch_alter_table("transactions") as batch:
+        batch.drop_column("year_key")
+        batch.drop_column("month_key")
+        batch.drop_column("date_num")
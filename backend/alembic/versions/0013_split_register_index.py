@@ -0,0 +1,25 @@
+"""Index splits by (account, date) for keyset-paginated registers
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_splits_account_date", "splits", ["account_id", "date_num", "transaction_id", "quantity_minor"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_splits_account_date", table_name="splits")
@@ -0,0 +1,23 @@
+"""Index splits by date for split queries that do not name accounts
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0014"
+down_revision: Union[str, None] = "0013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_splits_date", "splits", ["date_num", "transaction_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_splits_date", table_name="splits")
@@ -0,0 +1,30 @@
+"""Months touched by each transaction change, and the change log position of month checksums
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0015"
+down_revision: Union[str, None] = "0014"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("changes") as batch:
+        batch.add_column(sa.Column("months", sa.JSON, nullable=True))
+    with op.batch_alter_table("ledger_checksums") as batch:
+        batch.add_column(sa.Column("change_seq", sa.Integer, nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("ledger_checksums") as batch:
+        batch.drop_column("change_seq")
+    with op.batch_alter_table("changes") as batch:
+        batch.drop_column("months")
@@ -0,0 +1,34 @@
+"""Drop the unread month_key and year_key columns of transactions
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0016"
+down_revision: Union[str, None] = "0015"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("transactions") as batch:
+        batch.drop_column("year_key")
+        batch.drop_column("month_key")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("transactions") as batch:
+        batch.add_column(sa.Column("month_key", sa.Integer, nullable=True))
+        batch.add_column(sa.Column("year_key", sa.Integer, nullable=True))
+
+    if op.get_bind().dialect.name == "postgresql":
+        year, month = "CAST(EXTRACT(YEAR FROM date) AS INTEGER)", "CAST(EXTRACT(MONTH FROM date) AS INTEGER)"
+    else:
+        year, month = "CAST(strftime('%Y', date) AS INTEGER)", "CAST(strftime('%m', date) AS INTEGER)"
+    op.execute(f"UPDATE transactions SET month_key = {year} * 100 + {month}, year_key = {year}")
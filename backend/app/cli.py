@@ -0,0 +1,210 @@
+"""Command-line administration: ``python -m app.cli <command>`` from backend/."""
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from .config import settings
+from .database import SCHEMA_VERSION, BookRegistry, _make_engine, _schema_version
+from .models.integrity import LedgerChecksum
+from .services import backup_service, export_service, integrity_service
+
+
+def _book_path(book: str) -> Path:
+    if book is None:
+        return Path(settings.db_path)
+    return BookRegistry(settings.books_dir, 1, 0).path_for(book)
+
+
+def _book_url(args):
+    """Database URL for check/export, or None when the SQLite file is missing.
+
+    MXBCASH_DATABASE_URL (e.g. PostgreSQL) stands in for the main book; named
+    books are always SQLite files.
+    """
+    if args.book is None and settings.database_url:
+        return settings.database_url
+    path = _book_path(args.book)
+    if not path.is_file():
+        print(f"No database at {path}", file=sys.stderr)
+        return None
+    return f"sqlite:///{path}"
+
+
+def _book_stem(args) -> str:
+    return _book_path(args.book).stem
+
+
+def cmd_backup(args) -> int:
+    path = _book_path(args.book)
+    if not path.is_file():
+        print(f"No database at {path}", file=sys.stderr)
+        return 1
+    eng = _make_engine(f"sqlite:///{path}")
+    try:
+        result = backup_service.backup(
+            eng, args.dir, compress=not args.no_compress, keep=args.keep,
+        )
+    except HTTPException as exc:
+        print(exc.detail, file=sys.stderr)
+        return 1
+    finally:
+        eng.dispose()
+    print(
+        f"{result.name}: {result.db_bytes} bytes in {result.duration_s:.2f}s "
+        f"({result.throughput_mb_s} MB/s, {result.steps} steps), {result.size_bytes} bytes written"
+    )
+    for name in result.pruned:
+        print(f"pruned {name}")
+    return 0
+
+
+def cmd_list(args) -> int:
+    for b in backup_service.list_backups(_book_stem(args), args.dir):
+        print(f"{b.name}\t{b.size_bytes}\t{b.created_at.isoformat()}")
+    return 0
+
+
+def cmd_verify(args) -> int:
+    result = backup_service.verify(Path(args.file))
+    print(f"{result.name}: {result.detail} (schema version {result.schema_version})")
+    return 0 if result.ok else 1
+
+
+def cmd_restore(args) -> int:
+    target = _book_path(args.book)
+    if target.exists() and not args.force:
+        print(f"{target} exists; pass --force to overwrite it", file=sys.stderr)
+        return 1
+    result = backup_service.restore(Path(args.file), target)
+    print(f"Restored {result.name} into {target}")
+    return 0
+
+
+def _unverifiable(eng) -> Optional[str]:
+    """Why a book cannot be verified without migrating it, or None."""
+    with eng.connect() as conn:
+        version = _schema_version(conn)
+        has_checksums = inspect(conn).has_table(LedgerChecksum.__tablename__)
+    if version != SCHEMA_VERSION:
+        return (
+            f"Book schema version {version}, this server expects {SCHEMA_VERSION}; "
+            "open the book with a matching server to migrate it first"
+        )
+    if not has_checksums:
+        return f"Book has no {LedgerChecksum.__tablename__} table; open it with the server to create it"
+    return None
+
+
+def cmd_check(args) -> int:
+    url = _book_url(args)
+    if url is None:
+        return 1
+    eng = _make_engine(url)
+    # Verification must not write the schema, so the book is opened as it is
+    problem = _unverifiable(eng)
+    if problem is not None:
+        print(problem, file=sys.stderr)
+        eng.dispose()
+        return 1
+    db = sessionmaker(bind=eng)()
+    try:
+        report = integrity_service.verify(db, full=args.full)
+    finally:
+        db.close()
+        eng.dispose()
+    for issue in report.issues:
+        print(f"{issue.kind}\t{issue.entity} {issue.entity_id}\t{issue.detail}")
+    print(
+        f"{report.issue_count} issues; {report.months_verified} of {report.months_total} months "
+        f"verified ({report.splits_scanned} splits) in {report.duration_s:.2f}s; root {report.root_checksum}"
+    )
+    return 0 if report.ok else 1
+
+
+def cmd_export(args) -> int:
+    url = _book_url(args)
+    if url is None:
+        return 1
+    export_service.check_request(args.kind, args.format)
+    eng = _make_engine(url)
+    factory = sessionmaker(bind=eng)
+    db = factory()
+    try:
+        f = export_service.make_filter(
+            db, args.from_date, args.to_date, args.account_id, args.subtree, args.changed_since
+        )
+    finally:
+        db.close()
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        for chunk in export_service.export_chunks(factory, args.kind, args.format, f):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+        eng.dispose()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="mxbcash administration")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def with_book(p):
+        p.add_argument("--book", help="named book in books_dir (default: the main database)")
+        return p
+
+    p = with_book(sub.add_parser("backup", help="take an online backup"))
+    p.add_argument("--dir", help=f"backup directory (default: {settings.backup_dir})")
+    p.add_argument("--keep", type=int, default=None, help="backups to retain")
+    p.add_argument("--no-compress", action="store_true", help="write a plain .db file")
+    p.set_defaults(func=cmd_backup)
+
+    p = with_book(sub.add_parser("list", help="list backups, newest first"))
+    p.add_argument("--dir")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("verify", help="integrity-check a backup file")
+    p.add_argument("file")
+    p.set_defaults(func=cmd_verify)
+
+    p = with_book(sub.add_parser("restore", help="restore a verified backup; stop the server first"))
+    p.add_argument("file")
+    p.add_argument("--force", action="store_true", help="overwrite an existing database")
+    p.set_defaults(func=cmd_restore)
+
+    p = with_book(sub.add_parser("check", help="verify ledger integrity"))
+    p.add_argument("--full", action="store_true", help="re-verify unchanged months too")
+    p.set_defaults(func=cmd_check)
+
+    p = with_book(sub.add_parser("export", help="stream the ledger as NDJSON or CSV"))
+    p.add_argument("--kind", default="all", choices=export_service.KINDS)
+    p.add_argument("--format", default="ndjson", choices=export_service.FORMATS)
+    p.add_argument("--from", dest="from_date", type=date.fromisoformat)
+    p.add_argument("--to", dest="to_date", type=date.fromisoformat)
+    p.add_argument("--account-id", type=int)
+    p.add_argument("--subtree", action="store_true", help="include the account's descendants")
+    p.add_argument("--changed-since", type=int, help="change-log seq")
+    p.add_argument("--out", help="output file (default: stdout)")
+    p.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except HTTPException as exc:
+        print(exc.detail, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
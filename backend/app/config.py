@@ -6,8 +6,60 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="MXBCASH_")
 
     db_path: str = str(Path(__file__).parent.parent / "mxbcash.db")
+    # SQLAlchemy URL of the main book, e.g. postgresql+psycopg://user@host/mxbcash;
+    # empty means the SQLite file at db_path. Named books are always SQLite files.
+    database_url: str = ""
+    # Connection pool for server databases (SQLite uses SQLAlchemy's defaults)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
     debug: bool = False
     default_reporting_currency: str = "USD"
 
+    # Multi-book: each book is <books_dir>/<name>.db, selected per request
+    books_dir: str = str(Path(__file__).parent.parent / "books")
+    books_autocreate: bool = False
+    max_open_books: int = 16
+    book_cache_kib: int = 2048  # SQLite page cache per connection
+    book_memory_budget_mb: int = 256
+
+    # Group commit for transaction writes; 0 disables batching
+    group_commit_window_ms: int = 0
+    group_commit_max_batch: int = 64
+
+    # How often the change stream polls for new sequence numbers
+    changes_poll_interval_s: float = 1.0
+
+    # Background report jobs
+    report_job_workers: int = 2
+    report_job_store_mb: int = 64
+    report_job_keep: int = 1000  # finished jobs remembered, newest first
+    report_job_ttl_min: int = 60  # finished jobs are forgotten after this long
+
+    # API responses at least this large are gzip-compressed on the fly
+    gzip_min_bytes: int = 16384
+    # `make build` writes compressed asset variants next to the assets. Set this to
+    # a writable directory to have the server write missing ones there at startup
+    # instead (read-only installs, builds that skipped it); it never writes into app/static
+    static_cache_dir: str = ""
+
+    # Online backups; the interval is in minutes and 0 disables the scheduler
+    backup_dir: str = str(Path(__file__).parent.parent / "backups")
+    backup_interval_min: int = 0
+    backup_keep: int = 24
+    backup_compress: bool = True
+    backup_pages_per_step: int = 1024  # pages copied per step; writers may run between steps
+    backup_step_sleep_ms: int = 5
+
+    # Rows fetched per round trip when the integrity verifier streams splits
+    verify_batch_size: int = 5000
+    # ...and when an export streams the ledger
+    export_batch_size: int = 5000
+
+    # /splits/query rejects filters whose indexed predicates select more splits than this
+    split_query_max_cost: int = 200000
+
+    # Cost basis method for security accounts that have not chosen one: fifo, lifo or average
+    lot_default_method: str = "fifo"
+
 
 settings = Settings()
@@ -1,14 +1,54 @@
-from sqlalchemy import create_engine
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import create_engine, event, extract, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine, make_url
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.schema import CreateColumn
 from .config import settings
 
-DATABASE_URL = f"sqlite:///{settings.db_path}"
+DATABASE_URL = settings.database_url or f"sqlite:///{settings.db_path}"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    echo=settings.debug,
-)
+# Stored in PRAGMA user_version (a one-row table elsewhere); bump with each alembic revision
+SCHEMA_VERSION = 16
+
+BOOK_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Scope key set by BookPathMiddleware for /books/<name>/... requests
+BOOK_SCOPE_KEY = "mxbcash.book"
+BOOK_HEADER = "x-mxbcash-book"
+
+
+def _make_engine(url: str) -> Engine:
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_pre_ping=True,
+            echo=settings.debug,
+        )
+
+    eng = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        echo=settings.debug,
+    )
+
+    @event.listens_for(eng, "connect")
+    def _set_cache_size(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute(f"PRAGMA cache_size = -{settings.book_cache_kib}")
+        cursor.close()
+
+    return eng
+
+
+engine = _make_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -17,8 +57,212 @@ class Base(DeclarativeBase):
     pass
 
 
-def get_db():
-    db = SessionLocal()
+def init_book(eng: Engine) -> None:
+    """Check the schema version, create missing tables and seed an empty book."""
+    from . import models  # noqa: F401 — registers all models with Base
+    from .seed import run_seed
+
+    with eng.connect() as conn:
+        version = _schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Book schema version {version} is newer than this server ({SCHEMA_VERSION})"
+        )
+
+    Base.metadata.create_all(bind=eng)
+    if version < SCHEMA_VERSION:
+        _add_missing_columns(eng)
+        _add_missing_indexes(eng)
+        _backfill_date_keys(eng)
+    db = sessionmaker(autocommit=False, autoflush=False, bind=eng)()
+    try:
+        run_seed(db)
+    finally:
+        db.close()
+
+    if version < SCHEMA_VERSION:
+        with eng.begin() as conn:
+            _set_schema_version(conn, SCHEMA_VERSION)
+
+
+_VERSION_TABLE = "mxbcash_schema_version"
+
+
+def _schema_version(conn: Connection) -> int:
+    if conn.dialect.name == "sqlite":
+        return conn.execute(text("PRAGMA user_version")).scalar() or 0
+    if not inspect(conn).has_table(_VERSION_TABLE):
+        return 0
+    return conn.execute(text(f"SELECT version FROM {_VERSION_TABLE}")).scalar() or 0
+
+
+def _set_schema_version(conn: Connection, version: int) -> None:
+    if conn.dialect.name == "sqlite":
+        conn.execute(text(f"PRAGMA user_version = {version}"))
+        return
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {_VERSION_TABLE} (version INTEGER NOT NULL)"))
+    conn.execute(text(f"DELETE FROM {_VERSION_TABLE}"))
+    conn.execute(text(f"INSERT INTO {_VERSION_TABLE} (version) VALUES (:v)"), {"v": version})
+
+
+def _add_missing_columns(eng: Engine) -> None:
+    """Add columns introduced after a book was created; create_all only adds tables.
+
+    New columns must be nullable or carry a server_default, as in the migrations.
+    """
+    insp = inspect(eng)
+    with eng.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=eng.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def _add_missing_indexes(eng: Engine) -> None:
+    """Create indexes added to tables that already existed; create_all skips them."""
+    with eng.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+def _backfill_date_keys(eng: Engine) -> None:
+    """Fill the integer date columns of rows written before they existed."""
+    from .dialect import day_number
+    from .models.transaction import Transaction, Split
+
+    with eng.begin() as conn:
+        conn.execute(
+            update(Transaction)
+            .where(Transaction.date_num.is_(None))
+            .values(date_num=day_number(Transaction.date))
+        )
+        conn.execute(
+            update(Split)
+            .where(Split.date_num.is_(None))
+            .values(
+                date_num=select(Transaction.date_num).where(Transaction.id == Split.transaction_id)
+                .scalar_subquery(),
+                month_key=select(
+                    extract("year", Transaction.date) * 100 + extract("month", Transaction.date)
+                ).where(Transaction.id == Split.transaction_id).scalar_subquery(),
+            )
+        )
+
+
+class BookRegistry:
+    """Lazily opened per-book engines, closed least-recently-used first.
+
+    The registry is bounded both by the number of open books and by an estimate of
+    their page-cache memory (connections held by the pool x book_cache_kib).
+    """
+
+    def __init__(
+        self,
+        books_dir: str,
+        max_open: int,
+        memory_budget_bytes: int,
+        autocreate: bool = False,
+    ):
+        self.books_dir = Path(books_dir)
+        self.max_open = max_open
+        self.memory_budget_bytes = memory_budget_bytes
+        self.autocreate = autocreate
+        self._open: "OrderedDict[str, sessionmaker]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, name: str) -> Path:
+        if not BOOK_NAME_RE.match(name):
+            raise HTTPException(status_code=400, detail=f"Invalid book name: {name}")
+        return self.books_dir / f"{name}.db"
+
+    def sessionmaker_for(self, name: str) -> sessionmaker:
+        with self._lock:
+            factory = self._open.get(name)
+            if factory is not None:
+                self._open.move_to_end(name)
+                return factory
+
+            path = self.path_for(name)
+            if not path.exists():
+                if not self.autocreate:
+                    raise HTTPException(status_code=404, detail=f"Book not found: {name}")
+                path.parent.mkdir(parents=True, exist_ok=True)
+            eng = _make_engine(f"sqlite:///{path}")
+            try:
+                init_book(eng)
+            except RuntimeError as exc:
+                eng.dispose()
+                raise HTTPException(status_code=409, detail=str(exc))
+
+            factory = sessionmaker(autocommit=False, autoflush=False, bind=eng)
+            self._open[name] = factory
+            self._evict()
+            return factory
+
+    @staticmethod
+    def _estimated_bytes(factory: sessionmaker) -> int:
+        pool = factory.kw["bind"].pool
+        connections = pool.checkedin() + pool.checkedout()
+        return max(connections, 1) * settings.book_cache_kib * 1024
+
+    def memory_estimate(self) -> int:
+        return sum(self._estimated_bytes(f) for f in self._open.values())
+
+    def _evict(self) -> None:
+        # Never evict the most recently opened book
+        while len(self._open) > 1 and (
+            len(self._open) > self.max_open or self.memory_estimate() > self.memory_budget_bytes
+        ):
+            _, factory = self._open.popitem(last=False)
+            factory.kw["bind"].dispose()
+
+    def open_books(self) -> list:
+        return list(self._open)
+
+    def close_all(self) -> None:
+        with self._lock:
+            for factory in self._open.values():
+                factory.kw["bind"].dispose()
+            self._open.clear()
+
+
+books = BookRegistry(
+    settings.books_dir,
+    settings.max_open_books,
+    settings.book_memory_budget_mb * 1024 * 1024,
+    settings.books_autocreate,
+)
+
+
+class BookPathMiddleware:
+    """Route /books/<name>/api/... to /api/... with the book recorded in the scope."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/books/"):
+            _, _, rest = scope["path"].partition("/books/")
+            name, sep, tail = rest.partition("/")
+            if sep:
+                scope = dict(scope)
+                scope[BOOK_SCOPE_KEY] = name
+                scope["path"] = "/" + tail
+                scope["raw_path"] = scope["path"].encode()
+        await self.app(scope, receive, send)
+
+
+def _book_name(request: Request) -> Optional[str]:
+    return request.scope.get(BOOK_SCOPE_KEY) or request.headers.get(BOOK_HEADER)
+
+
+def get_db(request: Request):
+    name = _book_name(request)
+    factory = SessionLocal if name is None else books.sessionmaker_for(name)
+    db = factory()
     try:
         yield db
     finally:
@@ -0,0 +1,95 @@
+"""SQL expressions spelled differently by SQLite and PostgreSQL."""
+from sqlalchemy import Integer, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import func
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.sql.selectable import FromClause
+from sqlalchemy.sql.visitors import InternalTraversal
+
+# Period buckets as strftime formats, the spelling the services use
+PERIOD_FORMATS = {"%Y-%m-%d": "day", "%Y-%m-01": "month", "%Y-01-01": "year"}
+
+
+class period_start(FunctionElement):
+    """First day of the day, month or year containing a date, as 'YYYY-MM-DD' text.
+
+    ``period_start("%Y-%m-01", Transaction.date)`` is ``strftime`` on SQLite and
+    ``to_char(date_trunc(...))`` on PostgreSQL; both sort and compare as strings.
+    """
+    type = String()
+    name = "period_start"
+    inherit_cache = True
+    # The format is rendered into the SQL, so it must be part of the cache key
+    _traverse_internals = FunctionElement._traverse_internals + [("fmt", InternalTraversal.dp_string)]
+
+    def __init__(self, fmt: str, column):
+        if fmt not in PERIOD_FORMATS:
+            raise ValueError(f"Unsupported period format: {fmt}")
+        self.fmt = fmt
+        super().__init__(column)
+
+
+@compiles(period_start)
+def _period_start_default(element, compiler, **kw):
+    (column,) = element.clauses
+    return compiler.process(func.strftime(element.fmt, column), **kw)
+
+
+@compiles(period_start, "postgresql")
+def _period_start_postgresql(element, compiler, **kw):
+    (column,) = element.clauses
+    unit = PERIOD_FORMATS[element.fmt]
+    return f"to_char(date_trunc('{unit}', {compiler.process(column, **kw)}), 'YYYY-MM-DD')"
+
+
+class day_number(FunctionElement):
+    """Days since 1970-01-01 for a date column, matching models.transaction.day_number."""
+    type = Integer()
+    name = "day_number"
+    inherit_cache = True
+
+
+@compiles(day_number)
+def _day_number_default(element, compiler, **kw):
+    (column,) = element.clauses
+    return f"CAST(julianday({compiler.process(column, **kw)}) - 2440587.5 AS INTEGER)"
+
+
+@compiles(day_number, "postgresql")
+def _day_number_postgresql(element, compiler, **kw):
+    (column,) = element.clauses
+    return f"({compiler.process(column, **kw)} - DATE '1970-01-01')"
+
+
+class indexed_by(FromClause):
+    """A table that SQLite reads through one index: ``splits INDEXED BY ix_splits_date``.
+
+    Used as ``select(...).select_from(indexed_by(Split.__table__, index))``; it
+    takes the table's place in that statement's FROM list (as a join does), so
+    the statement's columns are unchanged. Other databases get the plain table.
+    """
+    __visit_name__ = "indexed_by"
+    inherit_cache = True
+    _traverse_internals = [("table", InternalTraversal.dp_clauseelement), ("index", InternalTraversal.dp_string)]
+
+    def __init__(self, table, index: str):
+        self.table = table
+        self.index = index
+
+    @property
+    def _hide_froms(self):
+        return [self.table]
+
+    @property
+    def _from_objects(self):
+        return [self, self.table]
+
+
+@compiles(indexed_by)
+def _indexed_by_default(element, compiler, **kw):
+    return compiler.process(element.table, **kw)
+
+
+@compiles(indexed_by, "sqlite")
+def _indexed_by_sqlite(element, compiler, **kw):
+    return f"{compiler.process(element.table, **kw)} INDEXED BY {element.index}"
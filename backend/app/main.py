@@ -1,32 +1,51 @@
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Request
+from starlette.middleware.gzip import GZipMiddleware
 
-from .database import engine, SessionLocal
+from .database import engine, init_book, books, BookPathMiddleware
 from .models import *  # noqa: F401, F403 — registers all models
 from .routers.commodities import router as commodities_router, prices_router
 from .routers.accounts import router as accounts_router
 from .routers.transactions import router as transactions_router
 from .routers.reports import router as reports_router
-from .seed import run_seed
+from .routers.reconcile import router as reconcile_router
+from .routers.scheduled import router as scheduled_router
+from .routers.budgets import router as budgets_router
+from .routers.changes import router as changes_router
+from .routers.jobs import router as jobs_router
+from .routers.close import router as close_router
+from .routers.admin import router as admin_router
+from .routers.lots import router as lots_router
+from .routers.rules import router as rules_router
+from .routers.batch import router as batch_router
+from .routers.export import router as export_router
+from .routers.splits import router as splits_router
+from .services.job_service import jobs
+from .services.backup_service import scheduler as backup_scheduler
+from .static_files import PrecompressedStaticFiles, IndexHtml, precompress
+from .config import settings
+
+static_dir = Path(__file__).parent / "static"
+static_cache_dir = Path(settings.static_cache_dir) if settings.static_cache_dir else None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    from .database import Base
-    Base.metadata.create_all(bind=engine)
-
-    db = SessionLocal()
-    try:
-        run_seed(db)
-    finally:
-        db.close()
+    # The default book; named books are initialized on first open
+    init_book(engine)
+    # Variants from `make build` are served as they are; the package is never written to
+    if static_dir.exists() and static_cache_dir is not None:
+        precompress(static_dir / "assets", static_cache_dir / "assets")
+    backup_scheduler.start()
 
     yield
 
+    backup_scheduler.stop()
+    jobs.shutdown()
+    books.close_all()
+
 
 app = FastAPI(
     title="mxbcash",
@@ -34,6 +53,10 @@ app = FastAPI(
     version="0.1.0",
     lifespan=lifespan,
 )
+app.add_middleware(BookPathMiddleware)
+# Streaming compression for large API responses; precompressed assets already
+# carry Content-Encoding and pass through untouched
+app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_min_bytes)
 
 # All API routes under /api/v1 using a shared router prefix
 from fastapi import APIRouter
@@ -43,14 +66,29 @@ api_router.include_router(prices_router)
 api_router.include_router(accounts_router)
 api_router.include_router(transactions_router)
 api_router.include_router(reports_router)
+api_router.include_router(reconcile_router)
+api_router.include_router(scheduled_router)
+api_router.include_router(budgets_router)
+api_router.include_router(changes_router)
+api_router.include_router(jobs_router)
+api_router.include_router(close_router)
+api_router.include_router(admin_router)
+api_router.include_router(lots_router)
+api_router.include_router(rules_router)
+api_router.include_router(batch_router)
+api_router.include_router(export_router)
+api_router.include_router(splits_router)
 
 app.include_router(api_router)
 
 # Serve frontend static files in production
-static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
-    app.mount("/assets", StaticFiles(directory=static_dir / "assets"), name="assets")
+    app.mount("/assets", PrecompressedStaticFiles(
+        directory=static_dir / "assets",
+        variants_dir=static_cache_dir / "assets" if static_cache_dir is not None else None,
+    ), name="assets")
+    index_html = IndexHtml(static_dir / "index.html")
 
     @app.get("/{full_path:path}", include_in_schema=False)
-    async def spa_fallback(full_path: str):
-        return FileResponse(static_dir / "index.html")
+    async def spa_fallback(full_path: str, request: Request):
+        return index_html.response(request)
@@ -1,5 +1,21 @@
 from .commodity import Commodity, Price
 from .account import Account, AccountType
 from .transaction import Transaction, Split
+from .scheduled import ScheduledTransaction, ScheduledSplit, Frequency
+from .budget import Budget, BudgetAmount
+from .change import Change
+from .period_close import PeriodClose, ClosingBalance, ClosedPeriodAggregate
+from .integrity import LedgerChecksum
+from .lot import CostMethod, LotAccount, Lot, LotDisposal
+from .rule import CategoryRule
 
-__all__ = ["Commodity", "Price", "Account", "AccountType", "Transaction", "Split"]
+__all__ = [
+    "Commodity", "Price", "Account", "AccountType", "Transaction", "Split",
+    "ScheduledTransaction", "ScheduledSplit", "Frequency",
+    "Budget", "BudgetAmount",
+    "Change",
+    "PeriodClose", "ClosingBalance", "ClosedPeriodAggregate",
+    "LedgerChecksum",
+    "CostMethod", "LotAccount", "Lot", "LotDisposal",
+    "CategoryRule",
+]
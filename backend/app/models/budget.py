@@ -0,0 +1,31 @@
+from typing import Optional, List
+from sqlalchemy import Integer, String, Date, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from ..database import Base
+
+
+class Budget(Base):
+    __tablename__ = "budgets"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(128), nullable=False)
+    description: Mapped[Optional[str]] = mapped_column(String(512), nullable=True, default="")
+
+    amounts: Mapped[List["BudgetAmount"]] = relationship(
+        "BudgetAmount", back_populates="budget", cascade="all, delete-orphan"
+    )
+
+
+class BudgetAmount(Base):
+    __tablename__ = "budget_amounts"
+    __table_args__ = (
+        UniqueConstraint("budget_id", "account_id", "period", name="uq_budget_amounts_period"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    budget_id: Mapped[int] = mapped_column(Integer, ForeignKey("budgets.id"), nullable=False)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=False)
+    period: Mapped[str] = mapped_column(Date, nullable=False)  # first of month
+    amount_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    budget: Mapped["Budget"] = relationship("Budget", back_populates="amounts")
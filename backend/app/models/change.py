@@ -0,0 +1,21 @@
+from datetime import datetime
+from typing import Optional, List
+from sqlalchemy import Integer, String, DateTime, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column
+from ..database import Base
+
+
+class Change(Base):
+    """Append-only log of writes; seq is the sync cursor handed to clients."""
+    __tablename__ = "changes"
+    # AUTOINCREMENT keeps seq strictly increasing even if rows are ever pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(8), nullable=False)  # "upsert" or "delete"
+    account_ids: Mapped[Optional[List[int]]] = mapped_column(JSON, nullable=True)
+    # First-of-month dates whose splits a transaction change touched; NULL if not known
+    months: Mapped[Optional[List[str]]] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
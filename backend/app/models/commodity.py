@@ -3,6 +3,8 @@ from sqlalchemy import Integer, String, Date, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..database import Base
 
+CURRENCY_NAMESPACE = "CURRENCY"
+
 
 class Commodity(Base):
     __tablename__ = "commodities"
@@ -11,6 +13,10 @@ class Commodity(Base):
     mnemonic: Mapped[str] = mapped_column(String(16), unique=True, nullable=False)
     name: Mapped[str] = mapped_column(String(128), nullable=False)
     fraction: Mapped[int] = mapped_column(Integer, nullable=False, default=100)
+    # "CURRENCY" for money; anything else (an exchange or "FUND") is a security
+    namespace: Mapped[str] = mapped_column(
+        String(32), nullable=False, default=CURRENCY_NAMESPACE, server_default=CURRENCY_NAMESPACE
+    )
 
     accounts: Mapped[List["Account"]] = relationship("Account", back_populates="commodity")  # noqa: F821
     prices_from: Mapped[List["Price"]] = relationship(
@@ -0,0 +1,20 @@
+from datetime import datetime
+from sqlalchemy import Integer, String, Date, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from ..database import Base
+
+
+class LedgerChecksum(Base):
+    """Fingerprint of a month's splits as of its last verification.
+
+    checksum is empty for a month that failed. change_seq is the change log
+    position the stored months reflect; later transaction changes name the
+    months that need fingerprinting again.
+    """
+    __tablename__ = "ledger_checksums"
+
+    period: Mapped[str] = mapped_column(Date, primary_key=True)  # first of month
+    checksum: Mapped[str] = mapped_column(String(64), nullable=False)
+    split_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    verified_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    change_seq: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
@@ -0,0 +1,65 @@
+import enum
+from typing import Optional
+from sqlalchemy import Integer, Date, Enum, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from ..database import Base
+
+
+class CostMethod(str, enum.Enum):
+    FIFO = "fifo"
+    LIFO = "lifo"
+    AVERAGE = "average"
+
+
+class LotAccount(Base):
+    """Lot-matching state of a security account.
+
+    dirty_from is the earliest date whose splits changed since the last
+    computation; NULL means the persisted lots are current.
+    """
+    __tablename__ = "lot_accounts"
+
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    method: Mapped[CostMethod] = mapped_column(Enum(CostMethod), nullable=False, default=CostMethod.FIFO)
+    dirty_from: Mapped[Optional[str]] = mapped_column(Date, nullable=True)
+
+
+class Lot(Base):
+    """Quantity acquired by one split, and what is left of it."""
+    __tablename__ = "lots"
+    __table_args__ = (
+        Index("ix_lots_account_opened", "account_id", "opened"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=False)
+    split_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    opened: Mapped[str] = mapped_column(Date, nullable=False)
+    currency_id: Mapped[int] = mapped_column(Integer, ForeignKey("commodities.id"), nullable=False)
+    quantity_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    cost_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    remaining_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    remaining_cost_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class LotDisposal(Base):
+    """Quantity of a lot matched against a selling split.
+
+    lot_id is NULL for quantity sold beyond the holding (a short sale), which
+    carries zero cost basis.
+    """
+    __tablename__ = "lot_disposals"
+    __table_args__ = (
+        Index("ix_lot_disposals_account_date", "account_id", "date"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=False)
+    lot_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("lots.id"), nullable=True)
+    split_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    date: Mapped[str] = mapped_column(Date, nullable=False)
+    currency_id: Mapped[int] = mapped_column(Integer, ForeignKey("commodities.id"), nullable=False)
+    quantity_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    cost_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    proceeds_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    gain_minor: Mapped[int] = mapped_column(Integer, nullable=False)
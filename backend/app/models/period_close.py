@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Integer, String, Date, DateTime, Boolean, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from ..database import Base
+
+
+class PeriodClose(Base):
+    """Books closed through close_date; later closes must have later dates."""
+    __tablename__ = "period_closes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    close_date: Mapped[str] = mapped_column(Date, nullable=False, unique=True)
+    archived: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    archive_path: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+
+class ClosingBalance(Base):
+    """Cumulative per-account balance (quantity) as of a close date. Immutable."""
+    __tablename__ = "closing_balances"
+
+    close_id: Mapped[int] = mapped_column(Integer, ForeignKey("period_closes.id"), primary_key=True)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    quantity_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class ClosedPeriodAggregate(Base):
+    """Per-account, per-month quantity totals for dates covered by a close. Immutable.
+
+    A month cut by a close date holds only the closed part; the rest of that month
+    is still in the live splits table.
+    """
+    __tablename__ = "closed_period_aggregates"
+    __table_args__ = (
+        Index("ix_closed_period_aggregates_account_period", "account_id", "period"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    close_id: Mapped[int] = mapped_column(Integer, ForeignKey("period_closes.id"), nullable=False)
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=False)
+    period: Mapped[str] = mapped_column(Date, nullable=False)  # first of month
+    quantity_minor: Mapped[int] = mapped_column(Integer, nullable=False)
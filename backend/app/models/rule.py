@@ -0,0 +1,23 @@
+from typing import Optional
+from sqlalchemy import Integer, String, Boolean, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from ..database import Base
+
+
+class CategoryRule(Base):
+    """Moves an uncategorized split to target_account_id when its transaction matches.
+
+    pattern is a case-insensitive substring of the description ("" matches any);
+    the amount bounds and source account apply to the transaction's other split.
+    """
+    __tablename__ = "category_rules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(128), nullable=False)
+    priority: Mapped[int] = mapped_column(Integer, nullable=False, default=100)  # lowest wins
+    pattern: Mapped[str] = mapped_column(String(256), nullable=False, default="")
+    min_amount_minor: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    max_amount_minor: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    source_account_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=True)
+    target_account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=False)
+    enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
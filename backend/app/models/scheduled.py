@@ -0,0 +1,50 @@
+import enum
+from typing import Optional, List
+from sqlalchemy import Integer, String, Date, Boolean, Enum, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from ..database import Base
+
+
+class Frequency(str, enum.Enum):
+    DAILY = "DAILY"
+    WEEKLY = "WEEKLY"
+    MONTHLY = "MONTHLY"
+    YEARLY = "YEARLY"
+
+
+class ScheduledTransaction(Base):
+    __tablename__ = "scheduled_transactions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(128), nullable=False)
+    description: Mapped[str] = mapped_column(String(256), nullable=False, default="")
+    notes: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True, default="")
+    currency_id: Mapped[int] = mapped_column(Integer, ForeignKey("commodities.id"), nullable=False)
+    frequency: Mapped[Frequency] = mapped_column(Enum(Frequency), nullable=False)
+    interval: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    start_date: Mapped[str] = mapped_column(Date, nullable=False)
+    end_date: Mapped[Optional[str]] = mapped_column(Date, nullable=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    # Occurrences on or before this date have already been materialized
+    generated_through: Mapped[Optional[str]] = mapped_column(Date, nullable=True)
+
+    splits: Mapped[List["ScheduledSplit"]] = relationship(
+        "ScheduledSplit", back_populates="scheduled_transaction", cascade="all, delete-orphan"
+    )
+
+
+class ScheduledSplit(Base):
+    __tablename__ = "scheduled_splits"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    scheduled_transaction_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("scheduled_transactions.id"), nullable=False
+    )
+    account_id: Mapped[int] = mapped_column(Integer, ForeignKey("accounts.id"), nullable=False)
+    value_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    quantity_minor: Mapped[int] = mapped_column(Integer, nullable=False)
+    memo: Mapped[Optional[str]] = mapped_column(String(512), nullable=True, default="")
+
+    scheduled_transaction: Mapped["ScheduledTransaction"] = relationship(
+        "ScheduledTransaction", back_populates="splits"
+    )
@@ -1,14 +1,41 @@
-from typing import Optional, List
-from sqlalchemy import Integer, String, Date, ForeignKey
+from datetime import date, timedelta
+from typing import Dict, Optional, List, Union
+from sqlalchemy import Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from ..database import Base
 
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(d: Union[date, str]) -> int:
+    """Days since 1970-01-01, the integer form of a date stored in date_num."""
+    if isinstance(d, str):
+        d = date.fromisoformat(d)
+    return (d - EPOCH).days
+
+
+def from_day_number(n: int) -> date:
+    return EPOCH + timedelta(days=n)
+
+
+def date_keys(d: Union[date, str]) -> Dict[str, int]:
+    """Integer date column for a transaction dated d."""
+    return {"date_num": day_number(d)}
+
+
+def split_date_keys(d: Union[date, str]) -> Dict[str, int]:
+    """Integer date columns for the splits of a transaction dated d; reports group on these."""
+    if isinstance(d, str):
+        d = date.fromisoformat(d)
+    return {"date_num": day_number(d), "month_key": d.year * 100 + d.month}
+
 
 class Transaction(Base):
     __tablename__ = "transactions"
-
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     date: Mapped[str] = mapped_column(Date, nullable=False)
+    # Integer form of date, written with it (see date_keys); splits copy it
+    date_num: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     description: Mapped[str] = mapped_column(String(256), nullable=False, default="")
     notes: Mapped[Optional[str]] = mapped_column(String(1024), nullable=True, default="")
     import_ref: Mapped[Optional[str]] = mapped_column(String(256), nullable=True, unique=True)
@@ -22,6 +49,20 @@ class Transaction(Base):
 
 class Split(Base):
     __tablename__ = "splits"
+    __table_args__ = (
+        # Covering index for cleared/reconciled balance aggregates
+        Index("ix_splits_account_reconciled", "account_id", "reconciled", "quantity_minor"),
+        # Blocking key for duplicate detection: (account, amount) lookups
+        Index("ix_splits_account_quantity", "account_id", "quantity_minor", "transaction_id"),
+        # Batched split loads for a page of transactions
+        Index("ix_splits_transaction", "transaction_id"),
+        # Per-account period aggregates read from the index alone
+        Index("ix_splits_account_period", "account_id", "month_key", "date_num", "quantity_minor"),
+        # Keyset-ordered registers over one or many accounts
+        Index("ix_splits_account_date", "account_id", "date_num", "transaction_id", "quantity_minor"),
+        # Date-range queries that do not name accounts, in keyset order
+        Index("ix_splits_date", "date_num", "transaction_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     transaction_id: Mapped[int] = mapped_column(Integer, ForeignKey("transactions.id"), nullable=False)
@@ -30,6 +71,9 @@ class Split(Base):
     quantity_minor: Mapped[int] = mapped_column(Integer, nullable=False)
     memo: Mapped[Optional[str]] = mapped_column(String(512), nullable=True, default="")
     reconciled: Mapped[str] = mapped_column(String(1), nullable=False, default="n")
+    # The transaction's date_num and YYYYMM month, kept in step with its date
+    date_num: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    month_key: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     transaction: Mapped["Transaction"] = relationship("Transaction", back_populates="splits")
     account: Mapped["Account"] = relationship("Account", back_populates="splits")  # noqa: F821
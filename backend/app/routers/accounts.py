@@ -1,10 +1,13 @@
-from typing import List, Union
-from fastapi import APIRouter, Depends, Query
+from datetime import date
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..schemas.account import AccountCreate, AccountUpdate, AccountRead, AccountTreeNode
-from ..services import account_service
+from ..schemas.account import AccountCreate, AccountUpdate, AccountRead, AccountTreeNode, SubtreeRegisterPage
+from ..schemas.reports import TrialBalance
+from ..services import account_service, refdata_service, report_service
+from ..config import settings
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
@@ -25,6 +28,26 @@ def create_account(data: AccountCreate, db: Session = Depends(get_db)):
     return account_service.create_account(db, data)
 
 
+@router.get("/balances", response_model=TrialBalance)
+def get_balances(
+    ids: List[int] = Query(...),
+    as_of: Optional[date] = Query(None),
+    reporting_currency: str = Query(settings.default_reporting_currency),
+    db: Session = Depends(get_db),
+):
+    """Native and reporting-currency balances of several accounts in one aggregate."""
+    return report_service.get_trial_balance(db, as_of, reporting_currency, ids)
+
+
+@router.get("/by-path", response_model=AccountRead)
+def get_account_by_path(path: str = Query(..., description='full name, e.g. "Expenses:Food:Groceries"'),
+                        db: Session = Depends(get_db)):
+    account = refdata_service.account_by_path(db, path)
+    if account is None:
+        raise HTTPException(status_code=404, detail=f"No account named {path}")
+    return account
+
+
 @router.get("/{account_id}", response_model=AccountRead)
 def get_account(account_id: int, db: Session = Depends(get_db)):
     return account_service.get_account(db, account_id)
@@ -54,9 +77,6 @@ def get_register(
     offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
 ):
-    from ..models.transaction import Transaction
-    from ..models.account import Account
-
     account_service.get_account(db, account_id)  # 404 check
 
     splits_with_balance = account_service.get_register(db, account_id, limit, offset)
@@ -69,7 +89,7 @@ def get_register(
         other_splits = [s for s in txn.splits if s.account_id != account_id]
         transfer_names = []
         for os in other_splits:
-            other_acct = db.get(Account, os.account_id)
+            other_acct = refdata_service.account(db, os.account_id)
             if other_acct:
                 transfer_names.append(other_acct.full_name)
 
@@ -86,3 +106,14 @@ def get_register(
         })
 
     return result
+
+
+@router.get("/{account_id}/subtree-register", response_model=SubtreeRegisterPage)
+def get_subtree_register(
+    account_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+):
+    """Every split under the account and its descendants, merged in date order."""
+    return account_service.get_subtree_register(db, account_id, limit, after)
@@ -0,0 +1,42 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.backup import BackupRead, BackupResult, BackupVerifyResult
+from ..schemas.integrity import IntegrityReport
+from ..schemas.refdata import RefDataStats
+from ..services import backup_service, integrity_service, refdata_service
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/backups", response_model=List[BackupRead])
+def list_backups(db: Session = Depends(get_db)):
+    return backup_service.list_backups(backup_service.book_name(db.get_bind()))
+
+
+@router.post("/backups", response_model=BackupResult, status_code=201)
+def create_backup(
+    compress: bool = Query(None),
+    db: Session = Depends(get_db),
+):
+    return backup_service.backup(db.get_bind(), compress=compress)
+
+
+@router.post("/backups/{name}/verify", response_model=BackupVerifyResult)
+def verify_backup(name: str):
+    return backup_service.verify(backup_service.resolve(name))
+
+
+@router.post("/integrity", response_model=IntegrityReport)
+def verify_integrity(
+    full: bool = Query(False, description="re-verify months whose checksum is unchanged"),
+    db: Session = Depends(get_db),
+):
+    return integrity_service.verify(db, full)
+
+
+@router.get("/refdata-cache", response_model=RefDataStats)
+def refdata_cache_stats(db: Session = Depends(get_db)):
+    return refdata_service.stats(db.get_bind())
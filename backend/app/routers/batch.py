@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.batch import BatchRequest, BatchResult
+from ..services import batch_service
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+
+@router.post("", response_model=BatchResult)
+def run_batch(data: BatchRequest, db: Session = Depends(get_db)):
+    """Run account, transaction and price operations in order, in one transaction."""
+    return batch_service.run_batch(db, data)
@@ -0,0 +1,34 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.budget import BudgetCreate, BudgetRead, BudgetDetail, BudgetAmountSet
+from ..services import budget_service
+
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+
+@router.get("", response_model=List[BudgetRead])
+def list_budgets(db: Session = Depends(get_db)):
+    return budget_service.list_budgets(db)
+
+
+@router.post("", response_model=BudgetDetail, status_code=201)
+def create_budget(data: BudgetCreate, db: Session = Depends(get_db)):
+    return budget_service.create_budget(db, data)
+
+
+@router.get("/{budget_id}", response_model=BudgetDetail)
+def get_budget(budget_id: int, db: Session = Depends(get_db)):
+    return budget_service.get_budget(db, budget_id)
+
+
+@router.put("/{budget_id}/amounts", response_model=BudgetDetail)
+def set_amounts(budget_id: int, amounts: List[BudgetAmountSet], db: Session = Depends(get_db)):
+    return budget_service.set_amounts(db, budget_id, amounts)
+
+
+@router.delete("/{budget_id}", status_code=204)
+def delete_budget(budget_id: int, db: Session = Depends(get_db)):
+    budget_service.delete_budget(db, budget_id)
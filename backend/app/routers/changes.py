@@ -0,0 +1,41 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..database import get_db
+from ..schemas.change import ChangeFeed
+from ..services import change_service
+from ..config import settings
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("", response_model=ChangeFeed)
+def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+):
+    return change_service.list_changes(db, since, limit)
+
+
+@router.get("/stream")
+def stream_changes(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    max_events: Optional[int] = Query(None, ge=1),  # lets long-polling clients stop early
+    last_event_id: Optional[int] = Header(None),
+    db: Session = Depends(get_db),
+):
+    start = since if since is not None else last_event_id
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    if start is None:
+        start = change_service.latest_seq(db)
+    return StreamingResponse(
+        change_service.stream_seqs(
+            factory, start, settings.changes_poll_interval_s, max_events, request.is_disconnected
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
@@ -0,0 +1,19 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.period_close import PeriodCloseCreate, PeriodCloseRead
+from ..services import close_service
+
+router = APIRouter(prefix="/close", tags=["close"])
+
+
+@router.get("", response_model=List[PeriodCloseRead])
+def list_closes(db: Session = Depends(get_db)):
+    return close_service.list_closes(db)
+
+
+@router.post("", response_model=PeriodCloseRead, status_code=201)
+def close_books(data: PeriodCloseCreate, db: Session = Depends(get_db)):
+    return close_service.close_books(db, data.through, data.archive)
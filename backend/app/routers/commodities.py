@@ -1,10 +1,11 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..models.commodity import Commodity, Price
-from ..schemas.commodity import CommodityRead, PriceCreate, PriceRead
+from ..models.commodity import Commodity
+from ..schemas.commodity import CommodityCreate, CommodityRead, PriceCreate, PriceRead
+from ..services import change_service, price_service, refdata_service
 
 router = APIRouter(prefix="/commodities", tags=["commodities"])
 prices_router = APIRouter(prefix="/prices", tags=["prices"])
@@ -15,18 +16,28 @@ def list_commodities(db: Session = Depends(get_db)):
     return db.query(Commodity).order_by(Commodity.mnemonic).all()
 
 
+@router.post("", response_model=CommodityRead, status_code=201)
+def create_commodity(data: CommodityCreate, db: Session = Depends(get_db)):
+    if db.query(Commodity.id).filter(Commodity.mnemonic == data.mnemonic).first() is not None:
+        raise HTTPException(status_code=409, detail=f"Commodity {data.mnemonic} already exists")
+    commodity = Commodity(**data.model_dump())
+    db.add(commodity)
+    db.flush()
+    change_service.record(db, "commodity", commodity.id)
+    refdata_service.touch(db)
+    db.commit()
+    db.refresh(commodity)
+    return commodity
+
+
 @prices_router.get("", response_model=List[PriceRead])
 def list_prices(db: Session = Depends(get_db)):
-    return db.query(Price).order_by(Price.date.desc()).all()
+    return price_service.list_prices(db)
 
 
 @prices_router.post("", response_model=PriceRead, status_code=201)
 def create_price(data: PriceCreate, db: Session = Depends(get_db)):
-    price = Price(**data.model_dump())
-    db.add(price)
-    db.commit()
-    db.refresh(price)
-    return price
+    return price_service.create_price(db, data)
 
 
 @prices_router.get("/latest", response_model=Optional[PriceRead])
@@ -35,13 +46,4 @@ def latest_price(
     to_currency: str = Query(..., alias="to"),
     db: Session = Depends(get_db),
 ):
-    from_c = db.query(Commodity).filter(Commodity.mnemonic == from_currency).first()
-    to_c = db.query(Commodity).filter(Commodity.mnemonic == to_currency).first()
-    if from_c is None or to_c is None:
-        return None
-    return (
-        db.query(Price)
-        .filter(Price.commodity_id == from_c.id, Price.currency_id == to_c.id)
-        .order_by(Price.date.desc())
-        .first()
-    )
+    return price_service.latest_price(db, from_currency, to_currency)
@@ -0,0 +1,35 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..database import get_db
+from ..services import export_service
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("")
+def export(
+    kind: str = Query("all", description="all (NDJSON only), accounts, prices or transactions"),
+    format: str = Query("ndjson", description="ndjson or csv"),
+    from_date: Optional[date] = Query(None),
+    to_date: Optional[date] = Query(None),
+    account_id: Optional[int] = Query(None),
+    subtree: bool = Query(False),
+    changed_since: Optional[int] = Query(None, ge=0, description="change-log seq, as in /changes"),
+    db: Session = Depends(get_db),
+):
+    """Stream the ledger without materializing it; transactions carry all their splits."""
+    export_service.check_request(kind, format)
+    f = export_service.make_filter(db, from_date, to_date, account_id, subtree, changed_since)
+    # The stream outlives the request's session, so it reads through its own
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+    return StreamingResponse(
+        export_service.export_chunks(factory, kind, format, f),
+        media_type=_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="mxbcash-{kind}.{format}"'},
+    )
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.job import ReportJobCreate, JobRead
+from ..services.job_service import jobs
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.post("/reports", response_model=JobRead, status_code=202)
+def submit_report(data: ReportJobCreate, db: Session = Depends(get_db)):
+    db_url = db.get_bind().url.render_as_string(hide_password=False)
+    return jobs.submit(db_url, data.kind, data.params).read()
+
+
+@router.get("/{job_id}", response_model=JobRead)
+def get_job(job_id: str):
+    return jobs.get(job_id).read()
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    return Response(content=jobs.result(job_id), media_type="application/json")
@@ -0,0 +1,61 @@
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.lot import (
+    LotAccountUpdate, LotAccountRead, LotRead, RealizedGainReport, UnrealizedGainReport,
+)
+from ..services import lot_service
+from ..config import settings
+
+router = APIRouter(prefix="/lots", tags=["lots"])
+
+
+@router.get("", response_model=List[LotRead])
+def list_lots(
+    account_id: Optional[int] = Query(None),
+    include_closed: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    return lot_service.list_lots(db, account_id, include_closed)
+
+
+@router.get("/realized", response_model=RealizedGainReport)
+def realized_gains(
+    from_date: date = Query(...),
+    to_date: date = Query(...),
+    group_by: str = Query("month", pattern="^(day|month|year)$"),
+    account_id: Optional[int] = Query(None),
+    reporting_currency: str = Query(settings.default_reporting_currency),
+    db: Session = Depends(get_db),
+):
+    return lot_service.realized_gains(
+        db, from_date.isoformat(), to_date.isoformat(), group_by, reporting_currency, account_id
+    )
+
+
+@router.get("/unrealized", response_model=UnrealizedGainReport)
+def unrealized_gains(
+    as_of: Optional[date] = Query(None),
+    account_id: Optional[int] = Query(None),
+    reporting_currency: str = Query(settings.default_reporting_currency),
+    db: Session = Depends(get_db),
+):
+    return lot_service.unrealized_gains(db, as_of or date.today(), reporting_currency, account_id)
+
+
+@router.get("/accounts/{account_id}", response_model=LotAccountRead)
+def get_lot_account(account_id: int, db: Session = Depends(get_db)):
+    return lot_service.get_state(db, account_id)
+
+
+@router.put("/accounts/{account_id}", response_model=LotAccountRead)
+def set_lot_method(account_id: int, data: LotAccountUpdate, db: Session = Depends(get_db)):
+    return lot_service.set_method(db, account_id, data.method)
+
+
+@router.post("/recompute", response_model=List[LotAccountRead])
+def recompute_lots(account_id: Optional[int] = Query(None), db: Session = Depends(get_db)):
+    return lot_service.recompute(db, account_id)
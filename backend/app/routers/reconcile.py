@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.reconcile import (
+    ReconcileStateUpdate, ReconcileStateResult, ReconcileBalances,
+    StatementMatchRequest, StatementMatchResult,
+)
+from ..services import account_service, reconcile_service
+
+router = APIRouter(prefix="/reconcile", tags=["reconcile"])
+
+
+@router.post("/state", response_model=ReconcileStateResult)
+def set_state(data: ReconcileStateUpdate, db: Session = Depends(get_db)):
+    updated = reconcile_service.set_state(db, data.split_ids, data.state, data.account_id)
+    return ReconcileStateResult(updated=updated, state=data.state)
+
+
+@router.get("/{account_id}/balances", response_model=ReconcileBalances)
+def get_balances(account_id: int, db: Session = Depends(get_db)):
+    account_service.get_account(db, account_id)  # 404 check
+    return reconcile_service.get_balances(db, account_id)
+
+
+@router.post("/{account_id}/match", response_model=StatementMatchResult)
+def match_statement(account_id: int, data: StatementMatchRequest, db: Session = Depends(get_db)):
+    account_service.get_account(db, account_id)  # 404 check
+    return reconcile_service.match_statement(
+        db, account_id, data.lines, data.window_days, data.apply
+    )
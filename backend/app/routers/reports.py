@@ -1,8 +1,12 @@
+from datetime import date
+from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..schemas.reports import PnLReport, BalanceHistory, NetWorthSnapshot
+from ..schemas.reports import (
+    PnLReport, BalanceHistory, NetWorthSnapshot, BudgetVsActualReport, CashFlowReport, TrialBalance,
+)
 from ..services import report_service
 from ..config import settings
 
@@ -11,26 +15,26 @@ router = APIRouter(prefix="/reports", tags=["reports"])
 
 @router.get("/pnl", response_model=PnLReport)
 def get_pnl(
-    from_date: str = Query(...),
-    to_date: str = Query(...),
+    from_date: date = Query(...),
+    to_date: date = Query(...),
     group_by: str = Query("month", pattern="^(day|month|year)$"),
     reporting_currency: str = Query(settings.default_reporting_currency),
     db: Session = Depends(get_db),
 ):
-    return report_service.get_pnl(db, from_date, to_date, group_by, reporting_currency)
+    return report_service.get_pnl(db, from_date.isoformat(), to_date.isoformat(), group_by, reporting_currency)
 
 
 @router.get("/balance-history", response_model=BalanceHistory)
 def get_balance_history(
     account_id: int = Query(...),
-    from_date: str = Query(...),
-    to_date: str = Query(...),
+    from_date: date = Query(...),
+    to_date: date = Query(...),
     group_by: str = Query("month", pattern="^(day|month|year)$"),
     reporting_currency: str = Query(settings.default_reporting_currency),
     db: Session = Depends(get_db),
 ):
     return report_service.get_balance_history(
-        db, account_id, from_date, to_date, group_by, reporting_currency
+        db, account_id, from_date.isoformat(), to_date.isoformat(), group_by, reporting_currency
     )
 
 
@@ -40,3 +44,42 @@ def get_net_worth(
     db: Session = Depends(get_db),
 ):
     return report_service.get_net_worth(db, reporting_currency)
+
+
+@router.get("/trial-balance", response_model=TrialBalance)
+def get_trial_balance(
+    as_of: Optional[date] = Query(None),
+    reporting_currency: str = Query(settings.default_reporting_currency),
+    db: Session = Depends(get_db),
+):
+    return report_service.get_trial_balance(db, as_of, reporting_currency)
+
+
+@router.get("/budget-vs-actual", response_model=BudgetVsActualReport)
+def get_budget_vs_actual(
+    budget_id: int = Query(...),
+    from_date: date = Query(...),
+    to_date: date = Query(...),
+    group_by: str = Query("month", pattern="^(month|year)$"),
+    rollup: bool = Query(False),
+    reporting_currency: str = Query(settings.default_reporting_currency),
+    db: Session = Depends(get_db),
+):
+    return report_service.get_budget_vs_actual(
+        db, budget_id, from_date.isoformat(), to_date.isoformat(), group_by, reporting_currency, rollup
+    )
+
+
+@router.get("/cash-flow", response_model=CashFlowReport)
+def get_cash_flow(
+    account_id: List[int] = Query(...),
+    from_date: date = Query(...),
+    to_date: date = Query(...),
+    subtree: bool = Query(False),
+    group_by: str = Query("month", pattern="^(day|month|year)$"),
+    reporting_currency: str = Query(settings.default_reporting_currency),
+    db: Session = Depends(get_db),
+):
+    return report_service.get_cash_flow(
+        db, account_id, from_date.isoformat(), to_date.isoformat(), group_by, reporting_currency, subtree
+    )
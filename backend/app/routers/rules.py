@@ -0,0 +1,49 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.rule import (
+    CategoryRuleCreate, CategoryRuleRead, RuleApplyRequest, RuleApplyResult,
+    RuleReapplyRequest, RuleReapplyResult,
+)
+from ..services import rule_service
+
+router = APIRouter(prefix="/rules", tags=["rules"])
+
+
+@router.get("", response_model=List[CategoryRuleRead])
+def list_rules(db: Session = Depends(get_db)):
+    return rule_service.list_rules(db)
+
+
+@router.post("", response_model=CategoryRuleRead, status_code=201)
+def create_rule(data: CategoryRuleCreate, db: Session = Depends(get_db)):
+    return rule_service.create_rule(db, data)
+
+
+@router.post("/apply", response_model=RuleApplyResult)
+def apply_rules(data: RuleApplyRequest, db: Session = Depends(get_db)):
+    """Categorize incoming transactions without saving them."""
+    return rule_service.apply_to_incoming(db, data.transactions, data.uncategorized_account_id)
+
+
+@router.post("/reapply", response_model=RuleReapplyResult)
+def reapply_rules(data: RuleReapplyRequest, db: Session = Depends(get_db)):
+    """Re-categorize existing uncategorized splits; dry_run (the default) only returns the diff."""
+    return rule_service.reapply(db, data)
+
+
+@router.get("/{rule_id}", response_model=CategoryRuleRead)
+def get_rule(rule_id: int, db: Session = Depends(get_db)):
+    return rule_service.get_rule(db, rule_id)
+
+
+@router.put("/{rule_id}", response_model=CategoryRuleRead)
+def update_rule(rule_id: int, data: CategoryRuleCreate, db: Session = Depends(get_db)):
+    return rule_service.update_rule(db, rule_id, data)
+
+
+@router.delete("/{rule_id}", status_code=204)
+def delete_rule(rule_id: int, db: Session = Depends(get_db)):
+    rule_service.delete_rule(db, rule_id)
@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Optional, List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.scheduled import (
+    ScheduledTransactionCreate, ScheduledTransactionRead, ScheduledOccurrence, ScheduledRunResult,
+)
+from ..services import scheduled_service
+
+router = APIRouter(prefix="/scheduled", tags=["scheduled"])
+
+
+@router.get("", response_model=List[ScheduledTransactionRead])
+def list_scheduled(db: Session = Depends(get_db)):
+    return scheduled_service.list_templates(db)
+
+
+@router.post("", response_model=ScheduledTransactionRead, status_code=201)
+def create_scheduled(data: ScheduledTransactionCreate, db: Session = Depends(get_db)):
+    return scheduled_service.create_template(db, data)
+
+
+@router.get("/preview", response_model=List[ScheduledOccurrence])
+def preview_scheduled(
+    until: date = Query(...),
+    template_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    return scheduled_service.pending_occurrences(db, until, template_id)
+
+
+@router.post("/run", response_model=ScheduledRunResult)
+def run_scheduled(
+    until: date = Query(...),
+    template_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+):
+    return scheduled_service.run_due(db, until, template_id)
+
+
+@router.get("/{template_id}", response_model=ScheduledTransactionRead)
+def get_scheduled(template_id: int, db: Session = Depends(get_db)):
+    return scheduled_service.get_template(db, template_id)
+
+
+@router.delete("/{template_id}", status_code=204)
+def delete_scheduled(template_id: int, db: Session = Depends(get_db)):
+    scheduled_service.delete_template(db, template_id)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..schemas.split_query import SplitQueryRequest, SplitQueryResult
+from ..services import split_query_service
+
+router = APIRouter(prefix="/splits", tags=["splits"])
+
+
+@router.post("/query", response_model=SplitQueryResult)
+def query_splits(data: SplitQueryRequest, db: Session = Depends(get_db)):
+    """Filter splits with the query language in split_query_service, one keyset page at a time."""
+    return split_query_service.query(db, data)
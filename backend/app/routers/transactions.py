@@ -1,14 +1,25 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from ..database import get_db
-from ..schemas.transaction import TransactionCreate, TransactionUpdate, TransactionRead
-from ..services import transaction_service
+from ..schemas.transaction import TransactionCreate, TransactionUpdate, TransactionRead, TransactionUpdateRead
+from ..schemas.imports import DuplicateCheckRequest, DuplicateCheckResult, ImportRequest, ImportResult
+from ..services import duplicate_service, import_service, transaction_service, write_coordinator
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 
+def _update_read(result) -> TransactionUpdateRead:
+    txn, affected = result
+    return TransactionUpdateRead.model_validate(txn).model_copy(update={
+        "affected_account_ids": sorted(affected.account_ids),
+        "affected_dates": sorted(affected.dates),
+    })
+
+
 @router.get("", response_model=list[TransactionRead])
 def list_transactions(
     account_id: Optional[int] = Query(None),
@@ -16,24 +27,55 @@ def list_transactions(
     to_date: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="comma-separated columns, e.g. id,date,description,amount_minor"),
+    include: Optional[str] = Query(None, description="with fields: 'splits' to add each transaction's splits"),
     db: Session = Depends(get_db),
 ):
-    return transaction_service.list_transactions(db, account_id, from_date, to_date, limit, offset)
+    """Full TransactionRead rows by default; with `fields`, only those columns."""
+    if fields is None:
+        return transaction_service.list_transactions(db, account_id, from_date, to_date, limit, offset)
+    included = [i for i in (include or "").split(",") if i]
+    if any(i != "splits" for i in included):
+        raise HTTPException(status_code=422, detail="include supports only 'splits'")
+    rows = transaction_service.list_transaction_rows(
+        db, [f for f in fields.split(",") if f], "splits" in included,
+        account_id, from_date, to_date, limit, offset,
+    )
+    return JSONResponse(jsonable_encoder(rows))
 
 
 @router.post("", response_model=TransactionRead, status_code=201)
 def create_transaction(data: TransactionCreate, db: Session = Depends(get_db)):
+    if write_coordinator.enabled():
+        return write_coordinator.for_session(db).submit(
+            transaction_service._create_transaction, data, serialize=TransactionRead.model_validate
+        )
     return transaction_service.create_transaction(db, data)
 
 
+@router.post("/duplicates", response_model=DuplicateCheckResult)
+def check_duplicates(data: DuplicateCheckRequest, db: Session = Depends(get_db)):
+    """Pre-import check: candidate duplicates for each incoming row; writes nothing."""
+    return duplicate_service.check(db, data.transactions, data.window_days, data.threshold)
+
+
+@router.post("/import", response_model=ImportResult, status_code=201)
+def import_transactions(data: ImportRequest, db: Session = Depends(get_db)):
+    return import_service.import_transactions(db, data)
+
+
 @router.get("/{txn_id}", response_model=TransactionRead)
 def get_transaction(txn_id: int, db: Session = Depends(get_db)):
     return transaction_service.get_transaction(db, txn_id)
 
 
-@router.patch("/{txn_id}", response_model=TransactionRead)
+@router.patch("/{txn_id}", response_model=TransactionUpdateRead)
 def update_transaction(txn_id: int, data: TransactionUpdate, db: Session = Depends(get_db)):
-    return transaction_service.update_transaction(db, txn_id, data)
+    if write_coordinator.enabled():
+        return write_coordinator.for_session(db).submit(
+            transaction_service._update_transaction, txn_id, data, serialize=_update_read
+        )
+    return _update_read(transaction_service.update_transaction(db, txn_id, data))
 
 
 @router.delete("/{txn_id}", status_code=204)
@@ -1,11 +1,73 @@
-from .commodity import CommodityRead, PriceCreate, PriceRead
-from .account import AccountCreate, AccountUpdate, AccountRead, AccountTreeNode
-from .transaction import TransactionCreate, TransactionUpdate, TransactionRead, SplitCreate, SplitRead
-from .reports import PnLRow, PnLReport, BalancePoint, BalanceHistory, NetWorthSnapshot
+from .commodity import CommodityCreate, CommodityRead, PriceCreate, PriceRead
+from .account import (
+    AccountCreate, AccountUpdate, AccountRead, AccountTreeNode, SubtreeRegisterRow, SubtreeRegisterPage,
+)
+from .transaction import (
+    TransactionCreate, TransactionUpdate, TransactionRead, TransactionUpdateRead,
+    SplitCreate, SplitUpdate, SplitRead,
+)
+from .reports import (
+    PnLRow, PnLReport, BalancePoint, BalanceHistory, NetWorthSnapshot,
+    BudgetVsActualRow, BudgetVsActualReport,
+    CashFlowRow, SankeyNode, SankeyLink, CashFlowReport,
+    AccountBalanceRow, CommodityTotal, TrialBalance,
+)
+from .reconcile import (
+    ReconcileStateUpdate, ReconcileStateResult, ReconcileBalances,
+    StatementLine, StatementMatchRequest, StatementMatch, StatementMatchResult,
+)
+from .scheduled import (
+    ScheduledSplitCreate, ScheduledSplitRead, ScheduledTransactionCreate, ScheduledTransactionRead,
+    ScheduledOccurrence, ScheduledRunResult,
+)
+from .budget import BudgetAmountSet, BudgetAmountRead, BudgetCreate, BudgetRead, BudgetDetail
+from .change import ChangeRead, ChangeFeed
+from .job import ReportJobCreate, JobRead
+from .period_close import PeriodCloseCreate, PeriodCloseRead
+from .backup import BackupRead, BackupResult, BackupVerifyResult
+from .integrity import IntegrityIssue, IntegrityReport
+from .lot import (
+    LotAccountUpdate, LotAccountRead, LotRead, RealizedGainRow, RealizedGainReport,
+    UnrealizedGainRow, UnrealizedGainReport,
+)
+from .imports import (
+    DuplicateCheckRequest, DuplicateCandidate, DuplicateCheckRow, DuplicateCheckResult,
+    ImportRequest, ImportResult,
+)
+from .rule import (
+    CategoryRuleCreate, CategoryRuleRead, RuleMatch, RuleApplyRequest, RuleApplyResult,
+    RuleReapplyRequest, RuleChange, RuleReapplyResult,
+)
+from .batch import BatchOperation, BatchRequest, BatchOperationResult, BatchResult
+from .refdata import RefDataStats
+from .split_query import SplitQueryRequest, SplitQueryRow, SplitQueryTotal, SplitQueryResult
 
 __all__ = [
-    "CommodityRead", "PriceCreate", "PriceRead",
-    "AccountCreate", "AccountUpdate", "AccountRead", "AccountTreeNode",
-    "TransactionCreate", "TransactionUpdate", "TransactionRead", "SplitCreate", "SplitRead",
+    "CommodityCreate", "CommodityRead", "PriceCreate", "PriceRead",
+    "AccountCreate", "AccountUpdate", "AccountRead", "AccountTreeNode", "SubtreeRegisterRow", "SubtreeRegisterPage",
+    "TransactionCreate", "TransactionUpdate", "TransactionRead", "TransactionUpdateRead",
+    "SplitCreate", "SplitUpdate", "SplitRead",
     "PnLRow", "PnLReport", "BalancePoint", "BalanceHistory", "NetWorthSnapshot",
+    "BudgetVsActualRow", "BudgetVsActualReport",
+    "CashFlowRow", "SankeyNode", "SankeyLink", "CashFlowReport",
+    "AccountBalanceRow", "CommodityTotal", "TrialBalance",
+    "ReconcileStateUpdate", "ReconcileStateResult", "ReconcileBalances",
+    "StatementLine", "StatementMatchRequest", "StatementMatch", "StatementMatchResult",
+    "ScheduledSplitCreate", "ScheduledSplitRead", "ScheduledTransactionCreate", "ScheduledTransactionRead",
+    "ScheduledOccurrence", "ScheduledRunResult",
+    "BudgetAmountSet", "BudgetAmountRead", "BudgetCreate", "BudgetRead", "BudgetDetail",
+    "ChangeRead", "ChangeFeed",
+    "ReportJobCreate", "JobRead",
+    "PeriodCloseCreate", "PeriodCloseRead",
+    "BackupRead", "BackupResult", "BackupVerifyResult",
+    "IntegrityIssue", "IntegrityReport",
+    "LotAccountUpdate", "LotAccountRead", "LotRead", "RealizedGainRow", "RealizedGainReport",
+    "UnrealizedGainRow", "UnrealizedGainReport",
+    "DuplicateCheckRequest", "DuplicateCandidate", "DuplicateCheckRow", "DuplicateCheckResult",
+    "ImportRequest", "ImportResult",
+    "CategoryRuleCreate", "CategoryRuleRead", "RuleMatch", "RuleApplyRequest", "RuleApplyResult",
+    "RuleReapplyRequest", "RuleChange", "RuleReapplyResult",
+    "BatchOperation", "BatchRequest", "BatchOperationResult", "BatchResult",
+    "RefDataStats",
+    "SplitQueryRequest", "SplitQueryRow", "SplitQueryTotal", "SplitQueryResult",
 ]
@@ -1,3 +1,4 @@
+import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 from ..models.account import AccountType
@@ -39,3 +40,25 @@ class AccountTreeNode(AccountRead):
 
 
 AccountTreeNode.model_rebuild()
+
+
+class SubtreeRegisterRow(BaseModel):
+    split_id: int
+    transaction_id: int
+    date: datetime.date
+    description: str
+    account_id: int
+    account_name: str
+    memo: Optional[str] = None
+    value_minor: int
+    quantity_minor: int
+    reconciled: str
+    commodity_id: int
+    running_subtotal: int  # across the subtree's accounts in this row's commodity
+
+
+class SubtreeRegisterPage(BaseModel):
+    account_id: int
+    account_ids: List[int]  # the account and all its descendants
+    rows: List[SubtreeRegisterRow]
+    next_cursor: Optional[str] = None  # pass as ?after= for the next page; None on the last one
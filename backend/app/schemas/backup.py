@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class BackupRead(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: datetime
+    compressed: bool
+    archive: Optional[str] = None  # the book's archive file, backed up with it
+
+
+class BackupResult(BackupRead):
+    db_bytes: int  # size of the live database that was copied
+    pages: int
+    steps: int
+    duration_s: float
+    throughput_mb_s: float
+    pruned: List[str] = []
+
+
+class BackupVerifyResult(BaseModel):
+    name: str
+    ok: bool
+    schema_version: Optional[int] = None
+    detail: str = ""
@@ -0,0 +1,32 @@
+from typing import Any, Dict, List, Literal, Optional, Union
+from pydantic import BaseModel, Field
+
+BatchOp = Literal[
+    "create_account", "update_account", "delete_account",
+    "create_transaction", "update_transaction", "delete_transaction",
+    "create_price",
+]
+
+
+class BatchOperation(BaseModel):
+    op: BatchOp
+    ref: Optional[str] = None  # name later operations use as "$<ref>" for the created id
+    id: Optional[Union[int, str]] = None  # target of update/delete; may be a "$<ref>"
+    data: Dict[str, Any] = {}  # request body of the matching endpoint; id fields may be "$<ref>"
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=500)
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    op: BatchOp
+    ref: Optional[str] = None
+    status: int  # what the single-operation endpoint would have returned
+    id: Optional[int] = None
+    body: Optional[Dict[str, Any]] = None
+
+
+class BatchResult(BaseModel):
+    results: List[BatchOperationResult]
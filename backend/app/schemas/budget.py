@@ -0,0 +1,40 @@
+from datetime import date
+from typing import Optional, List
+from pydantic import BaseModel, field_validator
+
+
+class BudgetAmountSet(BaseModel):
+    account_id: int
+    period: date  # normalized to the first of the month
+    amount_minor: int
+
+    @field_validator("period")
+    @classmethod
+    def _first_of_month(cls, v: date) -> date:
+        return v.replace(day=1)
+
+
+class BudgetAmountRead(BaseModel):
+    account_id: int
+    period: date
+    amount_minor: int
+
+    model_config = {"from_attributes": True}
+
+
+class BudgetCreate(BaseModel):
+    name: str
+    description: str = ""
+    amounts: List[BudgetAmountSet] = []
+
+
+class BudgetRead(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class BudgetDetail(BudgetRead):
+    amounts: List[BudgetAmountRead] = []
@@ -0,0 +1,18 @@
+from typing import Optional, List
+from pydantic import BaseModel
+
+
+class ChangeRead(BaseModel):
+    seq: int
+    entity: str
+    entity_id: int
+    op: str
+    account_ids: Optional[List[int]] = None
+
+    model_config = {"from_attributes": True}
+
+
+class ChangeFeed(BaseModel):
+    changes: List[ChangeRead]
+    last_seq: int  # pass as ?since= on the next call
+    has_more: bool
@@ -2,11 +2,19 @@ from datetime import date
 from pydantic import BaseModel
 
 
+class CommodityCreate(BaseModel):
+    mnemonic: str
+    name: str
+    fraction: int = 100
+    namespace: str = "CURRENCY"  # e.g. "NASDAQ" or "FUND" for securities
+
+
 class CommodityRead(BaseModel):
     id: int
     mnemonic: str
     name: str
     fraction: int
+    namespace: str = "CURRENCY"
 
     model_config = {"from_attributes": True}
 
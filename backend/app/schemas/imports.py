@@ -0,0 +1,44 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from .transaction import TransactionCreate
+
+
+class DuplicateCheckRequest(BaseModel):
+    transactions: List[TransactionCreate]
+    window_days: int = Field(3, ge=0, le=60)
+    threshold: float = Field(0.75, ge=0, le=1)  # minimum score to count as a duplicate
+
+
+class DuplicateCandidate(BaseModel):
+    transaction_id: int
+    score: float
+    date_diff_days: int
+    description: str
+
+
+class DuplicateCheckRow(BaseModel):
+    index: int  # position in the submitted batch
+    duplicate_of: Optional[int] = None  # best candidate at or above the threshold
+    exact: bool = False  # duplicate_of has the same import_ref
+    candidates: List[DuplicateCandidate]
+
+
+class DuplicateCheckResult(BaseModel):
+    checked: int
+    duplicates: int
+    rows: List[DuplicateCheckRow]  # only incoming rows that had candidates
+    duration_s: float
+
+
+class ImportRequest(DuplicateCheckRequest):
+    skip_duplicates: bool = True
+    # If set, category rules move each row's split in this account to the rule's target
+    uncategorized_account_id: Optional[int] = None
+
+
+class ImportResult(BaseModel):
+    created_ids: List[int]  # in batch order, excluding skipped rows
+    categorized: int = 0  # rows a category rule matched
+    skipped: List[DuplicateCheckRow]
+    duration_s: float
@@ -0,0 +1,21 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class IntegrityIssue(BaseModel):
+    kind: str  # zero_sum, too_few_splits, orphan_split, full_name, dangling_commodity, ...
+    entity: str
+    entity_id: int
+    detail: str
+
+
+class IntegrityReport(BaseModel):
+    ok: bool
+    issues: List[IntegrityIssue]
+    issue_count: int  # issues beyond the first few hundred are counted, not listed
+    months_total: int
+    months_verified: int
+    months_skipped: int  # unchanged since their last clean verification
+    splits_scanned: int
+    root_checksum: Optional[str] = None
+    duration_s: float
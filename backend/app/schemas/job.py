@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel
+
+
+class ReportJobCreate(BaseModel):
+    kind: str  # "pnl", "balance-history", "net-worth" or "budget-vs-actual"
+    params: Dict[str, Any] = {}
+
+
+class JobRead(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued, running, done, failed or expired
+    progress: float  # coarse: 0 queued, 0.5 running, 1 finished; reports do not report finer steps
+    submitted_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+from ..models.lot import CostMethod
+
+
+class LotAccountUpdate(BaseModel):
+    method: CostMethod
+
+
+class LotAccountRead(BaseModel):
+    account_id: int
+    method: CostMethod
+    dirty_from: Optional[date] = None
+
+    model_config = {"from_attributes": True}
+
+
+class LotRead(BaseModel):
+    id: int
+    account_id: int
+    split_id: int
+    opened: date
+    currency_id: int
+    quantity_minor: int
+    cost_minor: int
+    remaining_minor: int
+    remaining_cost_minor: int
+
+    model_config = {"from_attributes": True}
+
+
+class RealizedGainRow(BaseModel):
+    account_id: int
+    account_name: str
+    period: str
+    quantity_minor: int
+    proceeds_minor: int
+    cost_minor: int
+    gain_minor: int
+    reporting_currency: str
+
+
+class RealizedGainReport(BaseModel):
+    rows: List[RealizedGainRow]
+    reporting_currency: str
+    from_date: str
+    to_date: str
+
+
+class UnrealizedGainRow(BaseModel):
+    account_id: int
+    account_name: str
+    commodity_id: int
+    quantity_minor: int
+    cost_minor: int
+    market_value_minor: int
+    gain_minor: int
+
+
+class UnrealizedGainReport(BaseModel):
+    rows: List[UnrealizedGainRow]
+    as_of: date
+    reporting_currency: str
+    cost_minor: int
+    market_value_minor: int
+    gain_minor: int
@@ -0,0 +1,18 @@
+from datetime import date, datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class PeriodCloseCreate(BaseModel):
+    through: date
+    archive: bool = False  # move closed transactions into the archive database
+
+
+class PeriodCloseRead(BaseModel):
+    id: int
+    close_date: date
+    archived: bool
+    archive_path: Optional[str] = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
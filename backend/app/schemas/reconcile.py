@@ -0,0 +1,46 @@
+from datetime import date
+from typing import Optional, List
+from pydantic import BaseModel, Field
+
+
+class ReconcileStateUpdate(BaseModel):
+    split_ids: List[int]
+    state: str = Field(pattern="^[ncy]$")
+    account_id: Optional[int] = None  # if set, only splits in this account are changed
+
+
+class ReconcileStateResult(BaseModel):
+    updated: int
+    state: str
+
+
+class ReconcileBalances(BaseModel):
+    account_id: int
+    total_minor: int
+    cleared_minor: int  # cleared + reconciled
+    reconciled_minor: int
+
+
+class StatementLine(BaseModel):
+    date: date
+    amount_minor: int
+    description: str = ""
+
+
+class StatementMatchRequest(BaseModel):
+    lines: List[StatementLine]
+    window_days: int = Field(3, ge=0, le=60)
+    apply: bool = False  # mark matched splits as cleared
+
+
+class StatementMatch(BaseModel):
+    line_index: int
+    split_id: int
+    transaction_id: int
+    date_diff_days: int
+
+
+class StatementMatchResult(BaseModel):
+    matches: List[StatementMatch]
+    unmatched_lines: List[int]
+    applied: bool
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class RefDataStats(BaseModel):
+    hits: int
+    misses: int  # lookups that ran SQL: cold cache or a session with its own uncommitted writes
+    loads: int
+    invalidations: int
+    cached: bool
+    commodities: int
+    accounts: int
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic import BaseModel
 
 
@@ -35,3 +36,88 @@ class NetWorthSnapshot(BaseModel):
     liabilities_minor: int
     net_worth_minor: int
     reporting_currency: str
+
+
+class BudgetVsActualRow(BaseModel):
+    account_id: int
+    account_name: str
+    period: str
+    budget_minor: int
+    actual_minor: int
+    variance_minor: int  # actual - budget
+    percent_used: Optional[float] = None  # None when nothing was budgeted
+    reporting_currency: str
+
+
+class BudgetVsActualReport(BaseModel):
+    budget_id: int
+    budget_name: str
+    rows: list[BudgetVsActualRow]
+    reporting_currency: str
+    from_date: str
+    to_date: str
+
+
+class CashFlowRow(BaseModel):
+    account_id: int  # the counterpart account
+    account_name: str
+    account_type: str
+    period: str
+    inflow_minor: int  # into the selected accounts from this one
+    outflow_minor: int  # out of the selected accounts to this one
+    net_minor: int
+    reporting_currency: str
+
+
+class SankeyNode(BaseModel):
+    id: str
+    name: str
+
+
+class SankeyLink(BaseModel):
+    source: str
+    target: str
+    value_minor: int
+
+
+class CashFlowReport(BaseModel):
+    account_ids: list[int]  # selected accounts, subtree expanded
+    rows: list[CashFlowRow]
+    nodes: list[SankeyNode]  # counterparts on either side of one "selected" node
+    links: list[SankeyLink]
+    reporting_currency: str
+    from_date: str
+    to_date: str
+
+
+class AccountBalanceRow(BaseModel):
+    account_id: int
+    full_name: str
+    account_type: str
+    commodity_id: int
+    balance_minor: int  # native commodity, debit positive
+    reporting_balance_minor: int
+    debit_minor: int  # reporting currency; one of debit/credit is zero
+    credit_minor: int
+
+
+class CommodityTotal(BaseModel):
+    """Native totals of the accounts held in one commodity.
+
+    Cross-commodity transfers leave these uneven; the book has no trading accounts.
+    """
+    commodity_id: int
+    debit_minor: int
+    credit_minor: int
+    balanced: bool
+
+
+class TrialBalance(BaseModel):
+    as_of: Optional[str] = None  # None: everything posted
+    reporting_currency: str
+    rows: list[AccountBalanceRow]
+    total_debit_minor: int
+    total_credit_minor: int
+    difference_minor: int  # debits - credits; also moves with as-of rates in multi-commodity books
+    balanced: bool
+    commodity_totals: list[CommodityTotal]
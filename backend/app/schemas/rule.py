@@ -0,0 +1,63 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+from .transaction import TransactionCreate
+
+
+class CategoryRuleCreate(BaseModel):
+    name: str
+    priority: int = 100  # lowest wins when several rules match
+    pattern: str = ""  # case-insensitive substring of the description; "" matches any
+    # Bounds on the source split's quantity, inclusive; spending from a bank account is negative
+    min_amount_minor: Optional[int] = None
+    max_amount_minor: Optional[int] = None
+    source_account_id: Optional[int] = None
+    target_account_id: int
+    enabled: bool = True
+
+
+class CategoryRuleRead(CategoryRuleCreate):
+    id: int
+
+    model_config = {"from_attributes": True}
+
+
+class RuleMatch(BaseModel):
+    index: int
+    rule_id: int
+    target_account_id: int
+
+
+class RuleApplyRequest(BaseModel):
+    transactions: List[TransactionCreate]
+    uncategorized_account_id: int
+
+
+class RuleApplyResult(BaseModel):
+    transactions: List[TransactionCreate]  # with matched splits moved to their targets
+    matches: List[RuleMatch]
+
+
+class RuleReapplyRequest(BaseModel):
+    uncategorized_account_id: int
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+    dry_run: bool = True
+
+
+class RuleChange(BaseModel):
+    split_id: int
+    transaction_id: int
+    date: date
+    description: str
+    rule_id: int
+    from_account_id: int
+    to_account_id: int
+
+
+class RuleReapplyResult(BaseModel):
+    matched: int
+    updated: int
+    dry_run: bool
+    changes: List[RuleChange]  # the diff, capped at MAX_LISTED_CHANGES
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Optional, List
+from pydantic import BaseModel, Field
+from ..models.scheduled import Frequency
+
+
+class ScheduledSplitCreate(BaseModel):
+    account_id: int
+    value_minor: int
+    quantity_minor: int
+    memo: str = ""
+
+
+class ScheduledSplitRead(BaseModel):
+    id: int
+    account_id: int
+    value_minor: int
+    quantity_minor: int
+    memo: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class ScheduledTransactionCreate(BaseModel):
+    name: str
+    description: str = ""
+    notes: str = ""
+    currency_id: int
+    frequency: Frequency
+    interval: int = Field(1, ge=1)
+    start_date: date
+    end_date: Optional[date] = None
+    enabled: bool = True
+    splits: List[ScheduledSplitCreate]
+
+
+class ScheduledTransactionRead(BaseModel):
+    id: int
+    name: str
+    description: str
+    notes: Optional[str] = None
+    currency_id: int
+    frequency: Frequency
+    interval: int
+    start_date: date
+    end_date: Optional[date] = None
+    enabled: bool
+    generated_through: Optional[date] = None
+    splits: List[ScheduledSplitRead] = []
+
+    model_config = {"from_attributes": True}
+
+
+class ScheduledOccurrence(BaseModel):
+    scheduled_transaction_id: int
+    name: str
+    date: date
+    import_ref: str
+
+
+class ScheduledSkipped(ScheduledOccurrence):
+    reason: str  # "closed" (on or before the close date) or "missing_account"
+
+
+class ScheduledRunResult(BaseModel):
+    created: int
+    through: date
+    skipped: List[ScheduledSkipped] = []
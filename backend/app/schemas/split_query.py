@@ -0,0 +1,40 @@
+import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+
+class SplitQueryRequest(BaseModel):
+    # e.g. "account under 'Expenses' and amount >= 5000 and date >= 2024-01-01"; empty matches all
+    filter: str = ""
+    limit: int = Field(100, ge=1, le=1000)
+    after: Optional[str] = None  # next_cursor from the previous page
+    totals: bool = True  # count and sum every match, not just this page
+
+
+class SplitQueryRow(BaseModel):
+    split_id: int
+    transaction_id: int
+    date: datetime.date
+    description: str
+    account_id: int
+    account_name: str
+    memo: Optional[str] = None
+    value_minor: int
+    quantity_minor: int
+    reconciled: str
+    commodity_id: int
+
+
+class SplitQueryTotal(BaseModel):
+    commodity_id: int
+    count: int
+    quantity_minor: int
+
+
+class SplitQueryResult(BaseModel):
+    rows: List[SplitQueryRow]
+    next_cursor: Optional[str] = None
+    count: Optional[int] = None  # all matching splits, when totals were asked for
+    totals: Optional[List[SplitQueryTotal]] = None  # per account commodity
+    cost: int  # splits the chosen access path examines
+    access_path: str  # the index that drives the query, or "full scan"
@@ -1,3 +1,4 @@
+import datetime
 from datetime import date
 from typing import Optional, List
 from pydantic import BaseModel
@@ -11,6 +12,10 @@ class SplitCreate(BaseModel):
     reconciled: str = "n"
 
 
+class SplitUpdate(SplitCreate):
+    id: Optional[int] = None  # existing split to update; omitted for new splits
+
+
 class SplitRead(BaseModel):
     id: int
     transaction_id: int
@@ -33,11 +38,11 @@ class TransactionCreate(BaseModel):
 
 
 class TransactionUpdate(BaseModel):
-    date: Optional[date] = None
+    date: Optional[datetime.date] = None  # module-qualified: the field name shadows the type
     description: Optional[str] = None
     notes: Optional[str] = None
     currency_id: Optional[int] = None
-    splits: Optional[List[SplitCreate]] = None
+    splits: Optional[List[SplitUpdate]] = None
 
 
 class TransactionRead(BaseModel):
@@ -50,3 +55,9 @@ class TransactionRead(BaseModel):
     splits: List[SplitRead] = []
 
     model_config = {"from_attributes": True}
+
+
+class TransactionUpdateRead(TransactionRead):
+    """TransactionRead plus what the edit touched, for precise cache invalidation."""
+    affected_account_ids: List[int] = []
+    affected_dates: List[date] = []
@@ -3,6 +3,7 @@ from typing import Optional, Dict
 from sqlalchemy.orm import Session
 from .models.commodity import Commodity
 from .models.account import Account, AccountType
+from .services import refdata_service
 
 
 CURRENCIES = [
@@ -24,6 +25,7 @@ def seed_currencies(db: Session) -> Dict[str, int]:
         if c["mnemonic"] not in existing:
             commodity = Commodity(**c)
             db.add(commodity)
+    refdata_service.touch(db)
     db.commit()
     return {c.mnemonic: c.id for c in db.query(Commodity).all()}
 
@@ -90,6 +92,7 @@ def seed_chart_of_accounts(db: Session, currency_map: Dict[str, int]) -> None:
     _add_account(db, "Gas", AccountType.EXPENSE, usd, transport.id)
     _add_account(db, "Public Transit", AccountType.EXPENSE, usd, transport.id)
 
+    refdata_service.touch(db)
     db.commit()
 
 
@@ -1,11 +1,19 @@
-from typing import Optional, List
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, List, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, or_, select, tuple_, union_all
 from fastapi import HTTPException
 
 from ..models.account import Account
-from ..models.transaction import Split
-from ..schemas.account import AccountCreate, AccountUpdate, AccountTreeNode
+from ..models.budget import BudgetAmount
+from ..models.rule import CategoryRule
+from ..models.scheduled import ScheduledSplit
+from ..models.transaction import Transaction, Split
+from ..schemas.account import (
+    AccountCreate, AccountUpdate, AccountTreeNode, SubtreeRegisterRow, SubtreeRegisterPage,
+)
+from . import change_service, close_service, refdata_service
 
 
 def _compute_full_name(db: Session, account: Account) -> str:
@@ -20,7 +28,8 @@ def _compute_full_name(db: Session, account: Account) -> str:
     return ":".join(reversed(parts))
 
 
-def create_account(db: Session, data: AccountCreate) -> Account:
+def _create_account(db: Session, data: AccountCreate) -> Account:
+    """Create and flush an account without committing."""
     account = Account(
         name=data.name,
         full_name="",  # set below
@@ -33,6 +42,14 @@ def create_account(db: Session, data: AccountCreate) -> Account:
     db.add(account)
     db.flush()  # get id
     account.full_name = _compute_full_name(db, account)
+    change_service.record(db, "account", account.id)
+    refdata_service.touch(db)
+    db.flush()
+    return account
+
+
+def create_account(db: Session, data: AccountCreate) -> Account:
+    account = _create_account(db, data)
     db.commit()
     db.refresh(account)
     return account
@@ -45,11 +62,16 @@ def get_account(db: Session, account_id: int) -> Account:
     return account
 
 
+def subtree_ids(db: Session, account_ids: Iterable[int]) -> Set[int]:
+    """The given accounts plus all their descendants."""
+    return refdata_service.get(db).subtree_ids(account_ids)
+
+
 def list_accounts(db: Session) -> List[Account]:
     return db.query(Account).order_by(Account.full_name).all()
 
 
-def update_account(db: Session, account_id: int, data: AccountUpdate) -> Account:
+def _update_account(db: Session, account_id: int, data: AccountUpdate) -> Account:
     account = get_account(db, account_id)
     if data.name is not None:
         account.name = data.name
@@ -62,6 +84,12 @@ def update_account(db: Session, account_id: int, data: AccountUpdate) -> Account
     db.flush()
     # Recompute full_name for this account and all descendants
     _recompute_subtree_full_names(db, account)
+    db.flush()
+    return account
+
+
+def update_account(db: Session, account_id: int, data: AccountUpdate) -> Account:
+    account = _update_account(db, account_id, data)
     db.commit()
     db.refresh(account)
     return account
@@ -69,35 +97,57 @@ def update_account(db: Session, account_id: int, data: AccountUpdate) -> Account
 
 def _recompute_subtree_full_names(db: Session, account: Account) -> None:
     account.full_name = _compute_full_name(db, account)
+    change_service.record(db, "account", account.id)
+    refdata_service.touch(db)
     for child in account.children:
         _recompute_subtree_full_names(db, child)
 
 
-def delete_account(db: Session, account_id: int) -> None:
+def _delete_account(db: Session, account_id: int) -> None:
     account = get_account(db, account_id)
     if account.children:
         raise HTTPException(status_code=400, detail="Cannot delete account with children")
     split_count = db.query(func.count(Split.id)).filter(Split.account_id == account_id).scalar()
     if split_count > 0:
         raise HTTPException(status_code=400, detail="Cannot delete account with transactions")
+    # SQLite does not enforce the rules', budgets' and templates' foreign keys
+    rule = db.query(CategoryRule.id).filter(
+        or_(CategoryRule.source_account_id == account_id, CategoryRule.target_account_id == account_id)
+    ).first()
+    if rule is not None:
+        raise HTTPException(status_code=400, detail=f"Cannot delete account used by categorization rule {rule.id}")
+    budget = db.query(BudgetAmount.budget_id).filter(BudgetAmount.account_id == account_id).first()
+    if budget is not None:
+        raise HTTPException(status_code=400, detail=f"Cannot delete account used by budget {budget.budget_id}")
+    template = db.query(ScheduledSplit.scheduled_transaction_id).filter(
+        ScheduledSplit.account_id == account_id
+    ).first()
+    if template is not None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot delete account used by scheduled transaction {template.scheduled_transaction_id}",
+        )
+    # Closed and archived history survives only in the snapshots
+    if close_service.has_closed_history(db, account_id):
+        raise HTTPException(status_code=400, detail="Cannot delete account with closed-period history")
+    change_service.record(db, "account", account.id, change_service.DELETE)
+    refdata_service.touch(db)
     db.delete(account)
+    db.flush()
+
+
+def delete_account(db: Session, account_id: int) -> None:
+    _delete_account(db, account_id)
     db.commit()
 
 
 def get_balance(db: Session, account_id: int) -> int:
     """Returns sum of quantity_minor for all splits in this account (native commodity)."""
-    result = (
-        db.query(func.coalesce(func.sum(Split.quantity_minor), 0))
-        .filter(Split.account_id == account_id)
-        .scalar()
-    )
-    return result or 0
+    return close_service.opening_balances(db, None, [account_id]).get(account_id, 0)
 
 
 def get_register(db: Session, account_id: int, limit: int = 100, offset: int = 0):
     """Returns splits with transaction info, ordered by date."""
-    from ..models.transaction import Transaction
-
     splits = (
         db.query(Split)
         .join(Transaction, Split.transaction_id == Transaction.id)
@@ -107,19 +157,10 @@ def get_register(db: Session, account_id: int, limit: int = 100, offset: int = 0
         .limit(limit)
         .all()
     )
-    # Compute running balance
-    total_before = (
-        db.query(func.coalesce(func.sum(Split.quantity_minor), 0))
-        .join(Transaction, Split.transaction_id == Transaction.id)
-        .filter(Split.account_id == account_id)
-        .filter(
-            (Transaction.date < db.query(Transaction.date)
-             .filter(Transaction.id == splits[0].transaction_id)
-             .scalar_subquery()) if splits else False
-        )
-        .scalar()
-        or 0
-    ) if splits else 0
+    # Compute running balance, starting from the latest closing snapshot
+    total_before = close_service.opening_balances(
+        db, splits[0].transaction.date.isoformat(), [account_id]
+    ).get(account_id, 0) if splits else 0
 
     running = total_before
     result = []
@@ -129,6 +170,107 @@ def get_register(db: Session, account_id: int, limit: int = 100, offset: int = 0
     return result
 
 
+def parse_cursor(cursor: str) -> Tuple[int, int, int]:
+    """A register cursor is "date_num:transaction_id:split_id" of the last row seen."""
+    try:
+        date_num, transaction_id, split_id = (int(part) for part in cursor.split(":"))
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid cursor: {cursor}")
+    return date_num, transaction_id, split_id
+
+
+# Per-account seeks per statement, well under SQLite's 500-term compound select limit
+_SEEKS_PER_QUERY = 100
+
+
+def get_subtree_register(
+    db: Session, account_id: int, limit: int = 100, after: Optional[str] = None
+) -> SubtreeRegisterPage:
+    """Splits of an account and all its descendants in (date, transaction, split) order.
+
+    Each account in the subtree is a separate LIMIT limit + 1 seek on
+    ix_splits_account_date, and the seeks are combined with UNION ALL and merged
+    here, so no query sorts the whole subtree. Transactions are joined only for
+    the rows of the final page. The running subtotal is kept per commodity and
+    starts from everything before the page's first row (closing snapshot plus
+    live splits).
+    """
+    get_account(db, account_id)  # 404 check
+    refdata = refdata_service.get(db)
+    ids = sorted(refdata.subtree_ids([account_id]))
+    key = (Split.date_num, Split.transaction_id, Split.id)
+    cursor = parse_cursor(after) if after is not None else None
+
+    candidates = []
+    for start in range(0, len(ids), _SEEKS_PER_QUERY):
+        seeks = []
+        for acct_id in ids[start:start + _SEEKS_PER_QUERY]:
+            seek = (
+                select(Split.id, Split.transaction_id, Split.account_id, Split.date_num, Split.quantity_minor)
+                .where(Split.account_id == acct_id)
+                .order_by(*key)
+                .limit(limit + 1)
+            )
+            if cursor is not None:
+                seek = seek.where(tuple_(*key) > tuple_(*cursor))
+            seeks.append(select(seek.subquery()))
+        candidates += db.execute(union_all(*seeks)).all()
+    rows = heapq.nsmallest(limit + 1, candidates, key=lambda r: (r.date_num, r.transaction_id, r.id))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    details = {
+        row.id: row for row in db.execute(
+            select(Split.id, Split.value_minor, Split.memo, Split.reconciled, Transaction.date, Transaction.description)
+            .join(Transaction, Transaction.id == Split.transaction_id)
+            .where(Split.id.in_([row.id for row in rows]))
+        )
+    } if rows else {}
+
+    running: Dict[int, int] = defaultdict(int)
+    if rows:
+        first = rows[0]
+        before = close_service.opening_balances(db, details[first.id].date.isoformat(), ids)
+        same_day = db.execute(
+            select(Split.account_id, func.sum(Split.quantity_minor))
+            .where(
+                Split.account_id.in_(ids),
+                Split.date_num == first.date_num,
+                tuple_(Split.transaction_id, Split.id) < tuple_(first.transaction_id, first.id),
+            )
+            .group_by(Split.account_id)
+        )
+        for acct_id, qty in list(before.items()) + list(same_day):
+            running[refdata.accounts[acct_id].commodity_id] += qty
+
+    out: List[SubtreeRegisterRow] = []
+    for row in rows:
+        acct = refdata.accounts[row.account_id]
+        detail = details[row.id]
+        running[acct.commodity_id] += row.quantity_minor
+        out.append(SubtreeRegisterRow(
+            split_id=row.id,
+            transaction_id=row.transaction_id,
+            date=detail.date,
+            description=detail.description,
+            account_id=row.account_id,
+            account_name=acct.full_name,
+            memo=detail.memo,
+            value_minor=detail.value_minor,
+            quantity_minor=row.quantity_minor,
+            reconciled=detail.reconciled,
+            commodity_id=acct.commodity_id,
+            running_subtotal=running[acct.commodity_id],
+        ))
+    last = rows[-1] if rows else None
+    return SubtreeRegisterPage(
+        account_id=account_id,
+        account_ids=ids,
+        rows=out,
+        next_cursor=f"{last.date_num}:{last.transaction_id}:{last.id}" if has_more else None,
+    )
+
+
 def build_tree(accounts: List[Account]) -> List[AccountTreeNode]:
     """Build a forest of AccountTreeNode from a flat list."""
     by_id: dict = {}
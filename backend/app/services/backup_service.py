@@ -0,0 +1,401 @@
+"""Online backups through SQLite's backup API.
+
+Pages are copied in small steps with a short sleep in between, so writers only
+wait for one step at a time. Output is <book>-<timestamp>.db, gzipped by default,
+and older backups of the same book beyond the retention count are pruned.
+
+A book's archive file (see close_service) is part of its history, so it is copied
+with the book as <book>-<timestamp>.archive.db and verified, restored and pruned
+together with it.
+"""
+import gzip
+import logging
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.engine import Engine
+
+from ..config import settings
+from ..schemas.backup import BackupRead, BackupResult, BackupVerifyResult
+from .close_service import archive_path
+
+logger = logging.getLogger(__name__)
+
+_TIMESTAMP_FMT = "%Y%m%dT%H%M%S%f"
+_COPY_CHUNK = 1024 * 1024
+# Passes restarted because the source changed under the copy before the run gives up
+_MAX_RESTARTS = 3
+# Pause between steps after a restart, doubled on each further one
+_BACKOFF_S = 0.01
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _pattern(book: str) -> "re.Pattern[str]":
+    return re.compile(rf"^{re.escape(book)}-(\d{{8}}T\d{{12}})\.db(\.gz)?$")
+
+
+def book_name(eng: Engine) -> str:
+    database = eng.url.database
+    if database in (None, "", ":memory:"):
+        return "memory"
+    return Path(database).stem
+
+
+def _archive_of(path: Path) -> Path:
+    """<book>-<ts>.db[.gz] -> <book>-<ts>.archive.db[.gz]"""
+    cut = path.name.rindex(".db")
+    return path.with_name(path.name[:cut] + ".archive" + path.name[cut:])
+
+
+def _read(path: Path, created_at: datetime) -> BackupRead:
+    archive = _archive_of(path)
+    return BackupRead(
+        name=path.name,
+        size_bytes=path.stat().st_size,
+        created_at=created_at,
+        compressed=path.suffix == ".gz",
+        archive=archive.name if archive.is_file() else None,
+    )
+
+
+def list_backups(book: str, backup_dir: Optional[str] = None) -> List[BackupRead]:
+    """Backups of one book, newest first."""
+    directory = Path(backup_dir or settings.backup_dir)
+    if not directory.is_dir():
+        return []
+    pattern = _pattern(book)
+    found = []
+    for path in directory.iterdir():
+        m = pattern.match(path.name)
+        if m:
+            found.append(_read(path, datetime.strptime(m.group(1), _TIMESTAMP_FMT)))
+    return sorted(found, key=lambda b: b.created_at, reverse=True)
+
+
+def resolve(name: str, backup_dir: Optional[str] = None) -> Path:
+    """Path of a backup by file name; names cannot escape the backup directory."""
+    directory = Path(backup_dir or settings.backup_dir)
+    path = directory / Path(name).name
+    if Path(name).name != name or not path.is_file():
+        raise HTTPException(status_code=404, detail=f"Backup not found: {name}")
+    return path
+
+
+def prune(book: str, keep: int, backup_dir: Optional[str] = None) -> List[str]:
+    directory = Path(backup_dir or settings.backup_dir)
+    removed = []
+    for old in list_backups(book, str(directory))[max(keep, 1):]:
+        (directory / old.name).unlink(missing_ok=True)
+        if old.archive is not None:
+            (directory / old.archive).unlink(missing_ok=True)
+        removed.append(old.name)
+    return removed
+
+
+def _step_copy(src: sqlite3.Connection, dst: sqlite3.Connection, pages: int, sleep_s: float) -> int:
+    """Copy src into dst page-stepwise; returns the number of steps taken.
+
+    A write to the source restarts the copy. Each restart begins a new pass that
+    pauses longer between steps; after _MAX_RESTARTS the run fails with 503 and
+    the next one tries again. Copying in one step instead would hold the read
+    lock for the whole copy and block writers.
+    """
+    steps = 0
+    for attempt in range(_MAX_RESTARTS + 1):
+        last_remaining = None
+
+        def progress(status, remaining, total):
+            nonlocal steps, last_remaining
+            steps += 1
+            if last_remaining is not None and remaining > last_remaining:
+                raise _Restarted()
+            last_remaining = remaining
+
+        pause = sleep_s if attempt == 0 else max(sleep_s, _BACKOFF_S) * 2 ** attempt
+        try:
+            src.backup(dst, pages=pages, progress=progress, sleep=pause)
+            return steps
+        except _Restarted:
+            logger.info("Backup pass %d restarted under writes; backing off", attempt + 1)
+    raise HTTPException(status_code=503, detail="The book kept changing during the backup; try again later")
+
+
+def _copy(src: sqlite3.Connection, partial: Path, pages: int, sleep_s: float) -> Tuple[int, int]:
+    """(steps, pages copied) of a stepped copy of src into a new file."""
+    dst = sqlite3.connect(partial)
+    try:
+        steps = _step_copy(src, dst, pages, sleep_s)
+        return steps, dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dst.close()
+
+
+def _finish(partial: Path, target: Path, compress: bool) -> Path:
+    if compress:
+        target = target.with_name(target.name + ".gz")
+        with open(partial, "rb") as fin, gzip.open(target, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, _COPY_CHUNK)
+        partial.unlink()
+    else:
+        partial.rename(target)
+    return target
+
+
+def _archived_through(conn: sqlite3.Connection) -> Optional[str]:
+    try:
+        return conn.execute("SELECT max(close_date) FROM period_closes WHERE archived").fetchone()[0]
+    except sqlite3.OperationalError:  # a book from before period closes
+        return None
+
+
+def _archive_source(eng: Engine) -> Optional[Path]:
+    if book_name(eng) == "memory":
+        return None
+    path = archive_path(Path(eng.url.database))
+    return path if path.is_file() else None
+
+
+@contextmanager
+def _source(eng: Engine) -> Iterator[sqlite3.Connection]:
+    if eng.url.get_backend_name() != "sqlite":
+        raise HTTPException(status_code=400, detail="Backups are only supported for SQLite books")
+    if book_name(eng) == "memory":
+        raw = eng.raw_connection()
+        try:
+            yield raw.driver_connection
+        finally:
+            raw.close()
+        return
+    # A private connection, so the copy never holds a pooled one
+    conn = sqlite3.connect(eng.url.database, check_same_thread=False)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def backup(
+    eng: Engine,
+    backup_dir: Optional[str] = None,
+    compress: Optional[bool] = None,
+    keep: Optional[int] = None,
+    pages_per_step: Optional[int] = None,
+    step_sleep_ms: Optional[int] = None,
+) -> BackupResult:
+    """Take an online backup of the book behind `eng` and apply retention."""
+    directory = Path(backup_dir or settings.backup_dir)
+    compress = settings.backup_compress if compress is None else compress
+    keep = settings.backup_keep if keep is None else keep
+    pages = pages_per_step or settings.backup_pages_per_step
+    sleep_s = (settings.backup_step_sleep_ms if step_sleep_ms is None else step_sleep_ms) / 1000
+
+    book = book_name(eng)
+    directory.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.utcnow()
+    target = directory / f"{book}-{created_at.strftime(_TIMESTAMP_FMT)}.db"
+    partial = target.with_name(target.name + ".partial")
+
+    archive_src = _archive_source(eng)
+    archive_target = _archive_of(target)
+    archive_partial = archive_target.with_name(archive_target.name + ".partial")
+
+    started = time.perf_counter()
+    try:
+        with _source(eng) as src:
+            page_size = src.execute("PRAGMA page_size").fetchone()[0]
+            steps, page_count = _copy(src, partial, pages, sleep_s)
+            if archive_src is not None:
+                archive = sqlite3.connect(archive_src)
+                try:
+                    archive_steps, archive_pages = _copy(archive, archive_partial, pages, sleep_s)
+                finally:
+                    archive.close()
+                steps += archive_steps
+                page_count += archive_pages
+                # Archiving between the two copies would leave the pair disagreeing
+                copied = sqlite3.connect(partial)
+                try:
+                    consistent = _archived_through(copied) == _archived_through(src)
+                finally:
+                    copied.close()
+                if not consistent:
+                    raise HTTPException(
+                        status_code=503, detail="The book was archived during the backup; try again later"
+                    )
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        archive_partial.unlink(missing_ok=True)
+        raise
+
+    target = _finish(partial, target, compress)
+    if archive_src is not None:
+        _finish(archive_partial, archive_target, compress)
+    duration = time.perf_counter() - started
+
+    db_bytes = page_count * page_size
+    result = BackupResult(
+        **_read(target, created_at).model_dump(),
+        db_bytes=db_bytes,
+        pages=page_count,
+        steps=steps,
+        duration_s=round(duration, 4),
+        throughput_mb_s=round(db_bytes / (1024 * 1024) / duration, 2) if duration > 0 else 0.0,
+    )
+    result.pruned = prune(book, keep, str(directory))
+    logger.info(
+        "Backed up %s to %s: %d bytes in %.2fs (%.1f MB/s)",
+        book, target.name, db_bytes, duration, result.throughput_mb_s,
+    )
+    return result
+
+
+@contextmanager
+def _opened(path: Path) -> Iterator[sqlite3.Connection]:
+    """Open a backup file, decompressing .gz backups to a temporary file first."""
+    tmp = None
+    try:
+        if path.suffix == ".gz":
+            fd, name = tempfile.mkstemp(suffix=".db", dir=path.parent)
+            tmp = Path(name)
+            with gzip.open(path, "rb") as fin, open(fd, "wb") as fout:
+                shutil.copyfileobj(fin, fout, _COPY_CHUNK)
+        conn = sqlite3.connect(f"file:{tmp or path}?mode=ro", uri=True)
+        try:
+            yield conn
+        finally:
+            conn.close()
+    finally:
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+
+
+def _check(conn: sqlite3.Connection, name: str) -> BackupVerifyResult:
+    problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    ok = problems == ["ok"]
+    return BackupVerifyResult(
+        name=name, ok=ok, schema_version=version, detail="ok" if ok else "; ".join(problems[:20])
+    )
+
+
+def _verify_file(path: Path) -> BackupVerifyResult:
+    try:
+        with _opened(path) as conn:
+            return _check(conn, path.name)
+    except (OSError, EOFError, sqlite3.DatabaseError) as exc:
+        return BackupVerifyResult(name=path.name, ok=False, detail=str(exc))
+
+
+def verify(path: Path) -> BackupVerifyResult:
+    """Run an integrity check on a backup, and its archive, without touching any live book."""
+    result = _verify_file(path)
+    archive = _archive_of(path)
+    if result.ok and archive.is_file():
+        archived = _verify_file(archive)
+        if not archived.ok:
+            result.ok = False
+            result.detail = f"archive: {archived.detail}"
+    return result
+
+
+def _restore_file(path: Path, target: Path) -> None:
+    with _opened(path) as src:
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+
+
+def restore(path: Path, target: Path) -> BackupVerifyResult:
+    """Verify a backup, then copy it and its archive over `target` through the backup API.
+
+    The book and its archive are restored as a pair: an archive left from after
+    the backup was taken is removed. Stop the server (or at least writes to the
+    book) first: connections that stay open see the restored content, but
+    in-flight writes are lost.
+    """
+    result = verify(path)
+    if result.ok:
+        archive = _archive_of(path)
+        try:
+            _restore_file(path, target)
+            if archive.is_file():
+                _restore_file(archive, archive_path(target))
+            else:
+                archive_path(target).unlink(missing_ok=True)
+        except (OSError, EOFError, sqlite3.DatabaseError) as exc:
+            result = BackupVerifyResult(name=path.name, ok=False, detail=str(exc))
+    if not result.ok:
+        raise HTTPException(status_code=422, detail=f"Backup failed verification: {result.detail}")
+    return result
+
+
+class BackupScheduler:
+    """Daemon thread that backs up the default book and every book in books_dir.
+
+    Books whose file (and archive) have not changed since their last backup are
+    skipped. A failed run is retried at the next interval.
+    """
+
+    def __init__(self, interval_min: int):
+        self.interval_s = interval_min * 60
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval_s <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="mxbcash-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.run_once()
+
+    def run_once(self) -> List[BackupResult]:
+        from ..database import _make_engine
+
+        paths = [Path(settings.db_path)]
+        books_dir = Path(settings.books_dir)
+        if books_dir.is_dir():
+            # Archives are backed up with their book, not as books of their own
+            paths += sorted(p for p in books_dir.glob("*.db") if not p.name.endswith(".archive.db"))
+        results = []
+        for path in paths:
+            if not path.is_file():
+                continue
+            latest = list_backups(path.stem)
+            archive = archive_path(path)
+            mtime = max(p.stat().st_mtime for p in (path, archive) if p.is_file())
+            if latest and datetime.utcfromtimestamp(mtime) <= latest[0].created_at:
+                continue
+            eng = _make_engine(f"sqlite:///{path}")
+            try:
+                results.append(backup(eng))
+            except Exception:
+                logger.exception("Scheduled backup of %s failed", path)
+            finally:
+                eng.dispose()
+        return results
+
+
+scheduler = BackupScheduler(settings.backup_interval_min)
@@ -0,0 +1,121 @@
+"""Atomic batches of account, transaction and price writes.
+
+Operations run in order in the request's session through the same non-committing
+service functions the group-commit path uses, then commit once. Any failure
+rolls back the whole batch. A string value "$<ref>" in an operation's id, or in
+an id field of its data (account_id, currency_id, ... and the splits' ones), is
+replaced by the id created by the earlier operation with that ref (or at that
+index).
+"""
+from typing import Any, Callable, Dict, List, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException
+
+from ..schemas.account import AccountCreate, AccountUpdate, AccountRead
+from ..schemas.batch import BatchOperation, BatchOperationResult, BatchRequest, BatchResult
+from ..schemas.commodity import PriceCreate, PriceRead
+from ..schemas.transaction import TransactionCreate, TransactionUpdate, TransactionRead, TransactionUpdateRead
+from . import account_service, price_service, transaction_service
+
+
+def _update_read(result) -> TransactionUpdateRead:
+    txn, affected = result
+    return TransactionUpdateRead.model_validate(txn).model_copy(update={
+        "affected_account_ids": sorted(affected.account_ids),
+        "affected_dates": sorted(affected.dates),
+    })
+
+
+# op -> (body schema or None, needs an id, service call, serializer or None, status)
+_OPS: Dict[str, Tuple[Any, bool, Callable, Any, int]] = {
+    "create_account": (AccountCreate, False, account_service._create_account, AccountRead.model_validate, 201),
+    "update_account": (AccountUpdate, True, account_service._update_account, AccountRead.model_validate, 200),
+    "delete_account": (None, True, account_service._delete_account, None, 204),
+    "create_transaction": (
+        TransactionCreate, False, transaction_service._create_transaction, TransactionRead.model_validate, 201,
+    ),
+    "update_transaction": (TransactionUpdate, True, transaction_service._update_transaction, _update_read, 200),
+    "delete_transaction": (None, True, transaction_service._delete_transaction, None, 204),
+    "create_price": (PriceCreate, False, price_service._create_price, PriceRead.model_validate, 201),
+}
+
+
+# Fields that hold ids and so may be "$<ref>"; everything else, such as a
+# description or memo starting with "$", is passed through as written
+_ID_FIELDS = {"id", "account_id", "parent_id", "commodity_id", "currency_id"}
+
+
+def _resolve_ref(value: Any, created: Dict[str, int]) -> Any:
+    if isinstance(value, str) and value.startswith("$"):
+        key = value[1:]
+        if key not in created:
+            raise HTTPException(status_code=422, detail=f"Unknown reference {value}")
+        return created[key]
+    return value
+
+
+def _resolve(value: Any, created: Dict[str, int]) -> Any:
+    """Resolve references in the id fields of an operation's data, including its splits'."""
+    if isinstance(value, list):
+        return [_resolve(v, created) for v in value]
+    if isinstance(value, dict):
+        return {
+            k: _resolve_ref(v, created) if k in _ID_FIELDS else _resolve(v, created)
+            for k, v in value.items()
+        }
+    return value
+
+
+def _run_one(db: Session, index: int, op: BatchOperation, created: Dict[str, int]) -> BatchOperationResult:
+    schema, needs_id, call, serialize, status = _OPS[op.op]
+    target = _resolve_ref(op.id, created)
+    if needs_id and not isinstance(target, int):
+        raise HTTPException(status_code=422, detail=f"{op.op} requires an integer id")
+    args = [target] if needs_id else []
+    if schema is not None:
+        try:
+            args.append(schema.model_validate(_resolve(op.data, created)))
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_context=False))
+
+    result = call(db, *args)
+    body: BaseModel = serialize(result) if serialize is not None else None
+    new_id = body.id if body is not None and not needs_id else None
+    if new_id is not None:
+        created[str(index)] = new_id
+        if op.ref is not None:
+            created[op.ref] = new_id
+    return BatchOperationResult(
+        index=index,
+        op=op.op,
+        ref=op.ref,
+        status=status,
+        id=new_id if new_id is not None else target,
+        body=body.model_dump(mode="json") if body is not None else None,
+    )
+
+
+def run_batch(db: Session, data: BatchRequest) -> BatchResult:
+    """Run every operation or none; a failure reports the index of the operation that failed."""
+    refs = [op.ref for op in data.operations if op.ref is not None]
+    if len(refs) != len(set(refs)):
+        raise HTTPException(status_code=422, detail="Operation refs must be unique")
+
+    created: Dict[str, int] = {}
+    results: List[BatchOperationResult] = []
+    for index, op in enumerate(data.operations):
+        try:
+            results.append(_run_one(db, index, op, created))
+        except HTTPException as exc:
+            db.rollback()
+            raise HTTPException(
+                status_code=exc.status_code,
+                detail={"index": index, "op": op.op, "detail": exc.detail},
+            )
+        except Exception:
+            db.rollback()
+            raise
+    db.commit()
+    return BatchResult(results=results)
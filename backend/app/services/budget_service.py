@@ -0,0 +1,79 @@
+from typing import List
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+from fastapi import HTTPException
+
+from ..models.budget import Budget, BudgetAmount
+from ..schemas.budget import BudgetCreate, BudgetAmountSet
+from . import refdata_service
+
+
+def create_budget(db: Session, data: BudgetCreate) -> Budget:
+    budget = Budget(name=data.name, description=data.description)
+    db.add(budget)
+    db.flush()
+    _upsert_amounts(db, budget.id, data.amounts)
+    db.commit()
+    db.refresh(budget)
+    return budget
+
+
+def get_budget(db: Session, budget_id: int) -> Budget:
+    budget = db.get(Budget, budget_id)
+    if budget is None:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    return budget
+
+
+def list_budgets(db: Session) -> List[Budget]:
+    return db.query(Budget).order_by(Budget.name).all()
+
+
+def delete_budget(db: Session, budget_id: int) -> None:
+    budget = get_budget(db, budget_id)
+    db.delete(budget)
+    db.commit()
+
+
+def set_amounts(db: Session, budget_id: int, amounts: List[BudgetAmountSet]) -> Budget:
+    budget = get_budget(db, budget_id)
+    _upsert_amounts(db, budget_id, amounts)
+    db.commit()
+    db.expire(budget, ["amounts"])
+    return budget
+
+
+def _upsert_amounts(db: Session, budget_id: int, amounts: List[BudgetAmountSet]) -> None:
+    """Insert new (account, period) cells and update existing ones with two bulk statements."""
+    if not amounts:
+        return
+    # SQLite does not enforce the amounts' foreign keys
+    accounts = refdata_service.get(db).accounts
+    for a in amounts:
+        if a.account_id not in accounts:
+            raise HTTPException(status_code=422, detail=f"Account {a.account_id} does not exist")
+    existing = {
+        (account_id, period): amount_id
+        for amount_id, account_id, period in db.query(
+            BudgetAmount.id, BudgetAmount.account_id, BudgetAmount.period
+        ).filter(BudgetAmount.budget_id == budget_id)
+    }
+
+    updates, inserts = [], {}
+    for a in amounts:
+        key = (a.account_id, a.period)
+        if key in existing:
+            updates.append({"id": existing[key], "amount_minor": a.amount_minor})
+        else:
+            # Later entries for the same cell win
+            inserts[key] = {
+                "budget_id": budget_id,
+                "account_id": a.account_id,
+                "period": a.period,
+                "amount_minor": a.amount_minor,
+            }
+    if updates:
+        db.execute(update(BudgetAmount), updates)
+    if inserts:
+        db.execute(insert(BudgetAmount), list(inserts.values()))
@@ -0,0 +1,148 @@
+import asyncio
+import json
+from datetime import date
+from typing import AsyncIterator, Iterable, List, Optional
+
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy import func, insert, text
+from starlette.concurrency import run_in_threadpool
+
+from ..models.change import Change
+from ..schemas.change import ChangeRead, ChangeFeed
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+# Advisory lock key of the change log; any constant unique within the book
+_SEQ_LOCK = 0x6D786263
+
+
+def _months(dates: Optional[Iterable[date]]) -> Optional[List[str]]:
+    if dates is None:
+        return None
+    return sorted({d.replace(day=1).isoformat() for d in dates})
+
+
+def _hold_seq_order(db: Session) -> None:
+    """Make seq order commit order on PostgreSQL.
+
+    seq is drawn from a sequence at insert but becomes visible at commit, so
+    with concurrent writers a reader polling `seq > since` could pass over a
+    lower seq whose transaction commits later. A transaction-scoped advisory
+    lock, taken before the first change row and held until commit or rollback,
+    serializes change-log writers. SQLite books already have a single writer.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SEQ_LOCK})
+
+
+def record(
+    db: Session,
+    entity: str,
+    entity_id: int,
+    op: str = UPSERT,
+    account_ids: Optional[Iterable[int]] = None,
+    dates: Optional[Iterable[date]] = None,
+) -> None:
+    """Append a change in the caller's transaction; it becomes visible on commit.
+
+    Transaction changes pass the dates their splits had or now have, so the
+    integrity checker knows which months to fingerprint again.
+    """
+    _hold_seq_order(db)
+    db.add(Change(
+        entity=entity,
+        entity_id=entity_id,
+        op=op,
+        account_ids=sorted(set(account_ids)) if account_ids is not None else None,
+        months=_months(dates),
+    ))
+
+
+def record_many(db: Session, entity: str, entries: List[tuple], op: str = UPSERT) -> None:
+    """Bulk variant of record() for (entity_id, account_ids[, dates]) tuples."""
+    if entries:
+        _hold_seq_order(db)
+        db.execute(insert(Change), [
+            {
+                "entity": entity,
+                "entity_id": entry[0],
+                "op": op,
+                "account_ids": sorted(set(entry[1])) if entry[1] is not None else None,
+                "months": _months(entry[2]) if len(entry) > 2 else None,
+            }
+            for entry in entries
+        ])
+
+
+def latest_seq(db: Session) -> int:
+    return db.query(func.coalesce(func.max(Change.seq), 0)).scalar()
+
+
+def list_changes(db: Session, since: int, limit: int) -> ChangeFeed:
+    """Changes after `since`, compacted so each entity appears once with its latest op."""
+    rows = (
+        db.query(Change)
+        .filter(Change.seq > since)
+        .order_by(Change.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest: dict = {}
+    accounts: dict = {}
+    for row in rows:
+        key = (row.entity, row.entity_id)
+        latest[key] = row
+        if row.account_ids:
+            accounts.setdefault(key, set()).update(row.account_ids)
+
+    changes = [
+        ChangeRead(
+            seq=row.seq,
+            entity=row.entity,
+            entity_id=row.entity_id,
+            op=row.op,
+            account_ids=sorted(accounts[key]) if key in accounts else None,
+        )
+        for key, row in latest.items()
+    ]
+    changes.sort(key=lambda c: c.seq)
+    return ChangeFeed(
+        changes=changes,
+        last_seq=rows[-1].seq if rows else since,
+        has_more=has_more,
+    )
+
+
+async def stream_seqs(
+    factory: sessionmaker,
+    since: int,
+    poll_interval: float,
+    max_events: Optional[int] = None,
+    is_disconnected=None,
+) -> AsyncIterator[str]:
+    """Server-sent events announcing each new high-water sequence number."""
+
+    def _poll() -> int:
+        db = factory()
+        try:
+            return latest_seq(db)
+        finally:
+            db.close()
+
+    sent = 0
+    last = since
+    while max_events is None or sent < max_events:
+        if is_disconnected is not None and await is_disconnected():
+            return
+        seq = await run_in_threadpool(_poll)
+        if seq > last:
+            last = seq
+            sent += 1
+            yield f"id: {seq}\nevent: change\ndata: {json.dumps({'seq': seq})}\n\n"
+        else:
+            yield ": keep-alive\n\n"
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,324 @@
+"""Period close: a lock date, immutable closing snapshots and optional archiving.
+
+Closing through a date stores every account's cumulative balance at that date and
+per-month totals for the newly closed range. Balance queries then start from the
+latest snapshot and only sum live splits after it. Archiving moves the closed
+transactions and splits into a sibling SQLite file, attached only while moving;
+reports over archived ranges are served from the monthly totals.
+"""
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, or_, update
+from fastapi import HTTPException
+
+from ..dialect import period_start
+from ..models.account import Account
+from ..models.period_close import PeriodClose, ClosingBalance, ClosedPeriodAggregate
+from ..models.transaction import Split, day_number
+from . import lot_service
+
+ARCHIVE_SCHEMA = "archive"
+# Archived tables, parents first
+_ARCHIVED_TABLES = ("transactions", "splits")
+
+
+def latest_close(db: Session, before: Optional[str] = None) -> Optional[PeriodClose]:
+    """The most recent close, or the most recent one dated strictly before `before`."""
+    q = db.query(PeriodClose)
+    if before is not None:
+        q = q.filter(PeriodClose.close_date < before)
+    return q.order_by(PeriodClose.close_date.desc()).first()
+
+
+def list_closes(db: Session) -> List[PeriodClose]:
+    return db.query(PeriodClose).order_by(PeriodClose.close_date).all()
+
+
+def closed_through(db: Session) -> Optional[date]:
+    return db.query(func.max(PeriodClose.close_date)).scalar()
+
+
+def archived_through(db: Session) -> Optional[date]:
+    return db.query(func.max(PeriodClose.close_date)).filter(PeriodClose.archived.is_(True)).scalar()
+
+
+def check_open(db: Session, *dates: Optional[date]) -> None:
+    """Reject writes that touch a closed period."""
+    through = closed_through(db)
+    if through is None:
+        return
+    for d in dates:
+        if d is not None and d <= through:
+            raise HTTPException(status_code=409, detail=f"Books are closed through {through.isoformat()}")
+
+
+def _month_start(d: str) -> str:
+    return d[:8] + "01"
+
+
+def _month_end(d: str) -> bool:
+    return day_after(d)[8:10] == "01"
+
+
+def _close_dates(db: Session) -> set:
+    return {d.isoformat() for (d,) in db.query(PeriodClose.close_date)}
+
+
+def _archived_detail_error(archived: date) -> HTTPException:
+    return HTTPException(
+        status_code=422,
+        detail=f"Transactions through {archived.isoformat()} are archived and only kept as monthly totals; "
+               "use month boundaries or close dates inside that range",
+    )
+
+
+def opening_balances(
+    db: Session, before: Optional[str] = None, account_ids: Optional[Iterable[int]] = None
+) -> Dict[int, int]:
+    """Per-account quantity of every split dated before `before` (of all splits if None).
+
+    Starts from the latest closing snapshot before that date and adds the splits
+    after it. If those were archived, only the monthly totals of later closes are
+    left, so `before` must then be a month start or the day after a close (422
+    otherwise).
+    """
+    ids = None if account_ids is None else list(account_ids)
+    totals: Dict[int, int] = {}
+    close = latest_close(db, before)
+
+    if close is not None:
+        q = db.query(ClosingBalance.account_id, ClosingBalance.quantity_minor).filter(
+            ClosingBalance.close_id == close.id
+        )
+        if ids is not None:
+            q = q.filter(ClosingBalance.account_id.in_(ids))
+        totals.update(q.all())
+
+    archived = archived_through(db)
+    gap_archived = (
+        archived is not None and before is not None and before <= archived.isoformat()
+        and (close is None or day_after(close.close_date.isoformat()) < before)
+    )
+    if gap_archived:
+        # Every split between the snapshot and `before` is in the archive
+        if before[8:10] != "01":
+            raise _archived_detail_error(archived)
+        q = (
+            db.query(ClosedPeriodAggregate.account_id, func.sum(ClosedPeriodAggregate.quantity_minor))
+            .join(PeriodClose, PeriodClose.id == ClosedPeriodAggregate.close_id)
+            .filter(ClosedPeriodAggregate.period < before)
+        )
+        if close is not None:
+            q = q.filter(PeriodClose.close_date > close.close_date)
+        if ids is not None:
+            q = q.filter(ClosedPeriodAggregate.account_id.in_(ids))
+        for account_id, qty in q.group_by(ClosedPeriodAggregate.account_id):
+            totals[account_id] = totals.get(account_id, 0) + qty
+        return totals
+
+    # Dates are compared on the splits' own date_num, so no join to transactions
+    q = db.query(Split.account_id, func.sum(Split.quantity_minor))
+    if close is not None:
+        q = q.filter(Split.date_num > day_number(close.close_date))
+    if before is not None:
+        q = q.filter(Split.date_num < day_number(before))
+    if ids is not None:
+        q = q.filter(Split.account_id.in_(ids))
+    for account_id, qty in q.group_by(Split.account_id):
+        totals[account_id] = totals.get(account_id, 0) + qty
+    return totals
+
+
+def has_closed_history(db: Session, account_id: int) -> bool:
+    """Whether any closing snapshot or monthly total refers to the account."""
+    for model in (ClosingBalance, ClosedPeriodAggregate):
+        if db.query(model.account_id).filter(model.account_id == account_id).first() is not None:
+            return True
+    return False
+
+
+def archived_range(db: Session, from_date: str, to_date: str) -> Optional[Tuple[str, str]]:
+    """The part of [from_date, to_date] whose rows were archived, if any."""
+    archived = archived_through(db)
+    if archived is None or from_date > archived.isoformat():
+        return None
+    return from_date, min(to_date, archived.isoformat())
+
+
+def day_after(d: str) -> str:
+    return (date.fromisoformat(d[:10]) + timedelta(days=1)).isoformat()
+
+
+def previous_day(d: str) -> str:
+    return (date.fromisoformat(d[:10]) - timedelta(days=1)).isoformat()
+
+
+def closed_totals(
+    db: Session,
+    period_fmt: str,
+    from_date: str,
+    to_date: str,
+    account_ids: Optional[Iterable[int]] = None,
+    account_types: Optional[Iterable] = None,
+):
+    """(account_id, period, total_qty) rows from the monthly snapshots of an archived range.
+
+    Each close stores its months clipped to its own range, so a range may start on
+    a month start or the day after a close and end on a month end or a close date;
+    anything else would count days outside it and is rejected with 422.
+    """
+    closes = _close_dates(db)
+    if not (from_date[8:10] == "01" or previous_day(from_date) in closes) or not (
+        _month_end(to_date) or to_date in closes
+    ):
+        raise _archived_detail_error(archived_through(db))
+
+    period = period_start(period_fmt, ClosedPeriodAggregate.period).label("period")
+    q = db.query(
+        ClosedPeriodAggregate.account_id,
+        period,
+        func.sum(ClosedPeriodAggregate.quantity_minor).label("total_qty"),
+    ).join(PeriodClose, PeriodClose.id == ClosedPeriodAggregate.close_id).filter(
+        ClosedPeriodAggregate.period >= _month_start(from_date),
+        ClosedPeriodAggregate.period <= to_date,
+    )
+    # Partial first and last months: only the closes whose ranges fall inside
+    if from_date[8:10] != "01":
+        q = q.filter(or_(ClosedPeriodAggregate.period > from_date, PeriodClose.close_date >= from_date))
+    if not _month_end(to_date):
+        q = q.filter(or_(ClosedPeriodAggregate.period < _month_start(to_date), PeriodClose.close_date <= to_date))
+    if account_ids is not None:
+        q = q.filter(ClosedPeriodAggregate.account_id.in_(list(account_ids)))
+    if account_types is not None:
+        q = q.join(Account, Account.id == ClosedPeriodAggregate.account_id).filter(
+            Account.account_type.in_(list(account_types))
+        )
+    return q.group_by(ClosedPeriodAggregate.account_id, "period").all()
+
+
+def close_books(db: Session, through: date, archive: bool = False) -> PeriodClose:
+    """Close the books through `through`, snapshotting balances and monthly totals."""
+    prev = latest_close(db)
+    if prev is not None and through <= prev.close_date:
+        raise HTTPException(
+            status_code=409, detail=f"Books are already closed through {prev.close_date.isoformat()}"
+        )
+    if archive:
+        archive_file = _archive_file(db)
+
+    balances: Dict[int, int] = {}
+    if prev is not None:
+        balances.update(
+            db.query(ClosingBalance.account_id, ClosingBalance.quantity_minor)
+            .filter(ClosingBalance.close_id == prev.id)
+            .all()
+        )
+
+    q = (
+        db.query(
+            Split.account_id,
+            Split.month_key.label("period"),
+            func.sum(Split.quantity_minor).label("total_qty"),
+        )
+        .filter(Split.date_num <= day_number(through))
+    )
+    if prev is not None:
+        q = q.filter(Split.date_num > day_number(prev.close_date))
+    monthly = q.group_by(Split.account_id, "period").all()
+
+    close = PeriodClose(close_date=through, archived=False)
+    db.add(close)
+    db.flush()
+
+    for row in monthly:
+        balances[row.account_id] = balances.get(row.account_id, 0) + row.total_qty
+    if balances:
+        db.execute(insert(ClosingBalance), [
+            {"close_id": close.id, "account_id": account_id, "quantity_minor": qty}
+            for account_id, qty in balances.items()
+        ])
+    if monthly:
+        db.execute(insert(ClosedPeriodAggregate), [
+            {
+                "close_id": close.id,
+                "account_id": row.account_id,
+                "period": date(row.period // 100, row.period % 100, 1),
+                "quantity_minor": row.total_qty,
+            }
+            for row in monthly
+        ])
+    if archive:
+        # Lots cannot be replayed once their splits are archived
+        lot_service.refresh(db)
+    db.commit()
+
+    if archive:
+        _archive_rows(db, close, archive_file)
+    db.refresh(close)
+    return close
+
+
+def archive_path(book_path: Path) -> Path:
+    """The archive file that belongs to a book file."""
+    return book_path.with_name(book_path.stem + ".archive" + book_path.suffix)
+
+
+def _archive_file(db: Session) -> str:
+    url = db.get_bind().url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise HTTPException(status_code=400, detail="Archiving needs a file-backed SQLite book")
+    return str(archive_path(Path(url.database)))
+
+
+def _columns(conn, schema: str, table: str) -> List[str]:
+    return [row[1] for row in conn.exec_driver_sql(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _archive_rows(db: Session, close: PeriodClose, archive_file: str) -> None:
+    """Move transactions and splits dated on or before the close into the archive file.
+
+    ATTACH is not allowed inside a transaction, so this runs on its own connection
+    after the snapshot has been committed.
+    """
+    through = close.close_date.isoformat()
+    with db.get_bind().connect() as conn:
+        conn.exec_driver_sql(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_file,))
+        try:
+            for table in _ARCHIVED_TABLES:
+                conn.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.{table} AS SELECT * FROM main.{table} WHERE 0"
+                )
+                # Columns added to the live schema since the archive was created
+                existing = set(_columns(conn, ARCHIVE_SCHEMA, table))
+                for col in _columns(conn, "main", table):
+                    if col not in existing:
+                        conn.exec_driver_sql(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {col}")
+
+            txn_cols = ", ".join(_columns(conn, "main", "transactions"))
+            split_cols = ", ".join(_columns(conn, "main", "splits"))
+            closed_txns = "SELECT id FROM main.transactions WHERE date <= ?"
+            conn.exec_driver_sql(
+                f"INSERT INTO {ARCHIVE_SCHEMA}.transactions ({txn_cols}) "
+                f"SELECT {txn_cols} FROM main.transactions WHERE date <= ?",
+                (through,),
+            )
+            conn.exec_driver_sql(
+                f"INSERT INTO {ARCHIVE_SCHEMA}.splits ({split_cols}) "
+                f"SELECT {split_cols} FROM main.splits WHERE transaction_id IN ({closed_txns})",
+                (through,),
+            )
+            conn.exec_driver_sql(f"DELETE FROM main.splits WHERE transaction_id IN ({closed_txns})", (through,))
+            conn.exec_driver_sql("DELETE FROM main.transactions WHERE date <= ?", (through,))
+            conn.execute(
+                update(PeriodClose)
+                .where(PeriodClose.close_date <= close.close_date)
+                .values(archived=True, archive_path=archive_file)
+            )
+            conn.commit()
+        finally:
+            conn.rollback()
+            conn.exec_driver_sql(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+    db.expire_all()
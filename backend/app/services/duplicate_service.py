@@ -0,0 +1,197 @@
+"""Duplicate detection for incoming transactions.
+
+Candidates are found through a blocking key: an existing transaction can only
+duplicate an incoming one if they share an (account, amount) split within the
+date window. Existing splits are fetched per account through the
+ix_splits_account_quantity index, hashed into (account, amount) buckets sorted
+by date, and each incoming row bisects its buckets. Only the few candidates
+that survive blocking are scored by description similarity and date distance,
+and each existing transaction is claimed by at most one incoming row.
+"""
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+from difflib import SequenceMatcher
+from typing import Dict, List, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.transaction import Transaction, Split
+from ..schemas.imports import DuplicateCandidate, DuplicateCheckRow, DuplicateCheckResult
+from ..schemas.transaction import TransactionCreate
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+# Candidates reported per incoming row
+MAX_CANDIDATES = 3
+# Weight of description similarity against date proximity in the score
+DESCRIPTION_WEIGHT = 0.7
+
+_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+
+
+def normalize(description: str) -> str:
+    """Lowercase words with punctuation and long digit runs (card numbers, refs) dropped."""
+    tokens = _TOKEN_RE.findall(description.lower())
+    return " ".join(t for t in tokens if not (t.isdigit() and len(t) > 2))
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity of two normalized descriptions in [0, 1]."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.real_quick_ratio() == 0:
+        return 0.0
+    return matcher.ratio()
+
+
+def score(description_similarity: float, date_diff: int, window_days: int) -> float:
+    date_score = 1 - date_diff / (window_days + 1)
+    return round(DESCRIPTION_WEIGHT * description_similarity + (1 - DESCRIPTION_WEIGHT) * date_score, 4)
+
+
+def _existing_refs(db: Session, refs: List[str]) -> Dict[str, int]:
+    found: Dict[str, int] = {}
+    for i in range(0, len(refs), _CHUNK):
+        chunk = refs[i:i + _CHUNK]
+        found.update(
+            (ref, txn_id)
+            for txn_id, ref in db.query(Transaction.id, Transaction.import_ref).filter(
+                Transaction.import_ref.in_(chunk)
+            )
+        )
+    return found
+
+
+def _load_buckets(
+    db: Session, txns: Sequence[TransactionCreate], window_days: int
+) -> Tuple[Dict[Tuple[int, int], List[Tuple[int, int]]], Dict[int, Tuple[str, str]]]:
+    """Existing splits sharing a blocking key with the batch.
+
+    Returns ({(account_id, amount): [(date ordinal, transaction_id)] sorted}, {transaction_id:
+    (description, normalized description)}).
+    """
+    window = timedelta(days=window_days)
+    wanted: Dict[int, Set[int]] = defaultdict(set)
+    ranges: Dict[int, list] = {}
+    for t in txns:
+        for s in t.splits:
+            wanted[s.account_id].add(s.quantity_minor)
+            lo, hi = ranges.get(s.account_id, (t.date, t.date))
+            ranges[s.account_id] = (min(lo, t.date), max(hi, t.date))
+
+    buckets: Dict[Tuple[int, int], List[Tuple[int, int]]] = defaultdict(list)
+    descriptions: Dict[int, Tuple[str, str]] = {}
+    for account_id, amounts in wanted.items():
+        start, end = ranges[account_id]
+        amounts = sorted(amounts)
+        for i in range(0, len(amounts), _CHUNK):
+            rows = (
+                db.query(Split.quantity_minor, Split.transaction_id, Transaction.date, Transaction.description)
+                .join(Transaction, Transaction.id == Split.transaction_id)
+                .filter(
+                    Split.account_id == account_id,
+                    Split.quantity_minor.in_(amounts[i:i + _CHUNK]),
+                    Transaction.date >= start - window,
+                    Transaction.date <= end + window,
+                )
+            )
+            for amount, txn_id, d, description in rows:
+                buckets[(account_id, amount)].append((d.toordinal(), txn_id))
+                if txn_id not in descriptions:
+                    descriptions[txn_id] = (description, normalize(description))
+    for bucket in buckets.values():
+        bucket.sort()
+    return buckets, descriptions
+
+
+def find_duplicates(
+    db: Session,
+    txns: Sequence[TransactionCreate],
+    window_days: int = 3,
+    threshold: float = 0.75,
+) -> List[DuplicateCheckRow]:
+    """Candidate duplicates for each incoming transaction that has any, in batch order.
+
+    A matching import_ref is always an exact duplicate. Otherwise rows are paired
+    greedily, best score first, so an existing transaction is the duplicate of at
+    most one incoming row.
+    """
+    if not txns:
+        return []
+
+    refs = _existing_refs(db, [t.import_ref for t in txns if t.import_ref])
+    buckets, descriptions = _load_buckets(db, txns, window_days)
+
+    candidates: Dict[int, List[DuplicateCandidate]] = {}
+    edges: List[Tuple[float, int, int, int]] = []  # (-score, date diff, row, transaction_id)
+    for i, t in enumerate(txns):
+        day = t.date.toordinal()
+        diffs: Dict[int, int] = {}
+        for s in t.splits:
+            bucket = buckets.get((s.account_id, s.quantity_minor))
+            if not bucket:
+                continue
+            lo = bisect_left(bucket, (day - window_days,))
+            hi = bisect_right(bucket, (day + window_days, float("inf")))
+            for d, txn_id in bucket[lo:hi]:
+                diff = abs(d - day)
+                if diff < diffs.get(txn_id, window_days + 1):
+                    diffs[txn_id] = diff
+        if not diffs:
+            continue
+
+        incoming = normalize(t.description)
+        scored = [
+            DuplicateCandidate(
+                transaction_id=txn_id,
+                score=score(similarity(incoming, descriptions[txn_id][1]), diff, window_days),
+                date_diff_days=diff,
+                description=descriptions[txn_id][0],
+            )
+            for txn_id, diff in diffs.items()
+        ]
+        scored.sort(key=lambda c: (-c.score, c.date_diff_days, c.transaction_id))
+        candidates[i] = scored[:MAX_CANDIDATES]
+        edges.extend(
+            (-c.score, c.date_diff_days, i, c.transaction_id) for c in scored if c.score >= threshold
+        )
+
+    duplicate_of: Dict[int, int] = {}
+    for i, t in enumerate(txns):
+        if t.import_ref in refs:
+            duplicate_of[i] = refs[t.import_ref]
+    exact = set(duplicate_of)
+    claimed = set(duplicate_of.values())
+    for _, _, i, txn_id in sorted(edges):
+        if i not in duplicate_of and txn_id not in claimed:
+            duplicate_of[i] = txn_id
+            claimed.add(txn_id)
+
+    return [
+        DuplicateCheckRow(
+            index=i, duplicate_of=duplicate_of.get(i), exact=i in exact, candidates=candidates.get(i, []),
+        )
+        for i in sorted(set(candidates) | set(duplicate_of))
+    ]
+
+
+def check(
+    db: Session,
+    txns: Sequence[TransactionCreate],
+    window_days: int = 3,
+    threshold: float = 0.75,
+) -> DuplicateCheckResult:
+    started = time.perf_counter()
+    rows = find_duplicates(db, txns, window_days, threshold)
+    return DuplicateCheckResult(
+        checked=len(txns),
+        duplicates=sum(1 for r in rows if r.duplicate_of is not None),
+        rows=rows,
+        duration_s=round(time.perf_counter() - started, 4),
+    )
@@ -0,0 +1,220 @@
+"""Streaming ledger export as NDJSON or CSV.
+
+Rows are read with yield_per, so only one batch is held at a time, and are
+encoded into chunks of roughly CHUNK_BYTES. Transactions are streamed as a join
+with their splits in transaction order, and consecutive rows are folded into
+one record. Server memory stays flat whatever the size of the book.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy.orm import Session, aliased, sessionmaker
+from sqlalchemy import exists, select
+from fastapi import HTTPException
+
+from ..config import settings
+from ..models.account import Account
+from ..models.change import Change
+from ..models.commodity import Price
+from ..models.transaction import Transaction, Split
+from . import account_service, change_service
+
+KINDS = ("all", "accounts", "prices", "transactions")
+FORMATS = ("ndjson", "csv")
+CHUNK_BYTES = 64 * 1024
+
+ACCOUNT_COLUMNS = ("id", "name", "full_name", "account_type", "description", "placeholder", "commodity_id",
+                   "parent_id")
+PRICE_COLUMNS = ("id", "date", "commodity_id", "currency_id", "numerator", "denominator", "source")
+TRANSACTION_COLUMNS = ("id", "date", "description", "notes", "import_ref", "currency_id")
+SPLIT_COLUMNS = ("id", "account_id", "value_minor", "quantity_minor", "memo", "reconciled")
+# One CSV row per split, with its transaction's columns repeated
+SPLIT_CSV_COLUMNS = tuple(f"transaction_{c}" for c in TRANSACTION_COLUMNS) + tuple(f"split_{c}" for c in SPLIT_COLUMNS)
+
+
+@dataclass
+class ExportFilter:
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+    account_id: Optional[int] = None
+    subtree: bool = False  # with all accounts below account_id
+    changed_since: Optional[int] = None  # change-log seq; only entities written after it
+
+
+def make_filter(
+    db: Session,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    account_id: Optional[int] = None,
+    subtree: bool = False,
+    changed_since: Optional[int] = None,
+) -> ExportFilter:
+    if account_id is not None:
+        account_service.get_account(db, account_id)  # 404 check
+    return ExportFilter(from_date, to_date, account_id, subtree, changed_since)
+
+
+def check_request(kind: str, fmt: str) -> None:
+    if kind not in KINDS:
+        raise HTTPException(status_code=422, detail=f"kind must be one of {', '.join(KINDS)}")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "csv" and kind == "all":
+        raise HTTPException(status_code=422, detail="CSV holds one table; choose accounts, prices or transactions")
+
+
+def _changed(entity: str, since: int):
+    return select(Change.entity_id).where(Change.entity == entity, Change.seq > since)
+
+
+def _in_scope(column, f: ExportFilter):
+    """column is the filter's account, or one below it when subtree is set.
+
+    The subtree is walked by a recursive CTE, so no list of ids is bound; a large
+    subtree cannot exceed the parameter limit once the stream has started.
+    """
+    if not f.subtree:
+        return column == f.account_id
+    tree = select(Account.id).where(Account.id == f.account_id).cte("subtree", recursive=True)
+    child = aliased(Account)
+    tree = tree.union_all(select(child.id).where(child.parent_id == tree.c.id))
+    return column.in_(select(tree.c.id))
+
+
+def _stream(db: Session, stmt):
+    return db.execute(stmt.execution_options(yield_per=settings.export_batch_size))
+
+
+def iter_accounts(db: Session, f: ExportFilter) -> Iterator[Dict[str, Any]]:
+    stmt = select(*(getattr(Account, c) for c in ACCOUNT_COLUMNS)).order_by(Account.id)
+    if f.account_id is not None:
+        stmt = stmt.where(_in_scope(Account.id, f))
+    if f.changed_since is not None:
+        stmt = stmt.where(Account.id.in_(_changed("account", f.changed_since)))
+    for row in _stream(db, stmt):
+        record = dict(zip(ACCOUNT_COLUMNS, row))
+        record["account_type"] = record["account_type"].value
+        yield record
+
+
+def iter_prices(db: Session, f: ExportFilter) -> Iterator[Dict[str, Any]]:
+    stmt = select(*(getattr(Price, c) for c in PRICE_COLUMNS)).order_by(Price.id)
+    if f.from_date is not None:
+        stmt = stmt.where(Price.date >= f.from_date)
+    if f.to_date is not None:
+        stmt = stmt.where(Price.date <= f.to_date)
+    if f.changed_since is not None:
+        stmt = stmt.where(Price.id.in_(_changed("price", f.changed_since)))
+    for row in _stream(db, stmt):
+        yield dict(zip(PRICE_COLUMNS, row))
+
+
+def iter_transactions(db: Session, f: ExportFilter) -> Iterator[Dict[str, Any]]:
+    """Transactions with all their splits, in id order."""
+    stmt = (
+        select(*(getattr(Transaction, c) for c in TRANSACTION_COLUMNS), *(getattr(Split, c) for c in SPLIT_COLUMNS))
+        .join(Transaction, Transaction.id == Split.transaction_id)
+        .order_by(Split.transaction_id, Split.id)
+    )
+    if f.from_date is not None:
+        stmt = stmt.where(Transaction.date >= f.from_date)
+    if f.to_date is not None:
+        stmt = stmt.where(Transaction.date <= f.to_date)
+    if f.account_id is not None:
+        own = aliased(Split)
+        stmt = stmt.where(exists().where(own.transaction_id == Transaction.id, _in_scope(own.account_id, f)))
+    if f.changed_since is not None:
+        stmt = stmt.where(Transaction.id.in_(_changed("transaction", f.changed_since)))
+
+    n = len(TRANSACTION_COLUMNS)
+    current: Optional[Dict[str, Any]] = None
+    for row in _stream(db, stmt):
+        if current is None or current["id"] != row[0]:
+            if current is not None:
+                yield current
+            current = dict(zip(TRANSACTION_COLUMNS, row[:n]))
+            current["splits"] = []
+        current["splits"].append(dict(zip(SPLIT_COLUMNS, row[n:])))
+    if current is not None:
+        yield current
+
+
+def iter_deletions(db: Session, f: ExportFilter) -> Iterator[Dict[str, Any]]:
+    stmt = (
+        select(Change.seq, Change.entity, Change.entity_id)
+        .where(Change.seq > f.changed_since, Change.op == change_service.DELETE)
+        .order_by(Change.seq)
+    )
+    for seq, entity, entity_id in _stream(db, stmt):
+        yield {"seq": seq, "entity": entity, "id": entity_id}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_lines(db: Session, kind: str, f: ExportFilter) -> Iterator[str]:
+    sources = []
+    if kind in ("all", "accounts"):
+        sources.append(("account", iter_accounts))
+    if kind in ("all", "prices"):
+        sources.append(("price", iter_prices))
+    if kind in ("all", "transactions"):
+        sources.append(("transaction", iter_transactions))
+    if kind == "all" and f.changed_since is not None:
+        sources.append(("deleted", iter_deletions))
+    for record_type, source in sources:
+        for record in source(db, f):
+            yield json.dumps({"type": record_type, **record}, default=_json_default, separators=(",", ":")) + "\n"
+
+
+def _csv_rows(db: Session, kind: str, f: ExportFilter) -> Iterator[List[Any]]:
+    if kind == "accounts":
+        yield list(ACCOUNT_COLUMNS)
+        for record in iter_accounts(db, f):
+            yield [record[c] for c in ACCOUNT_COLUMNS]
+    elif kind == "prices":
+        yield list(PRICE_COLUMNS)
+        for record in iter_prices(db, f):
+            yield [record[c] for c in PRICE_COLUMNS]
+    else:
+        yield list(SPLIT_CSV_COLUMNS)
+        for txn in iter_transactions(db, f):
+            head = [txn[c] for c in TRANSACTION_COLUMNS]
+            for split in txn["splits"]:
+                yield head + [split[c] for c in SPLIT_COLUMNS]
+
+
+def _csv_lines(db: Session, kind: str, f: ExportFilter) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in _csv_rows(db, kind, f):
+        writer.writerow(row)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def export_chunks(factory: sessionmaker, kind: str, fmt: str, f: ExportFilter) -> Iterator[bytes]:
+    """Encoded export in chunks of about CHUNK_BYTES, read in its own session."""
+    db = factory()
+    try:
+        lines = _ndjson_lines(db, kind, f) if fmt == "ndjson" else _csv_lines(db, kind, f)
+        parts: List[str] = []
+        size = 0
+        for line in lines:
+            parts.append(line)
+            size += len(line)
+            if size >= CHUNK_BYTES:
+                yield "".join(parts).encode()
+                parts, size = [], 0
+        if parts:
+            yield "".join(parts).encode()
+    finally:
+        db.close()
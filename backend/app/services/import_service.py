@@ -0,0 +1,82 @@
+"""Batch transaction import with duplicate detection."""
+import time
+from typing import List
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from fastapi import HTTPException
+
+from ..models.transaction import Transaction, Split, date_keys, split_date_keys
+from ..schemas.imports import ImportRequest, ImportResult
+from ..schemas.transaction import TransactionCreate
+from .transaction_service import _check_splits
+from . import change_service, close_service, duplicate_service, lot_service, rule_service
+
+
+def _validate(txns: List[TransactionCreate]) -> None:
+    refs = set()
+    for i, t in enumerate(txns):
+        _check_splits(t.splits, f"Row {i}: ")
+        if t.import_ref:
+            if t.import_ref in refs:
+                raise HTTPException(status_code=422, detail=f"Row {i}: import_ref {t.import_ref!r} repeated")
+            refs.add(t.import_ref)
+
+
+def insert_transactions(db: Session, txns: List[TransactionCreate]) -> List[int]:
+    """Bulk-insert validated transactions without committing; returns their ids in order."""
+    if not txns:
+        return []
+    close_service.check_open(db, min(t.date for t in txns))
+    inserted = db.execute(
+        insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+        [
+            {"date": t.date, **date_keys(t.date), "description": t.description, "notes": t.notes,
+             "import_ref": t.import_ref, "currency_id": t.currency_id}
+            for t in txns
+        ],
+    ).all()
+    ids = [txn_id for (txn_id,) in inserted]
+
+    split_rows = []
+    for txn_id, t in zip(ids, txns):
+        keys = split_date_keys(t.date)
+        split_rows.extend(
+            {"transaction_id": txn_id, "account_id": s.account_id, "value_minor": s.value_minor,
+             "quantity_minor": s.quantity_minor, "memo": s.memo, "reconciled": s.reconciled, **keys}
+            for s in t.splits
+        )
+    db.execute(insert(Split), split_rows)
+    change_service.record_many(db, "transaction", [
+        (txn_id, [s.account_id for s in t.splits], [t.date]) for txn_id, t in zip(ids, txns)
+    ])
+    lot_service.mark_dirty(
+        db, {s.account_id for t in txns for s in t.splits}, min(t.date for t in txns)
+    )
+    return ids
+
+
+def import_transactions(db: Session, data: ImportRequest) -> ImportResult:
+    """Import a batch in one commit, skipping detected duplicates unless told otherwise.
+
+    Rows are categorized by the rules first when uncategorized_account_id is set.
+    Rows whose import_ref already exists are always skipped, since the column is unique.
+    """
+    started = time.perf_counter()
+    txns = data.transactions
+    _validate(txns)
+    categorized = 0
+    if data.uncategorized_account_id is not None:
+        applied = rule_service.apply_to_incoming(db, txns, data.uncategorized_account_id)
+        txns, categorized = applied.transactions, len(applied.matches)
+    rows = duplicate_service.find_duplicates(db, txns, data.window_days, data.threshold)
+    skipped = [r for r in rows if r.exact or (data.skip_duplicates and r.duplicate_of is not None)]
+    skip = {r.index for r in skipped}
+    ids = insert_transactions(db, [t for i, t in enumerate(txns) if i not in skip])
+    db.commit()
+    return ImportResult(
+        created_ids=ids,
+        categorized=categorized,
+        skipped=skipped,
+        duration_s=round(time.perf_counter() - started, 4),
+    )
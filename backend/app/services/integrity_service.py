@@ -0,0 +1,276 @@
+"""Ledger integrity verification with incremental per-month checksums.
+
+Months are fingerprinted with one grouped SQL query over their date ranges.
+An incremental run only fingerprints the months named by transaction changes
+logged since the stored checksums (plus months that failed, and the month the
+last archive cut through); every other month keeps its stored checksum. Months
+whose fingerprint differs from the stored one are re-verified by streaming
+their splits in transaction order. Writes made with direct SQL bypass the
+change log and are only seen by a full run. Month checksums roll up into
+per-year and root hashes, so two books can be compared by their root. Orphan,
+empty transaction, full_name and commodity checks are cheap anti-joins and
+always run in full.
+"""
+import hashlib
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy import BigInteger, cast, delete, exists, extract, false, func, insert, or_, select, update
+
+from ..config import settings
+from ..dialect import period_start
+from ..models.account import Account
+from ..models.change import Change
+from ..models.commodity import Commodity, Price
+from ..models.integrity import LedgerChecksum
+from ..models.transaction import Transaction, Split, day_number
+from ..schemas.integrity import IntegrityIssue, IntegrityReport
+from . import change_service, close_service
+
+MAX_LISTED_ISSUES = 500
+# Per-split terms are reduced modulo a prime so month sums cannot overflow int64
+_MOD = 2147483647
+
+
+def _month(column):
+    return period_start("%Y-%m-01", column)
+
+
+def _month_days(month: str) -> Tuple[int, int]:
+    start = date.fromisoformat(month)
+    end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    return day_number(start), day_number(end)
+
+
+def _in_months(months: Iterable[str]):
+    """Split date ranges of the given months, so the date index does the selecting."""
+    return or_(false(), *(Split.date_num.between(*_month_days(m)) for m in sorted(months)))
+
+
+def month_fingerprints(db: Session, months: Optional[Iterable[str]] = None) -> Dict[str, Tuple[str, int]]:
+    """{month: (checksum, split_count)} for the given (default: all) months that have splits."""
+    # 64-bit arithmetic: PostgreSQL would overflow int4 products instead of widening
+    term = (
+        cast(Split.id, BigInteger) * 1000003
+        + cast(Split.transaction_id, BigInteger) * 7919
+        + cast(Split.account_id, BigInteger) * 104729
+        + cast(Split.value_minor, BigInteger) % _MOD * 31
+        + cast(Split.quantity_minor, BigInteger) % _MOD * 17
+        + cast(Transaction.currency_id, BigInteger) * 13
+        + cast(extract("day", Transaction.date), BigInteger)
+    ) % _MOD
+    q = (
+        db.query(
+            _month(Transaction.date).label("period"),
+            func.count(Split.id),
+            func.sum(term),
+            func.sum(Split.value_minor),
+            func.sum(Split.quantity_minor),
+        )
+        .join(Transaction, Transaction.id == Split.transaction_id)
+    )
+    if months is not None:
+        q = q.filter(_in_months(months))
+    rows = q.group_by("period").all()
+    return {
+        period: (hashlib.sha256(f"{count}:{terms}:{value}:{qty}".encode()).hexdigest(), count)
+        for period, count, terms, value, qty in rows
+    }
+
+
+def checksum_tree(months: Dict[str, str]) -> Tuple[Dict[str, str], Optional[str]]:
+    """Roll month checksums up into ({year: checksum}, root checksum)."""
+    years: Dict[str, List[str]] = {}
+    for period in sorted(months):
+        years.setdefault(period[:4], []).append(months[period])
+    year_sums = {y: hashlib.sha256("".join(h).encode()).hexdigest() for y, h in years.items()}
+    if not year_sums:
+        return {}, None
+    root = hashlib.sha256("".join(year_sums[y] for y in sorted(year_sums)).encode()).hexdigest()
+    return year_sums, root
+
+
+class _Issues:
+    def __init__(self):
+        self.listed: List[IntegrityIssue] = []
+        self.count = 0
+
+    def add(self, kind: str, entity: str, entity_id: int, detail: str) -> None:
+        self.count += 1
+        if len(self.listed) < MAX_LISTED_ISSUES:
+            self.listed.append(IntegrityIssue(kind=kind, entity=entity, entity_id=entity_id, detail=detail))
+
+
+def _check_transactions(db: Session, months: List[str], issues: _Issues) -> Tuple[int, set]:
+    """Stream the given months' splits and check every transaction sums to zero.
+
+    Returns (splits scanned, months with a failing transaction).
+    """
+    if not months:
+        return 0, set()
+    stmt = (
+        select(Split.transaction_id, Split.value_minor, _month(Transaction.date))
+        .join(Transaction, Transaction.id == Split.transaction_id)
+        .where(_in_months(months))
+        .order_by(Split.transaction_id)
+        .execution_options(yield_per=settings.verify_batch_size)
+    )
+    scanned = 0
+    bad_months = set()
+    current, total, count, period = None, 0, 0, None
+
+    def finish():
+        if current is None:
+            return
+        if total != 0:
+            issues.add("zero_sum", "transaction", current, f"sum(value_minor) = {total}")
+            bad_months.add(period)
+        if count < 2:
+            issues.add("too_few_splits", "transaction", current, f"{count} split")
+            bad_months.add(period)
+
+    for txn_id, value, month in db.execute(stmt):
+        scanned += 1
+        if txn_id != current:
+            finish()
+            current, total, count, period = txn_id, 0, 0, month
+        total += value
+        count += 1
+    finish()
+    return scanned, bad_months
+
+
+def _check_references(db: Session, issues: _Issues) -> None:
+    txn_ids = select(Transaction.id)
+    account_ids = select(Account.id)
+    commodity_ids = select(Commodity.id)
+
+    # Split streaming never sees a transaction without splits
+    has_splits = exists().where(Split.transaction_id == Transaction.id)
+    for (txn_id,) in db.query(Transaction.id).filter(~has_splits):
+        issues.add("too_few_splits", "transaction", txn_id, "0 splits")
+
+    for (split_id,) in db.query(Split.id).filter(Split.transaction_id.not_in(txn_ids)):
+        issues.add("orphan_split", "split", split_id, "transaction does not exist")
+    for split_id, account_id in db.query(Split.id, Split.account_id).filter(Split.account_id.not_in(account_ids)):
+        issues.add("orphan_split", "split", split_id, f"account {account_id} does not exist")
+    for txn_id, currency_id in db.query(Transaction.id, Transaction.currency_id).filter(
+        Transaction.currency_id.not_in(commodity_ids)
+    ):
+        issues.add("dangling_commodity", "transaction", txn_id, f"currency {currency_id} does not exist")
+    for price_id, a, b in db.query(Price.id, Price.commodity_id, Price.currency_id).filter(
+        Price.commodity_id.not_in(commodity_ids) | Price.currency_id.not_in(commodity_ids)
+    ):
+        issues.add("dangling_commodity", "price", price_id, f"commodity {a} or currency {b} does not exist")
+
+
+def _check_accounts(db: Session, issues: _Issues) -> None:
+    """full_name must be the parent chain's names joined by ':'; commodities must exist."""
+    commodities = {c for (c,) in db.query(Commodity.id)}
+    accounts = {
+        a.id: a
+        for a in db.query(Account.id, Account.name, Account.full_name, Account.parent_id, Account.commodity_id)
+    }
+    for a in accounts.values():
+        if a.commodity_id not in commodities:
+            issues.add("dangling_commodity", "account", a.id, f"commodity {a.commodity_id} does not exist")
+        parts, seen, current = [], set(), a
+        while current is not None:
+            if current.id in seen:
+                issues.add("parent_cycle", "account", a.id, "parent chain loops")
+                break
+            seen.add(current.id)
+            parts.append(current.name)
+            if current.parent_id is not None and current.parent_id not in accounts:
+                issues.add("orphan_account", "account", a.id, f"parent {current.parent_id} does not exist")
+                break
+            current = accounts.get(current.parent_id) if current.parent_id is not None else None
+        else:
+            expected = ":".join(reversed(parts))
+            if a.full_name != expected:
+                issues.add("full_name", "account", a.id, f"{a.full_name!r} should be {expected!r}")
+
+
+def _changed_months(db: Session, since_seq: int) -> Optional[Set[str]]:
+    """Months named by transaction changes after since_seq; None if one did not say."""
+    months: Set[str] = set()
+    for (changed,) in db.query(Change.months).filter(Change.seq > since_seq, Change.entity == "transaction"):
+        if changed is None:
+            return None
+        months.update(changed)
+    return months
+
+
+def verify(db: Session, full: bool = False) -> IntegrityReport:
+    """Verify the ledger; with full=False, months unchanged since the last run are skipped."""
+    started = time.perf_counter()
+    issues = _Issues()
+
+    seq = change_service.latest_seq(db)
+    stored = {
+        row.period.isoformat(): row
+        for row in db.query(LedgerChecksum.period, LedgerChecksum.checksum, LedgerChecksum.split_count,
+                            LedgerChecksum.change_seq)
+    }
+    recheck = None
+    if not full and stored:
+        recheck = _changed_months(db, max(row.change_seq for row in stored.values()))
+    if recheck is None:
+        current = month_fingerprints(db)
+    else:
+        recheck |= {m for m, row in stored.items() if not row.checksum}
+        archived = close_service.archived_through(db)
+        if archived is not None:
+            # Archiving removes whole months before this one and part of it
+            cutoff = archived.replace(day=1).isoformat()
+            recheck.add(cutoff)
+            stored_months = {m: row for m, row in stored.items() if m >= cutoff}
+        else:
+            stored_months = stored
+        current = {m: (row.checksum, row.split_count) for m, row in stored_months.items() if m not in recheck}
+        current.update(month_fingerprints(db, recheck))
+    dirty = sorted(
+        m for m, (checksum, _) in current.items() if full or m not in stored or stored[m].checksum != checksum
+    )
+
+    scanned, bad_months = _check_transactions(db, dirty, issues)
+    _check_references(db, issues)
+    _check_accounts(db, issues)
+    if dirty or set(stored) - set(current) or any(row.change_seq != seq for row in stored.values()):
+        _store_checksums(db, seq, current, stored, dirty, bad_months)
+
+    _, root = checksum_tree({m: c for m, (c, _) in current.items()})
+    return IntegrityReport(
+        ok=issues.count == 0,
+        issues=issues.listed,
+        issue_count=issues.count,
+        months_total=len(current),
+        months_verified=len(dirty),
+        months_skipped=len(current) - len(dirty),
+        splits_scanned=scanned,
+        root_checksum=root,
+        duration_s=round(time.perf_counter() - started, 4),
+    )
+
+
+def _store_checksums(db: Session, seq: int, current, stored, dirty: List[str], bad_months: set) -> None:
+    """Save verified months (failing ones with an empty checksum) and move every row to seq."""
+    gone = [date.fromisoformat(m) for m in stored if m not in current]
+    if gone:
+        db.execute(delete(LedgerChecksum).where(LedgerChecksum.period.in_(gone)))
+    now = datetime.utcnow()
+    rows = [
+        {"period": date.fromisoformat(m), "checksum": "" if m in bad_months else current[m][0],
+         "split_count": current[m][1], "verified_at": now, "change_seq": seq}
+        for m in dirty
+    ]
+    updates = [r for r in rows if r["period"].isoformat() in stored]
+    inserts = [r for r in rows if r["period"].isoformat() not in stored]
+    if updates:
+        db.execute(update(LedgerChecksum), updates)
+    if inserts:
+        db.execute(insert(LedgerChecksum), inserts)
+    db.execute(update(LedgerChecksum).values(change_seq=seq))
+    db.commit()
@@ -0,0 +1,239 @@
+"""Background report jobs run in a bounded process pool."""
+import inspect
+import json
+import multiprocessing
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import settings
+from ..database import _make_engine
+from ..schemas.job import JobRead
+from . import refdata_service, report_service
+
+
+# Report entry points, keyed by job kind. Parameter names match the HTTP query
+# parameters of the corresponding /reports endpoint.
+
+def _pnl(db: Session, from_date: str, to_date: str, group_by: str = "month",
+         reporting_currency: str = settings.default_reporting_currency):
+    return report_service.get_pnl(db, from_date, to_date, group_by, reporting_currency)
+
+
+def _balance_history(db: Session, account_id: int, from_date: str, to_date: str,
+                     group_by: str = "month", reporting_currency: str = settings.default_reporting_currency):
+    return report_service.get_balance_history(
+        db, account_id, from_date, to_date, group_by, reporting_currency
+    )
+
+
+def _net_worth(db: Session, reporting_currency: str = settings.default_reporting_currency):
+    return report_service.get_net_worth(db, reporting_currency)
+
+
+def _budget_vs_actual(db: Session, budget_id: int, from_date: str, to_date: str,
+                      group_by: str = "month", rollup: bool = False,
+                      reporting_currency: str = settings.default_reporting_currency):
+    return report_service.get_budget_vs_actual(
+        db, budget_id, from_date, to_date, group_by, reporting_currency, rollup
+    )
+
+
+REPORTS = {
+    "pnl": _pnl,
+    "balance-history": _balance_history,
+    "net-worth": _net_worth,
+    "budget-vs-actual": _budget_vs_actual,
+}
+
+# Worker-process engine cache, one per book URL
+_worker_engines: Dict[str, sessionmaker] = {}
+
+
+def _run_report(db_url: str, kind: str, params: Dict[str, Any]) -> str:
+    """Executed in a worker process; returns the report as JSON text."""
+    factory = _worker_engines.get(db_url)
+    if factory is None:
+        # Per-dialect connect arguments and pooling, as the server's own engines
+        factory = _worker_engines[db_url] = sessionmaker(bind=_make_engine(db_url))
+    # Workers never see the server's commits, so reference data is reloaded per job
+    refdata_service.invalidate(factory.kw["bind"])
+    db = factory()
+    try:
+        return REPORTS[kind](db, **params).model_dump_json()
+    except HTTPException as exc:
+        # Re-raise as a plain exception so it pickles back to the parent cleanly
+        raise ValueError(exc.detail) from None
+    finally:
+        db.close()
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    key: str
+    submitted_at: datetime
+    future: Future
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    expired: bool = False
+
+    @property
+    def status(self) -> str:
+        if self.expired:
+            return "expired"
+        if self.error is not None:
+            return "failed"
+        if self.finished_at is not None:
+            return "done"
+        return "running" if self.future.running() else "queued"
+
+    def read(self) -> JobRead:
+        status = self.status
+        return JobRead(
+            id=self.id,
+            kind=self.kind,
+            status=status,
+            progress={"queued": 0.0, "running": 0.5}.get(status, 1.0),
+            submitted_at=self.submitted_at,
+            finished_at=self.finished_at,
+            error=self.error,
+        )
+
+
+class JobManager:
+    """Submits reports to a ProcessPoolExecutor and keeps results in a size-bounded store.
+
+    Identical submissions (same book, kind and parameters) that are still pending
+    share one job. Finished results are evicted oldest-first once the store
+    exceeds max_store_bytes; their jobs then report status "expired". Finished
+    jobs themselves are forgotten (404) after ttl, or oldest-first beyond
+    max_jobs of them. A pool broken by a crashed worker is replaced.
+    """
+
+    def __init__(self, max_workers: int, max_store_bytes: int, max_jobs: int = 1000,
+                 ttl: timedelta = timedelta(hours=1)):
+        self.max_workers = max_workers
+        self.max_store_bytes = max_store_bytes
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, datetime]" = OrderedDict()  # job id -> finished_at, oldest first
+        self._pending: Dict[str, str] = {}  # dedup key -> job id
+        self._results: "OrderedDict[str, str]" = OrderedDict()
+        self._store_bytes = 0
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a threaded server process is unsafe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, db_url: str, kind: str, params: Dict[str, Any]) -> Job:
+        fn = REPORTS.get(kind)
+        if fn is None:
+            raise HTTPException(status_code=422, detail=f"Unknown report kind: {kind}")
+        try:
+            inspect.signature(fn).bind(None, **params)
+        except TypeError as exc:
+            raise HTTPException(status_code=422, detail=f"Invalid parameters for {kind}: {exc}")
+        if ":memory:" in db_url or db_url.endswith("://"):
+            raise HTTPException(status_code=400, detail="Report jobs need a file-backed book")
+
+        key = json.dumps([db_url, kind, params], sort_keys=True, default=str)
+        with self._lock:
+            self._prune(datetime.utcnow())
+            pending_id = self._pending.get(key)
+            if pending_id is not None:
+                return self._jobs[pending_id]
+
+            pool = self._pool()
+            try:
+                future = pool.submit(_run_report, db_url, kind, params)
+            except BrokenProcessPool:
+                # A worker died since the last submission; start a fresh pool
+                self._executor = None
+                pool = self._pool()
+                future = pool.submit(_run_report, db_url, kind, params)
+            job = Job(id=uuid.uuid4().hex, kind=kind, key=key, submitted_at=datetime.utcnow(), future=future)
+            self._jobs[job.id] = job
+            self._pending[key] = job.id
+        future.add_done_callback(lambda f, job_id=job.id, pool=pool: self._finish(job_id, f, pool))
+        return job
+
+    def _finish(self, job_id: str, future: Future, pool: Optional[ProcessPoolExecutor] = None) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            self._pending.pop(job.key, None)
+            job.finished_at = datetime.utcnow()
+            self._prune(job.finished_at, room=1)
+            self._finished[job_id] = job.finished_at
+            exc = future.exception()
+            if isinstance(exc, BrokenProcessPool) and self._executor is pool:
+                # The crashed pool fails every later submit; the next one starts afresh
+                self._executor = None
+            if exc is not None:
+                job.error = str(exc) or type(exc).__name__
+                return
+            result = future.result()
+            self._results[job_id] = result
+            self._store_bytes += len(result)
+            while self._store_bytes > self.max_store_bytes and len(self._results) > 1:
+                old_id, old = self._results.popitem(last=False)
+                self._store_bytes -= len(old)
+                self._jobs[old_id].expired = True
+
+    def _prune(self, now: datetime, room: int = 0) -> None:
+        """Forget expired finished jobs and leave room for `room` more; called with the lock held."""
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if len(self._finished) + room <= self.max_jobs and now - finished_at < self.ttl:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
+            result = self._results.pop(job_id, None)
+            if result is not None:
+                self._store_bytes -= len(result)
+
+    def get(self, job_id: str) -> Job:
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+
+    def result(self, job_id: str) -> str:
+        job = self.get(job_id)
+        status = job.status
+        if status == "expired":
+            raise HTTPException(status_code=410, detail="Job result expired")
+        if status == "failed":
+            raise HTTPException(status_code=422, detail=job.error)
+        if status != "done":
+            raise HTTPException(status_code=409, detail=f"Job is {status}")
+        return self._results[job_id]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+jobs = JobManager(
+    settings.report_job_workers,
+    settings.report_job_store_mb * 1024 * 1024,
+    settings.report_job_keep,
+    timedelta(minutes=settings.report_job_ttl_min),
+)
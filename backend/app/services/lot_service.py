@@ -0,0 +1,456 @@
+"""Investment lots: cost basis and realized gains for security accounts.
+
+Every split that adds quantity to an account holding a non-currency commodity
+opens a lot; every split that removes quantity is matched against open lots
+first-in-first-out, last-in-first-out or at average cost. Lots and disposals are
+persisted. Transaction writes mark an account dirty from the split's date, and
+the account is replayed from the dirty date onward when the writing session
+commits, so reads always see current lots and never write.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy import case, delete, event, func, insert, update
+from fastapi import HTTPException
+
+from ..config import settings
+from ..dialect import period_start
+from ..models.account import Account
+from ..models.commodity import Commodity, CURRENCY_NAMESPACE
+from ..models.lot import CostMethod, LotAccount, Lot, LotDisposal
+from ..models.transaction import Transaction, Split
+from ..schemas.lot import (
+    RealizedGainRow, RealizedGainReport, UnrealizedGainRow, UnrealizedGainReport,
+)
+from . import close_service, refdata_service, report_service
+
+# Replaying from here recomputes an account from scratch
+_BEGINNING = date(1, 1, 1)
+# Session.info key: security accounts to replay when the session commits
+_DIRTY = "lots_dirty"
+
+
+def mark_dirty(db: Session, account_ids: Iterable[int], since: date) -> None:
+    """Record that splits dated `since` or later changed in these accounts.
+
+    Only security accounts are tracked; one whose first split this is starts
+    with a full replay. The replay itself runs when db commits.
+    """
+    if since is None:
+        return
+    refdata = refdata_service.get(db)
+    ids = sorted(
+        a for a in set(account_ids)
+        if a in refdata.accounts
+        and refdata.commodities[refdata.accounts[a].commodity_id].namespace != CURRENCY_NAMESPACE
+    )
+    if not ids:
+        return
+    tracked = {a for (a,) in db.query(LotAccount.account_id).filter(LotAccount.account_id.in_(ids))}
+    db.add_all(
+        LotAccount(account_id=a, method=CostMethod(settings.lot_default_method), dirty_from=_BEGINNING)
+        for a in ids if a not in tracked
+    )
+    db.execute(
+        update(LotAccount)
+        .where(LotAccount.account_id.in_(sorted(tracked)))
+        .values(dirty_from=case(
+            (LotAccount.dirty_from.is_(None), since),
+            (LotAccount.dirty_from > since, since),
+            else_=LotAccount.dirty_from,
+        ))
+        .execution_options(synchronize_session=False)
+    )
+    db.info.setdefault(_DIRTY, set()).update(ids)
+
+
+def security_accounts(db: Session, account_ids: Optional[Iterable[int]] = None) -> Dict[int, Account]:
+    q = (
+        db.query(Account)
+        .join(Commodity, Commodity.id == Account.commodity_id)
+        .filter(Commodity.namespace != CURRENCY_NAMESPACE)
+    )
+    if account_ids is not None:
+        q = q.filter(Account.id.in_(list(account_ids)))
+    return {a.id: a for a in q}
+
+
+def get_state(db: Session, account_id: int) -> LotAccount:
+    """The account's lot state; an untracked account gets an unsaved one that is due a full replay."""
+    if account_id not in security_accounts(db, [account_id]):
+        raise HTTPException(status_code=422, detail=f"Account {account_id} does not hold a security")
+    state = db.get(LotAccount, account_id)
+    if state is None:
+        state = LotAccount(
+            account_id=account_id, method=CostMethod(settings.lot_default_method), dirty_from=_BEGINNING
+        )
+    return state
+
+
+def _tracked_state(db: Session, account_id: int) -> LotAccount:
+    state = get_state(db, account_id)
+    if state not in db:
+        db.add(state)
+        db.flush()
+    return state
+
+
+def set_method(db: Session, account_id: int, method: CostMethod) -> LotAccount:
+    """Change the cost method and replay the account.
+
+    Splits through the last archived close are gone, so their disposals keep
+    the method they were matched with.
+    """
+    state = _tracked_state(db, account_id)
+    if state.method != method:
+        state.method = method
+        state.dirty_from = _BEGINNING
+        db.info.setdefault(_DIRTY, set()).add(account_id)
+    db.commit()
+    return db.get(LotAccount, account_id)
+
+
+def refresh(db: Session, account_ids: Optional[Iterable[int]] = None) -> List[LotAccount]:
+    """Start tracking and replay the given (default: all) security accounts, without committing."""
+    states = [_tracked_state(db, account_id) for account_id in security_accounts(db, account_ids)]
+    for state in states:
+        if state.dirty_from is not None:
+            _recompute(db, state)
+    return states
+
+
+def recompute(db: Session, account_id: Optional[int] = None) -> List[LotAccount]:
+    """Replay security accounts from scratch, e.g. ones with splits from before lots were tracked."""
+    if account_id is not None:
+        get_state(db, account_id)  # 422 check
+    states = [
+        _tracked_state(db, acct_id) for acct_id in security_accounts(db, None if account_id is None else [account_id])
+    ]
+    for state in states:
+        state.dirty_from = _BEGINNING
+        _recompute(db, state)
+    db.commit()
+    return [db.get(LotAccount, state.account_id) for state in states]
+
+
+def _replay_dirty(db: Session, account_ids: Iterable[int]) -> None:
+    db.flush()
+    for account_id in sorted(account_ids):
+        # mark_dirty's UPDATE bypasses the identity map
+        state = db.get(LotAccount, account_id, populate_existing=True)
+        if state is not None and state.dirty_from is not None:
+            _recompute(db, state)
+
+
+@event.listens_for(Session, "before_commit")
+def _replay_on_commit(session):
+    account_ids = session.info.pop(_DIRTY, None)
+    if account_ids:
+        _replay_dirty(session, account_ids)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_on_rollback(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_DIRTY, None)
+
+
+def _recompute(db: Session, state: LotAccount) -> None:
+    """Replay one account's splits dated on or after state.dirty_from."""
+    account_id, since = state.account_id, state.dirty_from
+    # Archived splits cannot be replayed; their lots and disposals stay as persisted
+    archived = close_service.archived_through(db)
+    if archived is not None and since <= archived:
+        since = archived + timedelta(days=1)
+
+    # Roll persisted state back to just before `since`
+    db.execute(delete(LotDisposal).where(LotDisposal.account_id == account_id, LotDisposal.date >= since))
+    db.execute(delete(Lot).where(Lot.account_id == account_id, Lot.opened >= since))
+    used = dict(
+        db.query(LotDisposal.lot_id, func.sum(LotDisposal.quantity_minor))
+        .filter(LotDisposal.account_id == account_id, LotDisposal.lot_id.is_not(None))
+        .group_by(LotDisposal.lot_id)
+    )
+    used_cost = dict(
+        db.query(LotDisposal.lot_id, func.sum(LotDisposal.cost_minor))
+        .filter(LotDisposal.account_id == account_id, LotDisposal.lot_id.is_not(None))
+        .group_by(LotDisposal.lot_id)
+    )
+    lots = [
+        {
+            "id": lot.id,
+            "opened": lot.opened,
+            "currency_id": lot.currency_id,
+            "remaining_minor": lot.quantity_minor - used.get(lot.id, 0),
+            "remaining_cost_minor": lot.cost_minor - used_cost.get(lot.id, 0),
+        }
+        for lot in db.query(Lot).filter(Lot.account_id == account_id).order_by(Lot.opened, Lot.id)
+    ]
+
+    if state.method == CostMethod.AVERAGE:
+        _reaverage(lots)
+
+    splits = (
+        db.query(Split.id, Split.quantity_minor, Split.value_minor, Transaction.date, Transaction.currency_id)
+        .join(Transaction, Transaction.id == Split.transaction_id)
+        .filter(Split.account_id == account_id, Transaction.date >= since)
+        .order_by(Transaction.date, Transaction.id, Split.id)
+        .all()
+    )
+    disposals = []
+    for split in splits:
+        if split.quantity_minor > 0:
+            lot = Lot(
+                account_id=account_id,
+                split_id=split.id,
+                opened=split.date,
+                currency_id=split.currency_id,
+                quantity_minor=split.quantity_minor,
+                cost_minor=split.value_minor,
+                remaining_minor=split.quantity_minor,
+                remaining_cost_minor=split.value_minor,
+            )
+            db.add(lot)
+            db.flush()
+            lots.append({
+                "id": lot.id, "opened": lot.opened, "currency_id": lot.currency_id,
+                "remaining_minor": lot.quantity_minor, "remaining_cost_minor": lot.cost_minor,
+            })
+            if state.method == CostMethod.AVERAGE:
+                _reaverage(lots)
+        elif split.quantity_minor < 0:
+            disposals.extend(_dispose(state.method, lots, account_id, split))
+
+    if disposals:
+        db.execute(insert(LotDisposal), disposals)
+    if lots:
+        db.execute(update(Lot), [
+            {"id": lot["id"], "remaining_minor": lot["remaining_minor"],
+             "remaining_cost_minor": lot["remaining_cost_minor"]}
+            for lot in lots
+        ])
+    state.dirty_from = None
+    db.flush()
+    db.expire_all()
+
+
+def _reaverage(lots: List[dict]) -> None:
+    """Spread the account's remaining cost over its open lots by quantity.
+
+    Under average cost every open lot carries the pool's average, so drawing a
+    lot down proportionally takes cost out at the average. The pool total is
+    what persisted lots and disposals preserve exactly, which is what lets an
+    incremental replay rebuild this state.
+    """
+    pool_qty = sum(lot["remaining_minor"] for lot in lots)
+    pool_cost = sum(lot["remaining_cost_minor"] for lot in lots)
+    spread = 0
+    open_lots = [lot for lot in lots if lot["remaining_minor"] > 0]
+    for lot in lots:
+        if lot["remaining_minor"] <= 0 or pool_qty <= 0:
+            lot["remaining_cost_minor"] = 0
+        elif lot is open_lots[-1]:
+            lot["remaining_cost_minor"] = pool_cost - spread
+        else:
+            lot["remaining_cost_minor"] = round(pool_cost * lot["remaining_minor"] / pool_qty)
+            spread += lot["remaining_cost_minor"]
+
+
+def _dispose(method: CostMethod, lots: List[dict], account_id: int, split) -> List[dict]:
+    """Match a selling split against open lots, mutating their remaining amounts.
+
+    Average cost draws lots down oldest first, like FIFO, but every lot already
+    carries the average cost.
+    """
+    to_sell = -split.quantity_minor
+    proceeds_total = -split.value_minor
+    open_lots = [lot for lot in lots if lot["remaining_minor"] > 0]
+    if method == CostMethod.LIFO:
+        open_lots.reverse()
+
+    rows = []
+    sold = 0
+    allocated = 0
+    for lot in open_lots:
+        if sold == to_sell:
+            break
+        qty = min(lot["remaining_minor"], to_sell - sold)
+        if qty == lot["remaining_minor"]:
+            cost = lot["remaining_cost_minor"]
+        else:
+            cost = round(lot["remaining_cost_minor"] * qty / lot["remaining_minor"])
+        lot["remaining_minor"] -= qty
+        lot["remaining_cost_minor"] -= cost
+        sold += qty
+        rows.append((lot["id"], qty, cost))
+
+    if method == CostMethod.AVERAGE:
+        _reaverage(lots)
+    if sold < to_sell:
+        rows.append((None, to_sell - sold, 0))
+
+    out = []
+    for lot_id, qty, cost in rows:
+        # The last row takes the rounding remainder so proceeds add up exactly
+        proceeds = (
+            proceeds_total - allocated if len(out) == len(rows) - 1
+            else round(proceeds_total * qty / to_sell)
+        )
+        allocated += proceeds
+        out.append({
+            "account_id": account_id,
+            "lot_id": lot_id,
+            "split_id": split.id,
+            "date": split.date,
+            "currency_id": split.currency_id,
+            "quantity_minor": qty,
+            "cost_minor": cost,
+            "proceeds_minor": proceeds,
+            "gain_minor": proceeds - cost,
+        })
+    return out
+
+
+def list_lots(db: Session, account_id: Optional[int] = None, include_closed: bool = False) -> List[Lot]:
+    q = db.query(Lot)
+    if account_id is not None:
+        q = q.filter(Lot.account_id == account_id)
+    if not include_closed:
+        q = q.filter(Lot.remaining_minor != 0)
+    return q.order_by(Lot.account_id, Lot.opened, Lot.id).all()
+
+
+def realized_gains(
+    db: Session,
+    from_date: str,
+    to_date: str,
+    group_by: str,
+    reporting_currency_mnemonic: str,
+    account_id: Optional[int] = None,
+) -> RealizedGainReport:
+    rc = report_service._get_reporting_currency(db, reporting_currency_mnemonic)
+    period_fmt = {"day": "%Y-%m-%d", "year": "%Y-01-01"}.get(group_by, "%Y-%m-01")
+
+    q = (
+        db.query(
+            LotDisposal.account_id,
+            Account.full_name,
+            LotDisposal.currency_id,
+            period_start(period_fmt, LotDisposal.date).label("period"),
+            func.sum(LotDisposal.quantity_minor).label("qty"),
+            func.sum(LotDisposal.proceeds_minor).label("proceeds"),
+            func.sum(LotDisposal.cost_minor).label("cost"),
+        )
+        .join(Account, Account.id == LotDisposal.account_id)
+        .filter(LotDisposal.date >= from_date, LotDisposal.date <= to_date)
+    )
+    if account_id is not None:
+        q = q.filter(LotDisposal.account_id == account_id)
+    grouped = q.group_by(LotDisposal.account_id, Account.full_name, LotDisposal.currency_id, "period").all()
+
+    price_cache: dict = {}
+    totals: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+    names = {}
+    for row in grouped:
+        convert = report_service._convert_to_reporting
+        proceeds = convert(row.proceeds, row.currency_id, rc.id, row.period, price_cache, db)
+        cost = convert(row.cost, row.currency_id, rc.id, row.period, price_cache, db)
+        acc = totals[(row.account_id, row.period)]
+        acc[0] += row.qty
+        acc[1] += proceeds
+        acc[2] += cost
+        names[row.account_id] = row.full_name
+
+    rows = [
+        RealizedGainRow(
+            account_id=account_id_,
+            account_name=names[account_id_],
+            period=period,
+            quantity_minor=qty,
+            proceeds_minor=proceeds,
+            cost_minor=cost,
+            gain_minor=proceeds - cost,
+            reporting_currency=reporting_currency_mnemonic,
+        )
+        for (account_id_, period), (qty, proceeds, cost) in sorted(
+            totals.items(), key=lambda kv: (names[kv[0][0]], kv[0][1])
+        )
+    ]
+    return RealizedGainReport(
+        rows=rows, reporting_currency=reporting_currency_mnemonic, from_date=from_date, to_date=to_date,
+    )
+
+
+def unrealized_gains(
+    db: Session, as_of: date, reporting_currency_mnemonic: str, account_id: Optional[int] = None,
+) -> UnrealizedGainReport:
+    """Quantity held at the end of as_of, valued at the latest price on or before it, against its cost basis.
+
+    Holdings are the lots opened by then less what was disposed of by then.
+    """
+    rc = report_service._get_reporting_currency(db, reporting_currency_mnemonic)
+    as_of_str = as_of.isoformat()
+
+    opened = (
+        db.query(
+            Lot.account_id, Lot.currency_id, func.sum(Lot.quantity_minor), func.sum(Lot.cost_minor),
+        )
+        .filter(Lot.opened <= as_of)
+    )
+    disposed = (
+        db.query(
+            Lot.account_id, Lot.currency_id,
+            -func.sum(LotDisposal.quantity_minor), -func.sum(LotDisposal.cost_minor),
+        )
+        .join(Lot, Lot.id == LotDisposal.lot_id)
+        .filter(LotDisposal.date <= as_of)
+    )
+    if account_id is not None:
+        opened = opened.filter(Lot.account_id == account_id)
+        disposed = disposed.filter(Lot.account_id == account_id)
+    held: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+    for q in (opened, disposed):
+        for acct_id, currency_id, qty, cost in q.group_by(Lot.account_id, Lot.currency_id):
+            held[(acct_id, currency_id)][0] += qty
+            held[(acct_id, currency_id)][1] += cost
+    grouped = [
+        (acct_id, currency_id, qty, cost) for (acct_id, currency_id), (qty, cost) in held.items() if qty != 0
+    ]
+
+    accounts = security_accounts(db, {row[0] for row in grouped})
+    fractions = dict(db.query(Commodity.id, Commodity.fraction))
+    price_cache: dict = {}
+    convert = report_service._convert_to_reporting
+    by_account: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for acct_id, currency_id, qty, cost in grouped:
+        by_account[acct_id][0] += qty
+        by_account[acct_id][1] += convert(cost, currency_id, rc.id, as_of_str, price_cache, db)
+
+    rows = []
+    for acct_id, (qty, cost) in by_account.items():
+        account = accounts[acct_id]
+        # Prices are per whole unit, so scale between the two commodities' fractions
+        market = round(
+            convert(qty * rc.fraction, account.commodity_id, rc.id, as_of_str, price_cache, db)
+            / fractions[account.commodity_id]
+        )
+        rows.append(UnrealizedGainRow(
+            account_id=acct_id,
+            account_name=account.full_name,
+            commodity_id=account.commodity_id,
+            quantity_minor=qty,
+            cost_minor=cost,
+            market_value_minor=market,
+            gain_minor=market - cost,
+        ))
+    rows.sort(key=lambda r: r.account_name)
+    return UnrealizedGainReport(
+        rows=rows,
+        as_of=as_of,
+        reporting_currency=reporting_currency_mnemonic,
+        cost_minor=sum(r.cost_minor for r in rows),
+        market_value_minor=sum(r.market_value_minor for r in rows),
+        gain_minor=sum(r.gain_minor for r in rows),
+    )
@@ -0,0 +1,40 @@
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.commodity import Price
+from ..schemas.commodity import PriceCreate
+from . import change_service, refdata_service
+
+
+def list_prices(db: Session) -> List[Price]:
+    return db.query(Price).order_by(Price.date.desc()).all()
+
+
+def _create_price(db: Session, data: PriceCreate) -> Price:
+    """Add and flush a price without committing."""
+    price = Price(**data.model_dump())
+    db.add(price)
+    db.flush()
+    change_service.record(db, "price", price.id)
+    return price
+
+
+def create_price(db: Session, data: PriceCreate) -> Price:
+    price = _create_price(db, data)
+    db.commit()
+    db.refresh(price)
+    return price
+
+
+def latest_price(db: Session, from_currency: str, to_currency: str) -> Optional[Price]:
+    from_c = refdata_service.commodity_by_mnemonic(db, from_currency)
+    to_c = refdata_service.commodity_by_mnemonic(db, to_currency)
+    if from_c is None or to_c is None:
+        return None
+    return (
+        db.query(Price)
+        .filter(Price.commodity_id == from_c.id, Price.currency_id == to_c.id)
+        .order_by(Price.date.desc())
+        .first()
+    )
@@ -0,0 +1,154 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, update
+from fastapi import HTTPException
+
+from ..models.transaction import Transaction, Split
+from ..schemas.reconcile import (
+    StatementLine, StatementMatch, StatementMatchResult, ReconcileBalances,
+)
+from . import change_service
+
+RECONCILE_STATES = ("n", "c", "y")
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def set_state(
+    db: Session, split_ids: List[int], state: str, account_id: Optional[int] = None
+) -> int:
+    """Flip the reconciled flag of many splits, one UPDATE per chunk of ids. Returns rows changed."""
+    if state not in RECONCILE_STATES:
+        raise HTTPException(status_code=422, detail=f"Invalid reconcile state: {state}")
+    split_ids = sorted(set(split_ids))
+    if not split_ids:
+        return 0
+
+    by_txn: dict = {}
+    changed = 0
+    for i in range(0, len(split_ids), _CHUNK):
+        chunk = split_ids[i:i + _CHUNK]
+        stmt = (
+            update(Split)
+            .where(Split.id.in_(chunk), Split.reconciled != state)
+            .values(reconciled=state)
+            .execution_options(synchronize_session=False)
+        )
+        touched = db.query(Split.transaction_id, Split.account_id).filter(
+            Split.id.in_(chunk), Split.reconciled != state
+        )
+        if account_id is not None:
+            stmt = stmt.where(Split.account_id == account_id)
+            touched = touched.filter(Split.account_id == account_id)
+        for txn_id, acct_id in touched:
+            by_txn.setdefault(txn_id, set()).add(acct_id)
+        changed += db.execute(stmt).rowcount
+    # The reconciled flag is not part of the integrity fingerprint, so no months
+    change_service.record_many(db, "transaction", [(txn_id, accts, []) for txn_id, accts in by_txn.items()])
+
+    db.commit()
+    db.expire_all()
+    return changed
+
+
+def get_balances(db: Session, account_id: int) -> ReconcileBalances:
+    """Total, cleared and reconciled balance from one pass over the covering index."""
+    row = (
+        db.query(
+            func.coalesce(func.sum(Split.quantity_minor), 0).label("total"),
+            func.coalesce(
+                func.sum(case((Split.reconciled.in_(["c", "y"]), Split.quantity_minor), else_=0)), 0
+            ).label("cleared"),
+            func.coalesce(
+                func.sum(case((Split.reconciled == "y", Split.quantity_minor), else_=0)), 0
+            ).label("reconciled"),
+        )
+        .filter(Split.account_id == account_id)
+        .one()
+    )
+    return ReconcileBalances(
+        account_id=account_id,
+        total_minor=row.total,
+        cleared_minor=row.cleared,
+        reconciled_minor=row.reconciled,
+    )
+
+
+def _match_lines(
+    lines: List[StatementLine], candidates: List[Tuple[int, int, int, object]], window_days: int
+) -> Tuple[List[StatementMatch], List[int]]:
+    """Match statement lines to candidate splits.
+
+    candidates are (split_id, transaction_id, quantity_minor, date) tuples. They are
+    hashed by amount, each bucket sorted by date, and every line takes the closest
+    unused split in its bucket within the date window.
+    """
+    buckets: Dict[int, List[Tuple[int, object, int, int]]] = defaultdict(list)
+    for split_id, txn_id, amount, d in candidates:
+        buckets[amount].append((d.toordinal(), d, split_id, txn_id))
+    for bucket in buckets.values():
+        bucket.sort()
+
+    matches: List[StatementMatch] = []
+    unmatched: List[int] = []
+    order = sorted(range(len(lines)), key=lambda i: lines[i].date)
+    for i in order:
+        line = lines[i]
+        bucket = buckets.get(line.amount_minor)
+        if not bucket:
+            unmatched.append(i)
+            continue
+        day = line.date.toordinal()
+        pos = bisect_left(bucket, (day,))
+        best = None
+        for j in (pos - 1, pos):
+            if 0 <= j < len(bucket):
+                diff = abs(bucket[j][0] - day)
+                if diff <= window_days and (best is None or diff < best[1]):
+                    best = (j, diff)
+        if best is None:
+            unmatched.append(i)
+            continue
+        _, _, split_id, txn_id = bucket.pop(best[0])
+        matches.append(StatementMatch(
+            line_index=i, split_id=split_id, transaction_id=txn_id, date_diff_days=best[1],
+        ))
+
+    matches.sort(key=lambda m: m.line_index)
+    unmatched.sort()
+    return matches, unmatched
+
+
+def match_statement(
+    db: Session,
+    account_id: int,
+    lines: List[StatementLine],
+    window_days: int = 3,
+    apply: bool = False,
+) -> StatementMatchResult:
+    if not lines:
+        return StatementMatchResult(matches=[], unmatched_lines=[], applied=apply)
+
+    start = min(line.date for line in lines) - timedelta(days=window_days)
+    end = max(line.date for line in lines) + timedelta(days=window_days)
+    candidates = (
+        db.query(Split.id, Split.transaction_id, Split.quantity_minor, Transaction.date)
+        .join(Transaction, Transaction.id == Split.transaction_id)
+        .filter(
+            Split.account_id == account_id,
+            Split.reconciled == "n",
+            Transaction.date >= start,
+            Transaction.date <= end,
+        )
+        .all()
+    )
+
+    matches, unmatched = _match_lines(lines, candidates, window_days)
+    if apply and matches:
+        set_state(db, [m.split_id for m in matches], "c", account_id)
+
+    return StatementMatchResult(matches=matches, unmatched_lines=unmatched, applied=apply)
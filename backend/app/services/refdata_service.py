@@ -0,0 +1,201 @@
+"""In-process cache of commodities and accounts, one snapshot per engine.
+
+Reference data is small and read on almost every request (reporting currency,
+transfer names, account paths and subtrees), so it is loaded once and served
+without SQL. Account and commodity writes call touch() on their session, and the
+snapshot is dropped when that session commits. Until then the writing session
+reads its own uncommitted state straight from the database.
+
+A load is only kept when no invalidation happened since the loading session's
+transaction began, so a snapshot read just before a commit cannot outlive it.
+The cache is per process: job workers, which never see the server's commits,
+call invalidate() before each job.
+"""
+import threading
+import weakref
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models.account import Account, AccountType
+from ..models.commodity import Commodity
+from ..schemas.refdata import RefDataStats
+
+_DIRTY = "refdata_dirty"
+_GENERATION = "refdata_generation"
+
+
+@dataclass(frozen=True)
+class CommodityRef:
+    id: int
+    mnemonic: str
+    name: str
+    fraction: int
+    namespace: str
+
+
+@dataclass(frozen=True)
+class AccountRef:
+    id: int
+    name: str
+    full_name: str
+    account_type: AccountType
+    description: Optional[str]
+    placeholder: bool
+    commodity_id: int
+    parent_id: Optional[int]
+
+
+class RefData:
+    """Immutable snapshot of the commodity and account tables."""
+
+    def __init__(self, commodities: List[CommodityRef], accounts: List[AccountRef]):
+        self.commodities: Dict[int, CommodityRef] = {c.id: c for c in commodities}
+        self.commodities_by_mnemonic: Dict[str, CommodityRef] = {c.mnemonic: c for c in commodities}
+        self.accounts: Dict[int, AccountRef] = {a.id: a for a in accounts}
+        self.accounts_by_path: Dict[str, AccountRef] = {a.full_name: a for a in accounts}
+        children: Dict[int, List[int]] = defaultdict(list)
+        for a in sorted(accounts, key=lambda a: a.full_name):
+            if a.parent_id is not None:
+                children[a.parent_id].append(a.id)
+        self.children: Dict[int, Tuple[int, ...]] = {k: tuple(v) for k, v in children.items()}
+
+    def subtree_ids(self, account_ids: Iterable[int]) -> Set[int]:
+        selected = set(account_ids)
+        stack = list(selected)
+        while stack:
+            for child in self.children.get(stack.pop(), ()):
+                if child not in selected:
+                    selected.add(child)
+                    stack.append(child)
+        return selected
+
+
+class _EngineCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data: Optional[RefData] = None
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+
+
+_caches: "weakref.WeakKeyDictionary[Engine, _EngineCache]" = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def _cache(eng: Engine) -> _EngineCache:
+    cache = _caches.get(eng)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.setdefault(eng, _EngineCache())
+    return cache
+
+
+def _load(db: Session) -> RefData:
+    commodities = [
+        CommodityRef(*row)
+        for row in db.query(Commodity.id, Commodity.mnemonic, Commodity.name, Commodity.fraction, Commodity.namespace)
+    ]
+    accounts = [
+        AccountRef(*row)
+        for row in db.query(
+            Account.id, Account.name, Account.full_name, Account.account_type, Account.description,
+            Account.placeholder, Account.commodity_id, Account.parent_id,
+        )
+    ]
+    return RefData(commodities, accounts)
+
+
+def get(db: Session) -> RefData:
+    """The current snapshot for db's engine, loading it on a miss."""
+    cache = _cache(db.get_bind())
+    if db.info.get(_DIRTY):
+        with cache.lock:
+            cache.misses += 1
+        return _load(db)
+    with cache.lock:
+        data = cache.data
+        if data is not None:
+            cache.hits += 1
+            return data
+        cache.misses += 1
+
+    db.connection()  # begin the session's transaction, recording the generation it saw
+    generation = db.info.get(_GENERATION)
+    data = _load(db)
+    with cache.lock:
+        cache.loads += 1
+        if generation == cache.generation:
+            cache.data = data
+    return data
+
+
+def commodity(db: Session, commodity_id: int) -> Optional[CommodityRef]:
+    return get(db).commodities.get(commodity_id)
+
+
+def commodity_by_mnemonic(db: Session, mnemonic: str) -> Optional[CommodityRef]:
+    return get(db).commodities_by_mnemonic.get(mnemonic)
+
+
+def account(db: Session, account_id: int) -> Optional[AccountRef]:
+    return get(db).accounts.get(account_id)
+
+
+def account_by_path(db: Session, path: str) -> Optional[AccountRef]:
+    """Resolve a colon-separated full name such as "Expenses:Food:Groceries"."""
+    return get(db).accounts_by_path.get(path.strip())
+
+
+def touch(db: Session) -> None:
+    """Record an account or commodity write; the cache is dropped when db commits."""
+    db.info[_DIRTY] = True
+
+
+def invalidate(eng: Engine) -> None:
+    cache = _cache(eng)
+    with cache.lock:
+        cache.data = None
+        cache.generation += 1
+        cache.invalidations += 1
+
+
+def stats(eng: Engine) -> RefDataStats:
+    cache = _cache(eng)
+    with cache.lock:
+        data = cache.data
+        return RefDataStats(
+            hits=cache.hits,
+            misses=cache.misses,
+            loads=cache.loads,
+            invalidations=cache.invalidations,
+            cached=data is not None,
+            commodities=len(data.commodities) if data is not None else 0,
+            accounts=len(data.accounts) if data is not None else 0,
+        )
+
+
+@event.listens_for(Session, "after_begin")
+def _remember_generation(session, transaction, connection):
+    if transaction.parent is None:
+        session.info[_GENERATION] = _cache(connection.engine).generation
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(_DIRTY, False):
+        invalidate(session.get_bind())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_on_rollback(session, transaction):
+    # Savepoints ending do not discard the outer transaction's writes
+    if transaction.parent is None:
+        session.info.pop(_DIRTY, None)
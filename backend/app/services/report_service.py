@@ -1,15 +1,58 @@
-from typing import Dict, List
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import Float, and_, case, cast, func, select
+from fastapi import HTTPException
 
-from ..models.account import Account, AccountType
-from ..models.transaction import Transaction, Split
-from ..models.commodity import Commodity, Price
-from ..schemas.reports import PnLRow, PnLReport, BalancePoint, BalanceHistory, NetWorthSnapshot
+from ..models.account import AccountType
+from ..models.transaction import Transaction, Split, day_number, from_day_number
+from ..models.commodity import Price
+from ..models.budget import BudgetAmount
+from ..schemas.reports import (
+    PnLRow, PnLReport, BalancePoint, BalanceHistory, NetWorthSnapshot,
+    BudgetVsActualRow, BudgetVsActualReport,
+    CashFlowRow, SankeyNode, SankeyLink, CashFlowReport,
+    AccountBalanceRow, CommodityTotal, TrialBalance,
+)
+from . import account_service, budget_service, close_service, refdata_service
 
+# Accounts whose natural balance is a credit; their actuals are sign-flipped for budgeting
+CREDIT_NORMAL = (AccountType.INCOME, AccountType.LIABILITY, AccountType.EQUITY)
 
-def _get_reporting_currency(db: Session, mnemonic: str) -> Commodity:
-    c = db.query(Commodity).filter(Commodity.mnemonic == mnemonic).first()
+
+def _split_archived(db: Session, from_date: str, to_date: str, group_by: str):
+    """Split a report range at the archive boundary.
+
+    Returns (archived_range or None, first date still held in the live tables).
+    Archived rows only survive as monthly totals, so daily grouping cannot reach them.
+    """
+    archived = close_service.archived_range(db, from_date, to_date)
+    if archived is None:
+        return None, from_date
+    if group_by == "day":
+        raise HTTPException(
+            status_code=422,
+            detail=f"Transactions through {archived[1]} are archived; group by month or year",
+        )
+    return archived, close_service.day_after(archived[1])
+
+
+def _period_key(group_by: str):
+    """Stored split key to group a period on, and how to label a key as the period's first day."""
+    if group_by == "month":
+        return Split.month_key, lambda k: f"{k // 100:04d}-{k % 100:02d}-01"
+    if group_by == "year":
+        return Split.month_key // 100, lambda y: f"{y:04d}-01-01"
+    return Split.date_num, lambda n: from_day_number(n).isoformat()
+
+
+def _in_range(from_date, to_date, split=Split):
+    return and_(split.date_num >= day_number(from_date), split.date_num <= day_number(to_date))
+
+
+def _get_reporting_currency(db: Session, mnemonic: str) -> refdata_service.CommodityRef:
+    c = refdata_service.commodity_by_mnemonic(db, mnemonic)
     if c is None:
         raise ValueError(f"Unknown reporting currency: {mnemonic}")
     return c
@@ -78,44 +121,50 @@ def get_pnl(
     rc = _get_reporting_currency(db, reporting_currency_mnemonic)
 
     if group_by == "month":
-        period_expr = func.strftime("%Y-%m-01", Transaction.date)
+        period_fmt = "%Y-%m-01"
     elif group_by == "year":
-        period_expr = func.strftime("%Y-01-01", Transaction.date)
+        period_fmt = "%Y-01-01"
     else:
-        period_expr = func.strftime("%Y-%m-%d", Transaction.date)
+        period_fmt = "%Y-%m-%d"
+    pnl_types = [AccountType.INCOME, AccountType.EXPENSE]
+    archived, live_from = _split_archived(db, from_date, to_date, group_by)
+    period_key, label = _period_key(group_by)
+
+    accounts = {a.id: a for a in refdata_service.get(db).accounts.values() if a.account_type in pnl_types}
 
+    # Grouped on the splits' stored keys, so each account is one index range scan
     rows_raw = (
         db.query(
-            Account.id,
-            Account.full_name,
-            Account.account_type,
-            Account.commodity_id,
-            period_expr.label("period"),
+            Split.account_id,
+            period_key.label("period"),
             func.sum(Split.quantity_minor).label("total_qty"),
         )
-        .join(Split, Split.account_id == Account.id)
-        .join(Transaction, Transaction.id == Split.transaction_id)
-        .filter(
-            Account.account_type.in_([AccountType.INCOME, AccountType.EXPENSE]),
-            Transaction.date >= from_date,
-            Transaction.date <= to_date,
-        )
-        .group_by(Account.id, Account.full_name, Account.account_type, Account.commodity_id, "period")
+        .filter(Split.account_id.in_(sorted(accounts)), _in_range(live_from, to_date))
+        .group_by(Split.account_id, "period")
         .all()
     )
 
+    totals: Dict[tuple, int] = defaultdict(int)
+    for row in rows_raw:
+        totals[(row.account_id, label(row.period))] += row.total_qty
+    if archived is not None:
+        closed = close_service.closed_totals(db, period_fmt, *archived, account_types=pnl_types)
+        for row in closed:
+            totals[(row.account_id, row.period)] += row.total_qty
+
     price_cache: dict = {}
     pnl_rows: list[PnLRow] = []
-    for row in rows_raw:
+    for (account_id, period), total_qty in totals.items():
+        acct = accounts[account_id]
         converted = _convert_to_reporting(
-            row.total_qty, row.commodity_id, rc.id, row.period, price_cache, db
+            total_qty, acct.commodity_id, rc.id, period, price_cache, db
         )
         pnl_rows.append(
             PnLRow(
-                account_id=row.id,
-                account_name=row.full_name,
-                account_type=row.account_type.value,
-                period=row.period,
+                account_id=account_id,
+                account_name=acct.full_name,
+                account_type=acct.account_type.value,
+                period=period,
                 amount_minor=converted,
                 reporting_currency=reporting_currency_mnemonic,
             )
@@ -137,52 +186,42 @@ def get_balance_history(
     group_by: str,
     reporting_currency_mnemonic: str,
 ) -> BalanceHistory:
-    account = db.get(Account, account_id)
+    account = refdata_service.account(db, account_id)
     if account is None:
         raise ValueError(f"Account {account_id} not found")
 
     rc = _get_reporting_currency(db, reporting_currency_mnemonic)
 
-    if group_by == "month":
-        period_expr = func.strftime("%Y-%m-01", Transaction.date)
-    elif group_by == "year":
-        period_expr = func.strftime("%Y-01-01", Transaction.date)
-    else:
-        period_expr = func.strftime("%Y-%m-%d", Transaction.date)
-
-    # Opening balance before from_date
-    opening = (
-        db.query(func.coalesce(func.sum(Split.quantity_minor), 0))
-        .join(Transaction, Split.transaction_id == Transaction.id)
-        .filter(Split.account_id == account_id, Transaction.date < from_date)
-        .scalar()
-        or 0
-    )
+    period_key, label = _period_key(group_by)
+    archived, live_from = _split_archived(db, from_date, to_date, group_by)
 
-    period_deltas = (
-        db.query(period_expr.label("period"), func.sum(Split.quantity_minor).label("delta"))
-        .join(Transaction, Split.transaction_id == Transaction.id)
-        .filter(
-            Split.account_id == account_id,
-            Transaction.date >= from_date,
-            Transaction.date <= to_date,
-        )
+    # Opening balance before from_date, from the latest closing snapshot
+    opening = close_service.opening_balances(db, from_date, [account_id]).get(account_id, 0)
+
+    deltas: Dict[str, int] = defaultdict(int)
+    for key, delta in (
+        db.query(period_key.label("period"), func.sum(Split.quantity_minor).label("delta"))
+        .filter(Split.account_id == account_id, _in_range(live_from, to_date))
         .group_by("period")
-        .order_by("period")
-        .all()
-    )
+    ):
+        deltas[label(key)] += delta
+    if archived is not None:
+        for row in close_service.closed_totals(
+            db, "%Y-01-01" if group_by == "year" else "%Y-%m-01", *archived, account_ids=[account_id]
+        ):
+            deltas[row.period] += row.total_qty
 
     price_cache: dict = {}
     points: list[BalancePoint] = []
     running = opening
-    for row in period_deltas:
-        running += row.delta
+    for period in sorted(deltas):
+        running += deltas[period]
         converted = _convert_to_reporting(
-            running, account.commodity_id, rc.id, row.period, price_cache, db
+            running, account.commodity_id, rc.id, period, price_cache, db
         )
         points.append(
             BalancePoint(
-                period=row.period,
+                period=period,
                 balance_minor=converted,
                 reporting_currency=reporting_currency_mnemonic,
             )
@@ -199,18 +238,11 @@ def get_balance_history(
 def get_net_worth(db: Session, reporting_currency_mnemonic: str) -> NetWorthSnapshot:
     rc = _get_reporting_currency(db, reporting_currency_mnemonic)
 
-    rows = (
-        db.query(
-            Account.id,
-            Account.account_type,
-            Account.commodity_id,
-            func.coalesce(func.sum(Split.quantity_minor), 0).label("balance"),
-        )
-        .outerjoin(Split, Split.account_id == Account.id)
-        .filter(Account.account_type.in_([AccountType.ASSET, AccountType.LIABILITY]))
-        .group_by(Account.id, Account.account_type, Account.commodity_id)
-        .all()
-    )
+    rows = [
+        a for a in refdata_service.get(db).accounts.values()
+        if a.account_type in (AccountType.ASSET, AccountType.LIABILITY)
+    ]
+    balances = close_service.opening_balances(db, None, [row.id for row in rows])
 
     from datetime import date as date_cls
     today = date_cls.today().isoformat()
@@ -220,7 +252,7 @@ def get_net_worth(db: Session, reporting_currency_mnemonic: str) -> NetWorthSnap
 
     for row in rows:
         converted = _convert_to_reporting(
-            row.balance, row.commodity_id, rc.id, today, price_cache, db
+            balances.get(row.id, 0), row.commodity_id, rc.id, today, price_cache, db
         )
         if row.account_type == AccountType.ASSET:
             assets += converted
@@ -233,3 +265,327 @@ def get_net_worth(db: Session, reporting_currency_mnemonic: str) -> NetWorthSnap
         net_worth_minor=assets + liabilities,
         reporting_currency=reporting_currency_mnemonic,
     )
+
+
+def get_trial_balance(
+    db: Session,
+    as_of: Optional[date],
+    reporting_currency_mnemonic: str,
+    account_ids: Optional[List[int]] = None,
+) -> TrialBalance:
+    """Balances as of the end of `as_of` from one grouped aggregate, split into debit/credit.
+
+    Without account_ids every account with a nonzero balance is listed; with them,
+    exactly those accounts are. Conversion uses the latest prices on or before as_of.
+    """
+    rc = _get_reporting_currency(db, reporting_currency_mnemonic)
+    by_id = refdata_service.get(db).accounts
+    if account_ids is not None:
+        missing = set(account_ids) - by_id.keys()
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Account {min(missing)} not found")
+    selected = by_id.values() if account_ids is None else [by_id[i] for i in set(account_ids)]
+    accounts = sorted(selected, key=lambda a: a.full_name)
+
+    as_of_str = as_of.isoformat() if as_of is not None else None
+    before = close_service.day_after(as_of_str) if as_of_str else None
+    balances = close_service.opening_balances(db, before, account_ids)
+
+    rate_date = as_of_str or date.today().isoformat()
+    price_cache: dict = {}
+    rows: List[AccountBalanceRow] = []
+    native: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for a in accounts:
+        balance = balances.get(a.id, 0)
+        if balance == 0 and account_ids is None:
+            continue
+        converted = _convert_to_reporting(balance, a.commodity_id, rc.id, rate_date, price_cache, db)
+        rows.append(AccountBalanceRow(
+            account_id=a.id,
+            full_name=a.full_name,
+            account_type=a.account_type.value,
+            commodity_id=a.commodity_id,
+            balance_minor=balance,
+            reporting_balance_minor=converted,
+            debit_minor=max(converted, 0),
+            credit_minor=max(-converted, 0),
+        ))
+        native[a.commodity_id][0 if balance > 0 else 1] += abs(balance)
+
+    total_debit = sum(r.debit_minor for r in rows)
+    total_credit = sum(r.credit_minor for r in rows)
+    return TrialBalance(
+        as_of=as_of_str,
+        reporting_currency=reporting_currency_mnemonic,
+        rows=rows,
+        total_debit_minor=total_debit,
+        total_credit_minor=total_credit,
+        difference_minor=total_debit - total_credit,
+        balanced=total_debit == total_credit,
+        commodity_totals=[
+            CommodityTotal(commodity_id=c, debit_minor=d, credit_minor=cr, balanced=d == cr)
+            for c, (d, cr) in sorted(native.items())
+        ],
+    )
+
+
+def get_budget_vs_actual(
+    db: Session,
+    budget_id: int,
+    from_date: str,
+    to_date: str,
+    group_by: str,
+    reporting_currency_mnemonic: str,
+    rollup: bool = False,
+) -> BudgetVsActualReport:
+    """Join a budget against actuals aggregated per account and month in one grouped query.
+
+    Budgets and actuals are in the account's commodity and converted at the period's
+    price; credit-normal accounts report actuals as positive amounts. With rollup,
+    every account's row sums budgets and actuals over its whole subtree.
+    """
+    budget = budget_service.get_budget(db, budget_id)
+    rc = _get_reporting_currency(db, reporting_currency_mnemonic)
+
+    accounts = refdata_service.get(db).accounts
+    month_from = from_date[:8] + "01"
+    cells = (
+        db.query(BudgetAmount.account_id, BudgetAmount.period, BudgetAmount.amount_minor)
+        .filter(
+            BudgetAmount.budget_id == budget_id,
+            BudgetAmount.period >= month_from,
+            BudgetAmount.period <= to_date,
+        )
+        .all()
+    )
+    budgeted = {c.account_id for c in cells}
+
+    scope = set(budgeted)
+    if rollup:
+        children: Dict[int, List[int]] = defaultdict(list)
+        for a in accounts.values():
+            if a.parent_id is not None:
+                children[a.parent_id].append(a.id)
+        stack = list(budgeted)
+        while stack:
+            for child in children[stack.pop()]:
+                if child not in scope:
+                    scope.add(child)
+                    stack.append(child)
+
+    period_fmt = "%Y-01-01" if group_by == "year" else "%Y-%m-01"
+    archived, live_from = _split_archived(db, from_date, to_date, group_by)
+    actual_rows = []
+    if scope:
+        period_key, label = _period_key("year" if group_by == "year" else "month")
+        actual_rows = [
+            (row.account_id, label(row.period), row.total_qty)
+            for row in db.query(
+                Split.account_id,
+                period_key.label("period"),
+                func.sum(Split.quantity_minor).label("total_qty"),
+            )
+            .filter(Split.account_id.in_(scope), _in_range(live_from, to_date))
+            .group_by(Split.account_id, "period")
+        ]
+        if archived is not None:
+            actual_rows += close_service.closed_totals(db, period_fmt, *archived, account_ids=scope)
+
+    price_cache: dict = {}
+    budget_totals: Dict[tuple, int] = defaultdict(int)
+    actual_totals: Dict[tuple, int] = defaultdict(int)
+
+    def _targets(account_id: int):
+        """The account itself, plus every ancestor when rolling up."""
+        current = account_id
+        while current is not None:
+            yield current
+            if not rollup:
+                return
+            current = accounts[current].parent_id
+
+    for c in cells:
+        period = c.period.strftime(period_fmt)
+        acct = accounts[c.account_id]
+        amount = _convert_to_reporting(
+            c.amount_minor, acct.commodity_id, rc.id, period, price_cache, db
+        )
+        for target in _targets(c.account_id):
+            budget_totals[(target, period)] += amount
+
+    for account_id, period, total_qty in actual_rows:
+        acct = accounts[account_id]
+        amount = _convert_to_reporting(
+            total_qty, acct.commodity_id, rc.id, period, price_cache, db
+        )
+        if acct.account_type in CREDIT_NORMAL:
+            amount = -amount
+        for target in _targets(account_id):
+            actual_totals[(target, period)] += amount
+
+    # Budgeted accounts (and, with rollup, their ancestors) get a row for every period
+    # that has either a budget or an actual
+    with_budget = {account_id for account_id, _ in budget_totals}
+    keys = set(budget_totals) | {k for k in actual_totals if k[0] in with_budget}
+
+    rows: list[BudgetVsActualRow] = []
+    for account_id, period in sorted(keys, key=lambda k: (accounts[k[0]].full_name, k[1])):
+        b = budget_totals.get((account_id, period), 0)
+        a = actual_totals.get((account_id, period), 0)
+        rows.append(
+            BudgetVsActualRow(
+                account_id=account_id,
+                account_name=accounts[account_id].full_name,
+                period=period,
+                budget_minor=b,
+                actual_minor=a,
+                variance_minor=a - b,
+                percent_used=round(a * 100 / b, 2) if b else None,
+                reporting_currency=reporting_currency_mnemonic,
+            )
+        )
+
+    return BudgetVsActualReport(
+        budget_id=budget.id,
+        budget_name=budget.name,
+        rows=rows,
+        reporting_currency=reporting_currency_mnemonic,
+        from_date=from_date,
+        to_date=to_date,
+    )
+
+
+def get_cash_flow(
+    db: Session,
+    account_ids: List[int],
+    from_date: str,
+    to_date: str,
+    group_by: str,
+    reporting_currency_mnemonic: str,
+    subtree: bool = False,
+) -> CashFlowReport:
+    """Inflows and outflows of a set of accounts, by counterpart account and period.
+
+    Each transaction moves a net amount into (or out of) the selected set, and
+    that amount is attributed to the counterparts on the other side in
+    proportion to their values. A salary paid 70/30 into checking and savings
+    is a 70% inflow from income when only checking is selected, and savings
+    (paid by the same income) is not an outflow of checking. Transfers within
+    the set net to zero and are not reported. One grouped query over the
+    counterpart splits, joined to per-transaction net and side totals. Amounts
+    are split values in the transaction currency, converted at the period.
+    """
+    rc = _get_reporting_currency(db, reporting_currency_mnemonic)
+    accounts = refdata_service.get(db).accounts
+    missing = [i for i in account_ids if i not in accounts]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Account {missing[0]} not found")
+    if close_service.archived_range(db, from_date, to_date) is not None:
+        raise HTTPException(
+            status_code=422, detail="Cash flow needs transaction detail, which is archived for this range"
+        )
+
+    selected = account_service.subtree_ids(db, account_ids) if subtree else set(account_ids)
+
+    period_key, label = _period_key(group_by)
+    own = aliased(Split)
+    net = (
+        select(own.transaction_id, func.sum(own.value_minor).label("net"))
+        .where(own.account_id.in_(selected), _in_range(from_date, to_date, own))
+        .group_by(own.transaction_id)
+        .subquery()
+    )
+    other = aliased(Split)
+    sides = (
+        select(
+            other.transaction_id,
+            func.sum(case((other.value_minor < 0, -other.value_minor), else_=0)).label("sources"),
+            func.sum(case((other.value_minor > 0, other.value_minor), else_=0)).label("targets"),
+        )
+        .where(other.account_id.not_in(selected), _in_range(from_date, to_date, other))
+        .group_by(other.transaction_id)
+        .subquery()
+    )
+    counterpart = Split
+    # Floats so value x net cannot overflow; the sums are rounded below
+    inflow = case(
+        (and_(net.c.net > 0, counterpart.value_minor < 0),
+         cast(-counterpart.value_minor, Float) * net.c.net / sides.c.sources),
+        else_=0,
+    )
+    outflow = case(
+        (and_(net.c.net < 0, counterpart.value_minor > 0),
+         cast(counterpart.value_minor, Float) * -net.c.net / sides.c.targets),
+        else_=0,
+    )
+    rows_raw = (
+        db.query(
+            counterpart.account_id,
+            Transaction.currency_id,
+            period_key.label("period"),
+            func.sum(inflow).label("inflow"),
+            func.sum(outflow).label("outflow"),
+        )
+        .join(net, net.c.transaction_id == counterpart.transaction_id)
+        .join(sides, sides.c.transaction_id == counterpart.transaction_id)
+        .join(Transaction, Transaction.id == counterpart.transaction_id)
+        .filter(_in_range(from_date, to_date), counterpart.account_id.not_in(selected))
+        .group_by(counterpart.account_id, Transaction.currency_id, "period")
+        .all()
+    )
+
+    price_cache: dict = {}
+    totals: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0])
+    for row in rows_raw:
+        if not round(row.inflow) and not round(row.outflow):
+            continue  # a counterpart that received none of the selected set's share
+        period = label(row.period)
+        cell = totals[(row.account_id, period)]
+        cell[0] += _convert_to_reporting(round(row.inflow), row.currency_id, rc.id, period, price_cache, db)
+        cell[1] += _convert_to_reporting(round(row.outflow), row.currency_id, rc.id, period, price_cache, db)
+
+    rows: list[CashFlowRow] = []
+    link_totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for (account_id, period), (inflow, outflow) in sorted(
+        totals.items(), key=lambda kv: (accounts[kv[0][0]].full_name, kv[0][1])
+    ):
+        acct = accounts[account_id]
+        rows.append(CashFlowRow(
+            account_id=account_id,
+            account_name=acct.full_name,
+            account_type=acct.account_type.value,
+            period=period,
+            inflow_minor=inflow,
+            outflow_minor=outflow,
+            net_minor=inflow - outflow,
+            reporting_currency=reporting_currency_mnemonic,
+        ))
+        link_totals[account_id][0] += inflow
+        link_totals[account_id][1] += outflow
+
+    # Sankey: sources -> the selected set -> targets; an account that is both a
+    # source and a target gets one node per side so the graph stays acyclic
+    center = SankeyNode(
+        id="selected",
+        name=accounts[account_ids[0]].full_name if len(account_ids) == 1 else "Selected accounts",
+    )
+    nodes = [center]
+    links: list[SankeyLink] = []
+    for account_id, (inflow, outflow) in sorted(link_totals.items(), key=lambda kv: accounts[kv[0]].full_name):
+        name = accounts[account_id].full_name
+        if inflow:
+            nodes.append(SankeyNode(id=f"in:{account_id}", name=name))
+            links.append(SankeyLink(source=f"in:{account_id}", target=center.id, value_minor=inflow))
+        if outflow:
+            nodes.append(SankeyNode(id=f"out:{account_id}", name=name))
+            links.append(SankeyLink(source=center.id, target=f"out:{account_id}", value_minor=outflow))
+
+    return CashFlowReport(
+        account_ids=sorted(selected),
+        rows=rows,
+        nodes=nodes,
+        links=links,
+        reporting_currency=reporting_currency_mnemonic,
+        from_date=from_date,
+        to_date=to_date,
+    )
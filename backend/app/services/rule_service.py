@@ -0,0 +1,265 @@
+"""Auto-categorization rules compiled into one multi-pattern matcher.
+
+All enabled rules' description patterns go into a single Aho-Corasick automaton,
+so each description is scanned once regardless of how many rules exist. The
+patterns found select candidate rules; amount and source-account conditions are
+then checked in priority order and the first passing rule wins.
+
+A transaction is categorizable when it has exactly two splits and one of them
+sits in the uncategorized account: that split is moved to the rule's target and
+the other one is the source the conditions look at.
+"""
+from collections import defaultdict, deque
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import exists, select, update
+from fastapi import HTTPException
+
+from ..models.account import Account
+from ..models.rule import CategoryRule
+from ..models.transaction import Transaction, Split
+from ..schemas.rule import (
+    CategoryRuleCreate, RuleMatch, RuleApplyResult, RuleReapplyRequest, RuleChange, RuleReapplyResult,
+)
+from ..schemas.transaction import TransactionCreate
+from . import change_service, close_service, lot_service, refdata_service
+
+MAX_LISTED_CHANGES = 1000
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+class PatternMatcher:
+    """Aho-Corasick automaton over literal, case-insensitive patterns."""
+
+    def __init__(self, patterns: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for index, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern.lower():
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+
+        # Breadth-first failure links; outputs inherit their failure state's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> Set[int]:
+        """Indexes of every pattern occurring in text."""
+        found: Set[int] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class CompiledRules:
+    def __init__(self, rules: Iterable[CategoryRule]):
+        self.rules = sorted(rules, key=lambda r: (r.priority, r.id))
+        patterns: Dict[str, List[int]] = defaultdict(list)
+        self._always: List[int] = []
+        for position, rule in enumerate(self.rules):
+            if rule.pattern:
+                patterns[rule.pattern.lower()].append(position)
+            else:
+                self._always.append(position)
+        self._positions = list(patterns.values())
+        self._matcher = PatternMatcher(list(patterns))
+
+    def classify(self, description: str, source_account_id: int, amount_minor: int) -> Optional[CategoryRule]:
+        candidates = set(self._always)
+        for pattern in self._matcher.search(description):
+            candidates.update(self._positions[pattern])
+        for position in sorted(candidates):
+            rule = self.rules[position]
+            if rule.source_account_id is not None and rule.source_account_id != source_account_id:
+                continue
+            if rule.min_amount_minor is not None and amount_minor < rule.min_amount_minor:
+                continue
+            if rule.max_amount_minor is not None and amount_minor > rule.max_amount_minor:
+                continue
+            return rule
+        return None
+
+
+def compile_rules(db: Session, uncategorized_account_id: int) -> CompiledRules:
+    """Enabled rules that can move a split out of the uncategorized account.
+
+    A moved split keeps its quantity, so rules whose target is in another
+    commodity are left out, as are rules pointing at accounts that no longer exist.
+    """
+    accounts = refdata_service.get(db).accounts
+    unc = accounts.get(uncategorized_account_id)
+    if unc is None:
+        raise HTTPException(status_code=422, detail=f"Account {uncategorized_account_id} does not exist")
+    rules = [
+        rule for rule in db.query(CategoryRule).filter(CategoryRule.enabled.is_(True))
+        if rule.target_account_id in accounts
+        and accounts[rule.target_account_id].commodity_id == unc.commodity_id
+        and (rule.source_account_id is None or rule.source_account_id in accounts)
+    ]
+    return CompiledRules(rules)
+
+
+def list_rules(db: Session) -> List[CategoryRule]:
+    return db.query(CategoryRule).order_by(CategoryRule.priority, CategoryRule.id).all()
+
+
+def get_rule(db: Session, rule_id: int) -> CategoryRule:
+    rule = db.get(CategoryRule, rule_id)
+    if rule is None:
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return rule
+
+
+def _check_accounts(db: Session, data: CategoryRuleCreate) -> None:
+    for account_id in (data.target_account_id, data.source_account_id):
+        if account_id is not None and db.get(Account, account_id) is None:
+            raise HTTPException(status_code=422, detail=f"Account {account_id} does not exist")
+
+
+def create_rule(db: Session, data: CategoryRuleCreate) -> CategoryRule:
+    _check_accounts(db, data)
+    rule = CategoryRule(**data.model_dump())
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+def update_rule(db: Session, rule_id: int, data: CategoryRuleCreate) -> CategoryRule:
+    rule = get_rule(db, rule_id)
+    _check_accounts(db, data)
+    for field, value in data.model_dump().items():
+        setattr(rule, field, value)
+    db.commit()
+    db.refresh(rule)
+    return rule
+
+
+def delete_rule(db: Session, rule_id: int) -> None:
+    db.delete(get_rule(db, rule_id))
+    db.commit()
+
+
+def apply_to_incoming(
+    db: Session, txns: List[TransactionCreate], uncategorized_account_id: int
+) -> RuleApplyResult:
+    """Categorize incoming rows in one pass; nothing is written."""
+    compiled = compile_rules(db, uncategorized_account_id)
+    out: List[TransactionCreate] = []
+    matches: List[RuleMatch] = []
+    for i, t in enumerate(txns):
+        rule = None
+        if len(t.splits) == 2:
+            in_unc = [s.account_id == uncategorized_account_id for s in t.splits]
+            if in_unc.count(True) == 1:
+                unc = in_unc.index(True)
+                source = t.splits[1 - unc]
+                rule = compiled.classify(t.description, source.account_id, source.quantity_minor)
+        if rule is None:
+            out.append(t)
+            continue
+        splits = list(t.splits)
+        splits[unc] = splits[unc].model_copy(update={"account_id": rule.target_account_id})
+        out.append(t.model_copy(update={"splits": splits}))
+        matches.append(RuleMatch(index=i, rule_id=rule.id, target_account_id=rule.target_account_id))
+    return RuleApplyResult(transactions=out, matches=matches)
+
+
+def _uncategorized(db: Session, data: RuleReapplyRequest):
+    """(split id, transaction id, date, description, source account, source quantity) rows."""
+    unc = aliased(Split)
+    src = aliased(Split)
+    other = aliased(Split)
+    stmt = (
+        select(unc.id, unc.transaction_id, Transaction.date, Transaction.description,
+               src.account_id, src.quantity_minor)
+        .join(Transaction, Transaction.id == unc.transaction_id)
+        .join(src, (src.transaction_id == unc.transaction_id) & (src.id != unc.id))
+        .where(
+            unc.account_id == data.uncategorized_account_id,
+            src.account_id != data.uncategorized_account_id,
+            ~exists().where(
+                other.transaction_id == unc.transaction_id,
+                other.id != unc.id,
+                other.id != src.id,
+            ),
+        )
+    )
+    through = close_service.closed_through(db)
+    if through is not None:
+        stmt = stmt.where(Transaction.date > through)
+    if data.from_date is not None:
+        stmt = stmt.where(Transaction.date >= data.from_date)
+    if data.to_date is not None:
+        stmt = stmt.where(Transaction.date <= data.to_date)
+    return db.execute(stmt.order_by(Transaction.date, unc.id))
+
+
+def reapply(db: Session, data: RuleReapplyRequest) -> RuleReapplyResult:
+    """Re-run rules over splits still in the uncategorized account.
+
+    Splits in closed periods are left alone. Unless dry_run is set, matched
+    splits are moved with one UPDATE per target account.
+    """
+    compiled = compile_rules(db, data.uncategorized_account_id)
+    changes: List[RuleChange] = []
+    by_target: Dict[int, List[int]] = defaultdict(list)
+    touched: List[Tuple[int, List[int], List[date]]] = []
+    first: Optional[date] = None
+    for split_id, txn_id, d, description, source_account_id, amount in _uncategorized(db, data):
+        rule = compiled.classify(description, source_account_id, amount)
+        if rule is None or rule.target_account_id == data.uncategorized_account_id:
+            continue
+        by_target[rule.target_account_id].append(split_id)
+        touched.append((txn_id, [data.uncategorized_account_id, rule.target_account_id, source_account_id], [d]))
+        first = d if first is None else min(first, d)
+        if len(changes) < MAX_LISTED_CHANGES:
+            changes.append(RuleChange(
+                split_id=split_id, transaction_id=txn_id, date=d, description=description,
+                rule_id=rule.id, from_account_id=data.uncategorized_account_id,
+                to_account_id=rule.target_account_id,
+            ))
+
+    matched = len(touched)
+    if not data.dry_run and matched:
+        for target, split_ids in by_target.items():
+            for i in range(0, len(split_ids), _CHUNK):
+                db.execute(
+                    update(Split).where(Split.id.in_(split_ids[i:i + _CHUNK])).values(account_id=target)
+                )
+        change_service.record_many(db, "transaction", touched)
+        lot_service.mark_dirty(db, set(by_target) | {data.uncategorized_account_id}, first)
+        db.commit()
+
+    return RuleReapplyResult(
+        matched=matched,
+        updated=0 if data.dry_run else matched,
+        dry_run=data.dry_run,
+        changes=changes,
+    )
@@ -0,0 +1,243 @@
+import calendar
+from datetime import date, timedelta
+from typing import Iterator, List, Optional, Set
+
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import insert
+from fastapi import HTTPException
+
+from ..models.scheduled import ScheduledTransaction, ScheduledSplit, Frequency
+from ..models.transaction import Transaction, Split, date_keys, split_date_keys
+from ..schemas.scheduled import (
+    ScheduledTransactionCreate, ScheduledOccurrence, ScheduledRunResult, ScheduledSkipped,
+)
+from .transaction_service import _check_splits, _check_zero_sum
+from . import change_service, close_service, lot_service, refdata_service
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _add_months(d: date, months: int) -> date:
+    """Shift by whole months, clamping the day to the end of shorter months."""
+    month_index = d.month - 1 + months
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(d.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def _nth_occurrence(tmpl: ScheduledTransaction, n: int) -> date:
+    step = n * tmpl.interval
+    if tmpl.frequency == Frequency.DAILY:
+        return tmpl.start_date + timedelta(days=step)
+    if tmpl.frequency == Frequency.WEEKLY:
+        return tmpl.start_date + timedelta(weeks=step)
+    if tmpl.frequency == Frequency.MONTHLY:
+        return _add_months(tmpl.start_date, step)
+    return _add_months(tmpl.start_date, 12 * step)
+
+
+def _first_index_after(tmpl: ScheduledTransaction, after: date) -> int:
+    """Smallest n whose occurrence falls strictly after `after`, without walking history."""
+    start = tmpl.start_date
+    if after < start:
+        return 0
+    if tmpl.frequency in (Frequency.DAILY, Frequency.WEEKLY):
+        days = 1 if tmpl.frequency == Frequency.DAILY else 7
+        n = (after - start).days // (days * tmpl.interval)
+    else:
+        months = (after.year - start.year) * 12 + after.month - start.month
+        if tmpl.frequency == Frequency.YEARLY:
+            months //= 12
+        n = max(0, months // tmpl.interval - 1)
+    while _nth_occurrence(tmpl, n) <= after:
+        n += 1
+    return n
+
+
+def occurrences(tmpl: ScheduledTransaction, until: date, after: Optional[date] = None) -> Iterator[date]:
+    """Yield occurrence dates in (after, until], honouring the template's end_date."""
+    last = until if tmpl.end_date is None else min(until, tmpl.end_date)
+    n = 0 if after is None else _first_index_after(tmpl, after)
+    while True:
+        d = _nth_occurrence(tmpl, n)
+        if d > last:
+            return
+        yield d
+        n += 1
+
+
+def occurrence_ref(template_id: int, d: date) -> str:
+    """import_ref for a materialized occurrence; its uniqueness makes runs idempotent."""
+    return f"sched:{template_id}:{d.isoformat()}"
+
+
+def _check_accounts(db: Session, splits: list) -> None:
+    # SQLite does not enforce the splits' foreign keys
+    accounts = refdata_service.get(db).accounts
+    for s in splits:
+        if s.account_id not in accounts:
+            raise HTTPException(status_code=422, detail=f"Account {s.account_id} does not exist")
+
+
+def create_template(db: Session, data: ScheduledTransactionCreate) -> ScheduledTransaction:
+    _check_splits(data.splits)
+    _check_accounts(db, data.splits)
+
+    tmpl = ScheduledTransaction(
+        name=data.name,
+        description=data.description,
+        notes=data.notes,
+        currency_id=data.currency_id,
+        frequency=data.frequency,
+        interval=data.interval,
+        start_date=data.start_date,
+        end_date=data.end_date,
+        enabled=data.enabled,
+        splits=[
+            ScheduledSplit(
+                account_id=s.account_id,
+                value_minor=s.value_minor,
+                quantity_minor=s.quantity_minor,
+                memo=s.memo,
+            )
+            for s in data.splits
+        ],
+    )
+    db.add(tmpl)
+    db.commit()
+    db.refresh(tmpl)
+    return tmpl
+
+
+def get_template(db: Session, template_id: int) -> ScheduledTransaction:
+    tmpl = db.get(ScheduledTransaction, template_id)
+    if tmpl is None:
+        raise HTTPException(status_code=404, detail="Scheduled transaction not found")
+    return tmpl
+
+
+def list_templates(db: Session) -> List[ScheduledTransaction]:
+    return (
+        db.query(ScheduledTransaction)
+        .options(selectinload(ScheduledTransaction.splits))
+        .order_by(ScheduledTransaction.name)
+        .all()
+    )
+
+
+def delete_template(db: Session, template_id: int) -> None:
+    tmpl = get_template(db, template_id)
+    db.delete(tmpl)
+    db.commit()
+
+
+def _existing_refs(db: Session, refs: List[str]) -> Set[str]:
+    found: Set[str] = set()
+    for i in range(0, len(refs), _CHUNK):
+        chunk = refs[i:i + _CHUNK]
+        found.update(
+            r for (r,) in db.query(Transaction.import_ref).filter(Transaction.import_ref.in_(chunk))
+        )
+    return found
+
+
+def _due_templates(db: Session, template_id: Optional[int]) -> List[ScheduledTransaction]:
+    if template_id is not None:
+        return [get_template(db, template_id)]
+    return [t for t in list_templates(db) if t.enabled]
+
+
+def pending_occurrences(
+    db: Session, until: date, template_id: Optional[int] = None
+) -> List[ScheduledOccurrence]:
+    """Occurrences due on or before `until` that have not been materialized yet."""
+    pending = [
+        ScheduledOccurrence(
+            scheduled_transaction_id=tmpl.id,
+            name=tmpl.name,
+            date=d,
+            import_ref=occurrence_ref(tmpl.id, d),
+        )
+        for tmpl in _due_templates(db, template_id)
+        for d in occurrences(tmpl, until, tmpl.generated_through)
+    ]
+    existing = _existing_refs(db, [o.import_ref for o in pending])
+    pending = [o for o in pending if o.import_ref not in existing]
+    pending.sort(key=lambda o: (o.date, o.scheduled_transaction_id))
+    return pending
+
+
+def run_due(db: Session, until: date, template_id: Optional[int] = None) -> ScheduledRunResult:
+    """Materialize every pending occurrence up to `until` in one batched write.
+
+    Occurrences in a closed period, and those of a template whose accounts no
+    longer exist, are skipped and reported; the other templates still run.
+    """
+    templates = {t.id: t for t in _due_templates(db, template_id)}
+    for tmpl in templates.values():
+        _check_zero_sum(tmpl.splits)
+    accounts = refdata_service.get(db).accounts
+    broken = {
+        tmpl.id for tmpl in templates.values() if any(s.account_id not in accounts for s in tmpl.splits)
+    }
+    closed = close_service.closed_through(db)
+
+    skipped: List[ScheduledSkipped] = []
+    pending = []
+    for occ in pending_occurrences(db, until, template_id):
+        if occ.scheduled_transaction_id in broken:
+            skipped.append(ScheduledSkipped(**occ.model_dump(), reason="missing_account"))
+        elif closed is not None and occ.date <= closed:
+            skipped.append(ScheduledSkipped(**occ.model_dump(), reason="closed"))
+        else:
+            pending.append(occ)
+    if pending:
+        txn_rows = []
+        for occ in pending:
+            tmpl = templates[occ.scheduled_transaction_id]
+            txn_rows.append({
+                "date": occ.date,
+                **date_keys(occ.date),
+                "description": tmpl.description,
+                "notes": tmpl.notes,
+                "import_ref": occ.import_ref,
+                "currency_id": tmpl.currency_id,
+            })
+        inserted = db.execute(
+            insert(Transaction).returning(Transaction.id, Transaction.import_ref), txn_rows
+        ).all()
+        ids_by_ref = {ref: txn_id for txn_id, ref in inserted}
+
+        split_rows = []
+        for occ in pending:
+            txn_id = ids_by_ref[occ.import_ref]
+            keys = split_date_keys(occ.date)
+            for s in templates[occ.scheduled_transaction_id].splits:
+                split_rows.append({
+                    "transaction_id": txn_id,
+                    "account_id": s.account_id,
+                    "value_minor": s.value_minor,
+                    "quantity_minor": s.quantity_minor,
+                    "memo": s.memo,
+                    "reconciled": "n",
+                    **keys,
+                })
+        db.execute(insert(Split), split_rows)
+        change_service.record_many(db, "transaction", [
+            (
+                ids_by_ref[occ.import_ref],
+                [s.account_id for s in templates[occ.scheduled_transaction_id].splits],
+                [occ.date],
+            )
+            for occ in pending
+        ])
+        lot_service.mark_dirty(db, {r["account_id"] for r in split_rows}, pending[0].date)
+
+    for tmpl in templates.values():
+        # A broken template catches up once its accounts are fixed
+        if tmpl.id not in broken and (tmpl.generated_through is None or tmpl.generated_through < until):
+            tmpl.generated_through = until
+    db.commit()
+    return ScheduledRunResult(created=len(pending), through=until, skipped=skipped)
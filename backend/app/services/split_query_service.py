@@ -0,0 +1,424 @@
+"""Split queries: a small filter language compiled to indexed, parameterized SQL.
+
+    expr      := conj ("or" conj)*
+    conj      := unary ("and" unary)*
+    unary     := "not" unary | "(" expr ")" | predicate
+    predicate := field op value | field "in" "(" value ("," value)* ")"
+               | field "between" value "and" value
+
+    amount, value     quantity_minor / value_minor in minor units: = != < <= > >= in between
+    date              YYYY-MM-DD, compared on the split's date_num: = != < <= > >= between
+    account           full path or id: = != in, or "under" for the account and its descendants
+    type, commodity   account type / account commodity mnemonic: = != in
+    reconciled        n, c or y: = != in
+    memo, description case-insensitive "contains", or exact =
+
+Account, type and commodity predicates are resolved to account ids from the
+reference data cache. Values are always bound parameters.
+
+Only some top-level (and-ed) predicates can drive an index: an account set seeks
+ix_splits_account_date (narrowed by a date range) or ix_splits_account_quantity
+(narrowed by an amount range), and a date range alone seeks ix_splits_date.
+Everything else (value, reconciled, text, anything under or/not) is checked on
+the rows the chosen path yields, and without a driving predicate that is every
+split. A query's cost is the number of rows its access path examines, counted
+with a LIMIT just past the configured maximum so the check itself stays bounded;
+the cheapest path is chosen and pinned on SQLite with INDEXED BY, and anything
+above the maximum is rejected.
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, not_, or_, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..dialect import indexed_by
+from ..models.account import AccountType
+from ..models.transaction import Split, Transaction, day_number
+from ..schemas.split_query import SplitQueryRequest, SplitQueryRow, SplitQueryTotal, SplitQueryResult
+from . import account_service, refdata_service
+from .reconcile_service import RECONCILE_STATES
+
+_TOKEN = re.compile(r"""
+    (?P<date>\d{4}-\d{2}-\d{2})
+  | (?P<number>-?\d+)
+  | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<op><=|>=|!=|<>|=|<|>)
+  | (?P<punct>[(),])
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+""", re.VERBOSE)
+
+_COMPARISONS = {"=", "!=", "<", "<=", ">", ">="}
+_FIELD_OPS = {
+    "amount": _COMPARISONS | {"in", "between"},
+    "value": _COMPARISONS | {"in", "between"},
+    "date": _COMPARISONS | {"between"},
+    "account": {"=", "!=", "in", "under"},
+    "type": {"=", "!=", "in"},
+    "commodity": {"=", "!=", "in"},
+    "reconciled": {"=", "!=", "in"},
+    "memo": {"=", "!=", "contains"},
+    "description": {"=", "!=", "contains"},
+}
+# Operators that select a contiguous index range (or a few of them)
+_SEEKABLE = {"=", "<", "<=", ">", ">=", "in", "between"}
+
+Value = Union[int, str, date]
+
+
+@dataclass(frozen=True)
+class Predicate:
+    field: str
+    op: str
+    values: Tuple[Value, ...]
+
+
+@dataclass(frozen=True)
+class BoolOp:
+    op: str  # and, or, not
+    args: Tuple["Node", ...]
+
+
+@dataclass(frozen=True)
+class AccessPath:
+    index: Optional[str]  # None: a full scan of splits
+    seek: Tuple  # the clauses the index range is built from
+
+
+Node = Union[Predicate, BoolOp]
+
+
+def _error(message: str) -> HTTPException:
+    return HTTPException(status_code=422, detail=f"Invalid filter: {message}")
+
+
+def _tokenize(text: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    pos = 0
+    while True:
+        while pos < len(text) and text[pos].isspace():
+            pos += 1
+        if pos == len(text):
+            return tokens
+        m = _TOKEN.match(text, pos)
+        if m is None:
+            raise _error(f"unexpected {text[pos]!r} at position {pos}")
+        tokens.append((m.lastgroup, m.group(), pos))
+        pos = m.end()
+
+
+def _keyword(token: Tuple[str, str, int]) -> str:
+    """Words are matched case-insensitively; values keep their case."""
+    return token[1].lower() if token[0] == "word" else token[1]
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.i = 0
+
+    def peek(self) -> Optional[Tuple[str, str, int]]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else None
+
+    def next(self, what: str) -> Tuple[str, str, int]:
+        token = self.peek()
+        if token is None:
+            raise _error(f"expected {what} at end of filter")
+        self.i += 1
+        return token
+
+    def accept(self, value: str) -> bool:
+        token = self.peek()
+        if token is not None and _keyword(token) == value:
+            self.i += 1
+            return True
+        return False
+
+    def expect(self, value: str) -> None:
+        token = self.next(repr(value))
+        if _keyword(token) != value:
+            raise _error(f"expected {value!r} at position {token[2]}, got {token[1]!r}")
+
+    def parse(self) -> Optional[Node]:
+        if not self.tokens:
+            return None
+        node = self.expr()
+        token = self.peek()
+        if token is not None:
+            raise _error(f"unexpected {token[1]!r} at position {token[2]}")
+        return node
+
+    def expr(self) -> Node:
+        args = [self.conj()]
+        while self.accept("or"):
+            args.append(self.conj())
+        return args[0] if len(args) == 1 else BoolOp("or", tuple(args))
+
+    def conj(self) -> Node:
+        args = [self.unary()]
+        while self.accept("and"):
+            args.append(self.unary())
+        return args[0] if len(args) == 1 else BoolOp("and", tuple(args))
+
+    def unary(self) -> Node:
+        if self.accept("not"):
+            return BoolOp("not", (self.unary(),))
+        if self.accept("("):
+            node = self.expr()
+            self.expect(")")
+            return node
+        return self.predicate()
+
+    def predicate(self) -> Predicate:
+        token = self.next("a field")
+        field = _keyword(token)
+        if token[0] != "word" or field not in _FIELD_OPS:
+            raise _error(f"unknown field {token[1]!r} at position {token[2]}")
+        token = self.next("an operator")
+        op, pos = _keyword(token), token[2]
+        op = "!=" if op == "<>" else op
+        if op not in _FIELD_OPS[field]:
+            raise _error(f"{field} does not support {op!r} (position {pos})")
+        if op == "in":
+            self.expect("(")
+            values = [self.value(field)]
+            while self.accept(","):
+                values.append(self.value(field))
+            self.expect(")")
+        elif op == "between":
+            values = [self.value(field)]
+            self.expect("and")
+            values.append(self.value(field))
+        else:
+            values = [self.value(field)]
+        return Predicate(field, op, tuple(values))
+
+    def value(self, field: str) -> Value:
+        kind, text, pos = self.next(f"a value for {field}")
+        if kind == "string":
+            text = text[1:-1].replace(text[0] * 2, text[0])
+        if field in ("amount", "value"):
+            if kind != "number":
+                raise _error(f"{field} needs an integer in minor units at position {pos}")
+            return int(text)
+        if field == "date":
+            try:
+                return date.fromisoformat(text)
+            except ValueError:
+                raise _error(f"date needs YYYY-MM-DD at position {pos}")
+        if field == "account" and kind == "number":
+            return int(text)
+        if kind not in ("string", "word"):
+            raise _error(f"{field} needs a name at position {pos}")
+        return text
+
+
+def parse(text: str) -> Optional[Node]:
+    """The filter's syntax tree, or None for an empty filter."""
+    return _Parser(text).parse()
+
+
+def _account_ids(refdata: refdata_service.RefData, pred: Predicate) -> List[int]:
+    ids = set()
+    if pred.field == "account":
+        for v in pred.values:
+            acct = refdata.accounts.get(v) if isinstance(v, int) else refdata.accounts_by_path.get(v)
+            if acct is None:
+                raise _error(f"no account {v!r}")
+            ids.add(acct.id)
+        if pred.op == "under":
+            ids = refdata.subtree_ids(ids)
+    elif pred.field == "type":
+        try:
+            types = {AccountType(v.upper()) for v in pred.values}
+        except ValueError as exc:
+            raise _error(str(exc))
+        ids = {a.id for a in refdata.accounts.values() if a.account_type in types}
+    else:  # commodity
+        commodity_ids = set()
+        for v in pred.values:
+            c = refdata.commodities_by_mnemonic.get(v) or refdata.commodities_by_mnemonic.get(v.upper())
+            if c is None:
+                raise _error(f"no commodity {v!r}")
+            commodity_ids.add(c.id)
+        ids = {a.id for a in refdata.accounts.values() if a.commodity_id in commodity_ids}
+    return sorted(ids)
+
+
+def _compare(column, op: str, values: Tuple):
+    if op == "in":
+        return column.in_(values)
+    if op == "between":
+        return column.between(*values)
+    (v,) = values
+    return {
+        "=": column == v, "!=": column != v, "<": column < v,
+        "<=": column <= v, ">": column > v, ">=": column >= v,
+    }[op]
+
+
+def _compile_predicate(refdata: refdata_service.RefData, pred: Predicate):
+    if pred.field in ("account", "type", "commodity"):
+        clause = Split.account_id.in_(_account_ids(refdata, pred))
+        return not_(clause) if pred.op == "!=" else clause
+    if pred.field == "reconciled":
+        states = [v.lower() for v in pred.values]
+        bad = [v for v in states if v not in RECONCILE_STATES]
+        if bad:
+            raise _error(f"reconciled is one of {', '.join(RECONCILE_STATES)}, not {bad[0]!r}")
+        clause = Split.reconciled.in_(states)
+        return not_(clause) if pred.op == "!=" else clause
+    if pred.field in ("memo", "description"):
+        column = Split.memo if pred.field == "memo" else Transaction.description
+        if pred.op == "contains":
+            return column.icontains(pred.values[0], autoescape=True)
+        return _compare(func.coalesce(column, ""), pred.op, pred.values)
+    if pred.field == "date":
+        return _compare(Split.date_num, pred.op, tuple(day_number(v) for v in pred.values))
+    column = Split.quantity_minor if pred.field == "amount" else Split.value_minor
+    return _compare(column, pred.op, pred.values)
+
+
+def _compile(refdata: refdata_service.RefData, node: Optional[Node]):
+    if node is None:
+        return true()
+    if isinstance(node, Predicate):
+        return _compile_predicate(refdata, node)
+    args = [_compile(refdata, arg) for arg in node.args]
+    if node.op == "not":
+        return not_(args[0])
+    return and_(*args) if node.op == "and" else or_(*args)
+
+
+def _conjuncts(node: Optional[Node]) -> List[Node]:
+    if node is None:
+        return []
+    if isinstance(node, BoolOp) and node.op == "and":
+        return [c for arg in node.args for c in _conjuncts(arg)]
+    return [node]
+
+
+def _uses(node: Optional[Node], field: str) -> bool:
+    if node is None:
+        return False
+    if isinstance(node, Predicate):
+        return node.field == field
+    return any(_uses(arg, field) for arg in node.args)
+
+
+def access_paths(refdata: refdata_service.RefData, node: Optional[Node]) -> List[AccessPath]:
+    """Ways to reach the filter's rows through the split indexes; a full scan if there are none."""
+    accounts: Optional[set] = None
+    dates, amounts = [], []
+    for c in _conjuncts(node):
+        if not isinstance(c, Predicate) or c.op not in _SEEKABLE | {"under"}:
+            continue
+        if c.field in ("account", "type", "commodity"):
+            ids = set(_account_ids(refdata, c))
+            accounts = ids if accounts is None else accounts & ids
+        elif c.field == "date":
+            dates.append(_compile_predicate(refdata, c))
+        elif c.field == "amount":
+            amounts.append(_compile_predicate(refdata, c))
+
+    if accounts is not None:
+        in_accounts = Split.account_id.in_(sorted(accounts))
+        paths = [AccessPath("ix_splits_account_date", (in_accounts, *dates))]
+        if amounts:
+            paths.append(AccessPath("ix_splits_account_quantity", (in_accounts, *amounts)))
+        return paths
+    if dates:
+        return [AccessPath("ix_splits_date", tuple(dates))]
+    return [AccessPath(None, ())]
+
+
+def _pinned(stmt, path: AccessPath):
+    """Make SQLite use the path's index; other databases plan for themselves."""
+    if path.index is None:
+        return stmt
+    return stmt.select_from(indexed_by(Split.__table__, path.index))
+
+
+def estimate_cost(db: Session, path: AccessPath, limit: int) -> int:
+    """Rows the access path examines, counted up to limit + 1."""
+    examined = _pinned(select(Split.id).where(and_(true(), *path.seek)), path).limit(limit + 1).subquery()
+    return db.execute(select(func.count()).select_from(examined)).scalar_one()
+
+
+def query(db: Session, request: SplitQueryRequest) -> SplitQueryResult:
+    """One keyset page of matching splits in (date, transaction, split) order, with totals."""
+    node = parse(request.filter)
+    refdata = refdata_service.get(db)
+    where = _compile(refdata, node)
+    max_cost = settings.split_query_max_cost
+    cost, path = min(
+        ((estimate_cost(db, p, max_cost), p) for p in access_paths(refdata, node)), key=lambda cp: cp[0]
+    )
+    if cost > max_cost:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Filter would scan more than {max_cost} splits; narrow it by account, date or amount",
+        )
+
+    key = (Split.date_num, Split.transaction_id, Split.id)
+    stmt = (
+        select(
+            Split.id, Split.transaction_id, Split.account_id, Split.date_num, Split.value_minor,
+            Split.quantity_minor, Split.memo, Split.reconciled, Transaction.date, Transaction.description,
+        )
+        .join(Transaction, Transaction.id == Split.transaction_id)
+        .where(where)
+        .order_by(*key)
+        .limit(request.limit + 1)
+    )
+    stmt = _pinned(stmt, path)
+    if request.after is not None:
+        stmt = stmt.where(tuple_(*key) > tuple_(*account_service.parse_cursor(request.after)))
+    rows = db.execute(stmt).all()
+    has_more = len(rows) > request.limit
+    rows = rows[:request.limit]
+
+    out = []
+    for row in rows:
+        acct = refdata.accounts[row.account_id]
+        out.append(SplitQueryRow(
+            split_id=row.id,
+            transaction_id=row.transaction_id,
+            date=row.date,
+            description=row.description,
+            account_id=row.account_id,
+            account_name=acct.full_name,
+            memo=row.memo,
+            value_minor=row.value_minor,
+            quantity_minor=row.quantity_minor,
+            reconciled=row.reconciled,
+            commodity_id=acct.commodity_id,
+        ))
+    last = rows[-1] if rows else None
+    result = SplitQueryResult(
+        rows=out,
+        next_cursor=f"{last.date_num}:{last.transaction_id}:{last.id}" if has_more else None,
+        cost=cost,
+        access_path=path.index or "full scan",
+    )
+
+    if request.totals:
+        agg = _pinned(select(Split.account_id, func.count(), func.sum(Split.quantity_minor)).where(where), path)
+        if _uses(node, "description"):
+            agg = agg.join(Transaction, Transaction.id == Split.transaction_id)
+        by_commodity: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+        for account_id, n, qty in db.execute(agg.group_by(Split.account_id)):
+            total = by_commodity[refdata.accounts[account_id].commodity_id]
+            total[0] += n
+            total[1] += qty
+        result.count = sum(n for n, _ in by_commodity.values())
+        result.totals = [
+            SplitQueryTotal(commodity_id=cid, count=n, quantity_minor=qty)
+            for cid, (n, qty) in sorted(by_commodity.items())
+        ]
+    return result
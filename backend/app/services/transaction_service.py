@@ -1,34 +1,43 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Optional, List, Set, Tuple
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import delete, exists, func, insert, select, update
 from fastapi import HTTPException
 
-from ..models.transaction import Transaction, Split
-from ..schemas.transaction import TransactionCreate, TransactionUpdate
+from ..models.transaction import Transaction, Split, date_keys, split_date_keys
+from ..schemas.transaction import TransactionCreate, TransactionUpdate, SplitUpdate
+from . import change_service, close_service, lot_service
 
 
-def _check_zero_sum(splits: list) -> None:
+def _check_zero_sum(splits: list, where: str = "") -> None:
     total = sum(s.value_minor for s in splits)
     if total != 0:
         raise HTTPException(
             status_code=422,
-            detail=f"Splits do not sum to zero: sum(value_minor) = {total}",
+            detail=f"{where}Splits do not sum to zero: sum(value_minor) = {total}",
         )
 
 
-def create_transaction(db: Session, data: TransactionCreate) -> Transaction:
-    if len(data.splits) < 2:
-        raise HTTPException(status_code=422, detail="A transaction requires at least 2 splits")
+def _check_splits(splits: list, where: str = "") -> None:
+    """Reject a new transaction's splits unless there are at least two summing to zero.
 
-    # Validate zero-sum before creating anything
-    total = sum(s.value_minor for s in data.splits)
-    if total != 0:
-        raise HTTPException(
-            status_code=422,
-            detail=f"Splits do not sum to zero: sum(value_minor) = {total}",
-        )
+    `where` prefixes the error detail, e.g. "Row 3: " for a row of a batch.
+    """
+    if len(splits) < 2:
+        raise HTTPException(status_code=422, detail=f"{where}A transaction requires at least 2 splits")
+    _check_zero_sum(splits, where)
+
+
+def _create_transaction(db: Session, data: TransactionCreate) -> Transaction:
+    """Validate and flush a new transaction without committing."""
+    # Validate before creating anything
+    _check_splits(data.splits)
+    close_service.check_open(db, data.date)
 
     txn = Transaction(
         date=data.date,
+        **date_keys(data.date),
         description=data.description,
         notes=data.notes,
         import_ref=data.import_ref,
@@ -37,9 +46,11 @@ def create_transaction(db: Session, data: TransactionCreate) -> Transaction:
     db.add(txn)
     db.flush()
 
+    keys = split_date_keys(data.date)
     for s in data.splits:
         split = Split(
             transaction_id=txn.id,
+            **keys,
             account_id=s.account_id,
             value_minor=s.value_minor,
             quantity_minor=s.quantity_minor,
@@ -47,7 +58,17 @@ def create_transaction(db: Session, data: TransactionCreate) -> Transaction:
             reconciled=s.reconciled,
         )
         db.add(split)
+    change_service.record(
+        db, "transaction", txn.id, account_ids=[s.account_id for s in data.splits], dates=[data.date]
+    )
+    lot_service.mark_dirty(db, [s.account_id for s in data.splits], data.date)
+    db.flush()
+    db.expire(txn, ["splits"])
+    return txn
+
 
+def create_transaction(db: Session, data: TransactionCreate) -> Transaction:
+    txn = _create_transaction(db, data)
     db.commit()
     db.refresh(txn)
     return txn
@@ -60,6 +81,17 @@ def get_transaction(db: Session, txn_id: int) -> Transaction:
     return txn
 
 
+def _filtered(q, account_id: Optional[int], from_date: Optional[str], to_date: Optional[str]):
+    if account_id is not None:
+        # Semi-join: a transaction with two splits in the account is still one row
+        q = q.filter(exists().where(Split.transaction_id == Transaction.id, Split.account_id == account_id))
+    if from_date:
+        q = q.filter(Transaction.date >= from_date)
+    if to_date:
+        q = q.filter(Transaction.date <= to_date)
+    return q.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
 def list_transactions(
     db: Session,
     account_id: Optional[int] = None,
@@ -68,58 +100,178 @@ def list_transactions(
     limit: int = 100,
     offset: int = 0,
 ) -> List[Transaction]:
-    q = db.query(Transaction)
-    if account_id is not None:
-        q = q.join(Split, Transaction.id == Split.transaction_id).filter(
-            Split.account_id == account_id
+    q = db.query(Transaction).options(selectinload(Transaction.splits))
+    return _filtered(q, account_id, from_date, to_date).offset(offset).limit(limit).all()
+
+
+# Columns a sparse listing may ask for; amount_minor needs an account
+TRANSACTION_FIELDS = ("id", "date", "description", "notes", "import_ref", "currency_id", "amount_minor")
+SPLIT_COLUMNS = ("id", "account_id", "value_minor", "quantity_minor", "memo", "reconciled")
+
+
+def list_transaction_rows(
+    db: Session,
+    fields: List[str],
+    include_splits: bool = False,
+    account_id: Optional[int] = None,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Sparse listing: only the requested columns are selected, and splits only if asked.
+
+    amount_minor is the transaction's net quantity in `account_id`.
+    """
+    unknown = [f for f in fields if f not in TRANSACTION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown fields: {', '.join(unknown)}; choose from {', '.join(TRANSACTION_FIELDS)}",
         )
-    if from_date:
-        q = q.filter(Transaction.date >= from_date)
-    if to_date:
-        q = q.filter(Transaction.date <= to_date)
-    return q.order_by(Transaction.date.desc(), Transaction.id.desc()).offset(offset).limit(limit).all()
+    if "amount_minor" in fields and account_id is None:
+        raise HTTPException(status_code=422, detail="amount_minor requires account_id")
+
+    columns = [Transaction.id.label("id")]
+    for f in fields:
+        if f == "amount_minor":
+            columns.append(
+                select(func.sum(Split.quantity_minor))
+                .where(Split.transaction_id == Transaction.id, Split.account_id == account_id)
+                .scalar_subquery()
+                .label(f)
+            )
+        elif f != "id":
+            columns.append(getattr(Transaction, f).label(f))
+
+    rows = _filtered(db.query(*columns), account_id, from_date, to_date).offset(offset).limit(limit).all()
+    out = [{f: getattr(row, f) for f in fields} for row in rows]
+    if include_splits and rows:
+        by_txn: Dict[int, List[Dict[str, Any]]] = {row.id: [] for row in rows}
+        for split in db.query(Split.transaction_id, *(getattr(Split, c) for c in SPLIT_COLUMNS)).filter(
+            Split.transaction_id.in_(list(by_txn))
+        ).order_by(Split.id):
+            by_txn[split.transaction_id].append({c: getattr(split, c) for c in SPLIT_COLUMNS})
+        for row, item in zip(rows, out):
+            item["splits"] = by_txn[row.id]
+    return out
+
+
+@dataclass
+class Affected:
+    """Accounts and dates whose derived balances an edit may have changed."""
+    account_ids: Set[int] = field(default_factory=set)
+    dates: Set[date] = field(default_factory=set)
+
 
+_SPLIT_FIELDS = ("account_id", "value_minor", "quantity_minor", "memo", "reconciled")
 
-def update_transaction(db: Session, txn_id: int, data: TransactionUpdate) -> Transaction:
+
+def _apply_split_diff(db: Session, txn: Transaction, splits: List[SplitUpdate], affected: Affected) -> None:
+    """Update changed splits, insert new ones and delete omitted ones, set-based.
+
+    Fields a client leaves out of an existing split (e.g. reconciled) keep their
+    stored value.
+    """
+    existing = {
+        row.id: row
+        for row in db.query(Split.id, *[getattr(Split, f) for f in _SPLIT_FIELDS])
+        .filter(Split.transaction_id == txn.id)
+    }
+
+    updates, inserts, kept = [], [], set()
+    for s in splits:
+        if s.id is None:
+            inserts.append({
+                "transaction_id": txn.id, **split_date_keys(txn.date), **{f: getattr(s, f) for f in _SPLIT_FIELDS},
+            })
+            affected.account_ids.add(s.account_id)
+            continue
+        old = existing.get(s.id)
+        if old is None or s.id in kept:
+            raise HTTPException(status_code=422, detail=f"Split {s.id} is not part of transaction {txn.id}")
+        kept.add(s.id)
+        changes = {
+            f: getattr(s, f)
+            for f in _SPLIT_FIELDS
+            if (f in s.model_fields_set or f in ("account_id", "value_minor", "quantity_minor"))
+            and getattr(s, f) != getattr(old, f)
+        }
+        if changes:
+            updates.append({"id": s.id, **changes})
+            if {"account_id", "quantity_minor", "value_minor"} & changes.keys():
+                affected.account_ids.update({old.account_id, s.account_id})
+
+    removed = [split_id for split_id in existing if split_id not in kept]
+    affected.account_ids.update(existing[split_id].account_id for split_id in removed)
+
+    # Insert before deleting so SQLite cannot hand a removed split's id to a new one
+    if inserts:
+        db.execute(insert(Split), inserts)
+    if updates:
+        db.execute(update(Split), updates)
+    if removed:
+        db.execute(delete(Split).where(Split.id.in_(removed)))
+
+
+def _update_transaction(db: Session, txn_id: int, data: TransactionUpdate) -> Tuple[Transaction, Affected]:
+    """Apply an update and flush without committing."""
     txn = get_transaction(db, txn_id)
+    close_service.check_open(db, txn.date, data.date)
+    affected = Affected(dates={txn.date})
 
-    if data.date is not None:
+    if data.splits is not None:
+        _check_zero_sum(data.splits)
+
+    if data.date is not None and data.date != txn.date:
         txn.date = data.date
+        for key, value in date_keys(data.date).items():
+            setattr(txn, key, value)
+        db.execute(
+            update(Split).where(Split.transaction_id == txn.id).values(**split_date_keys(data.date))
+        )
+        affected.dates.add(data.date)
+        # Every split moves in time
+        affected.account_ids.update(
+            a for (a,) in db.query(Split.account_id).filter(Split.transaction_id == txn.id)
+        )
     if data.description is not None:
         txn.description = data.description
     if data.notes is not None:
         txn.notes = data.notes
     if data.currency_id is not None:
         txn.currency_id = data.currency_id
+    db.flush()
 
     if data.splits is not None:
-        total = sum(s.value_minor for s in data.splits)
-        if total != 0:
-            raise HTTPException(
-                status_code=422,
-                detail=f"Splits do not sum to zero: sum(value_minor) = {total}",
-            )
-        # Replace all splits
-        for split in txn.splits:
-            db.delete(split)
-        db.flush()
-        for s in data.splits:
-            split = Split(
-                transaction_id=txn.id,
-                account_id=s.account_id,
-                value_minor=s.value_minor,
-                quantity_minor=s.quantity_minor,
-                memo=s.memo,
-                reconciled=s.reconciled,
-            )
-            db.add(split)
+        _apply_split_diff(db, txn, data.splits, affected)
+
+    change_service.record(db, "transaction", txn.id, account_ids=affected.account_ids, dates=affected.dates)
+    lot_service.mark_dirty(db, affected.account_ids, min(affected.dates))
+    db.flush()
+    db.expire_all()
+    return txn, affected
 
+
+def update_transaction(db: Session, txn_id: int, data: TransactionUpdate) -> Tuple[Transaction, Affected]:
+    txn, affected = _update_transaction(db, txn_id, data)
     db.commit()
     db.refresh(txn)
-    return txn
+    return txn, affected
 
 
-def delete_transaction(db: Session, txn_id: int) -> None:
+def _delete_transaction(db: Session, txn_id: int) -> None:
     txn = get_transaction(db, txn_id)
+    close_service.check_open(db, txn.date)
+    account_ids = [s.account_id for s in txn.splits]
+    change_service.record(
+        db, "transaction", txn.id, change_service.DELETE, account_ids=account_ids, dates=[txn.date]
+    )
+    lot_service.mark_dirty(db, account_ids, txn.date)
     db.delete(txn)
+    db.flush()
+
+
+def delete_transaction(db: Session, txn_id: int) -> None:
+    _delete_transaction(db, txn_id)
     db.commit()
@@ -0,0 +1,132 @@
+"""Group commit: batch concurrent transaction writes into one database transaction."""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from ..config import settings
+
+# A worker with nothing to do for this long exits; the next submit restarts it
+IDLE_TIMEOUT_S = 30.0
+
+_Item = Tuple[Callable[..., Any], Callable[[Any], Any], tuple, Future]
+
+
+class WriteCoordinator:
+    """Collects writes arriving within a short window (or up to max_batch) and runs
+    them in a single transaction.
+
+    Each write runs inside its own SAVEPOINT, so one invalid write fails alone. A
+    caller's future is resolved only after the shared COMMIT has returned.
+    """
+
+    def __init__(self, engine: Engine, window_ms: int, max_batch: int):
+        self.engine = engine
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self._queue: "queue.Queue[_Item]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: "threading.Thread | None" = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, fn: Callable[..., Any], *args, serialize: Callable[[Any], Any] = lambda r: r) -> Any:
+        """Run fn(db, *args) in the next batch and block until it is durable.
+
+        serialize converts the ORM result before commit, since the session is closed
+        by the time the caller receives it.
+        """
+        future: Future = Future()
+        self._queue.put((fn, serialize, args, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-coordinator", daemon=True)
+                self._thread.start()
+        return future.result()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=IDLE_TIMEOUT_S)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._thread = None
+                        return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.window_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _begin(self, db: Session) -> None:
+        if self.engine.dialect.name == "sqlite":
+            # pysqlite only opens a transaction before DML, so the first SAVEPOINT
+            # would otherwise start (and its RELEASE commit) a transaction of its own
+            db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+    def _run_batch(self, batch: List[_Item]) -> None:
+        db = self._factory()
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        try:
+            self._begin(db)
+            for fn, serialize, args, future in batch:
+                try:
+                    with db.begin_nested():
+                        result = serialize(fn(db, *args))
+                    outcomes.append((future, True, result))
+                except Exception as exc:
+                    outcomes.append((future, False, exc))
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.writes += len(batch)
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_coordinators: Dict[str, WriteCoordinator] = {}
+_registry_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return settings.group_commit_window_ms > 0
+
+
+def for_session(db: Session) -> WriteCoordinator:
+    """The coordinator for the book (engine) this session is bound to."""
+    engine = db.get_bind()
+    key = str(engine.url)
+    with _registry_lock:
+        coordinator = _coordinators.get(key)
+        # A book evicted from the LRU and reopened gets a new engine
+        if coordinator is None or coordinator.engine is not engine:
+            coordinator = WriteCoordinator(
+                engine, settings.group_commit_window_ms, settings.group_commit_max_batch
+            )
+            _coordinators[key] = coordinator
+        return coordinator
@@ -0,0 +1,142 @@
+"""Serving of the built frontend: precompressed hashed assets and an in-memory index.html.
+
+Run ``python -m app.static_files <dir> [<out_dir>]`` (done by ``make build``) to write
+.gz and .br variants of every compressible asset, next to it or under out_dir. The
+server never writes into the package; with MXBCASH_STATIC_CACHE_DIR set it writes
+missing variants there at startup and serves them from there.
+Brotli is optional (requirements-brotli.txt); without it only .gz is written.
+"""
+import gzip
+import hashlib
+import sys
+from pathlib import Path
+from typing import Optional, Set
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always produced
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".map", ".txt", ".ico", ".wasm"}
+MIN_PRECOMPRESS_BYTES = 1024
+
+# Vite puts a content hash in every asset filename, so assets never change in place
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _accepted_encodings(header: str) -> Set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def precompress(directory: Path, out_dir: Optional[Path] = None) -> int:
+    """Write .gz (and .br when brotli is installed) variants of compressible files.
+
+    Variants go next to their file, or at the same relative path under out_dir.
+    Variants newer than their source are left alone. Returns the number written.
+    """
+    directory = Path(directory)
+    written = 0
+    for path in directory.rglob("*"):
+        if not path.is_file() or path.suffix not in COMPRESSIBLE_SUFFIXES:
+            continue
+        stat = path.stat()
+        if stat.st_size < MIN_PRECOMPRESS_BYTES:
+            continue
+        data = None
+        variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+        base = path if out_dir is None else Path(out_dir) / path.relative_to(directory)
+        for suffix, compress in variants:
+            target = base.with_name(base.name + suffix)
+            if target.exists() and target.stat().st_mtime >= stat.st_mtime:
+                continue
+            if data is None:
+                data = path.read_bytes()
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(compress(data))
+            written += 1
+    return written
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves a .br/.gz variant when the client accepts it.
+
+    Variants are looked up in variants_dir first, then next to the file.
+    """
+
+    def __init__(self, *args, variants_dir: Optional[Path] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.variants = StaticFiles(directory=variants_dir, check_dir=False) if variants_dir else None
+
+    def _lookup_variant(self, path: str):
+        if self.variants is not None:
+            full_path, stat_result = self.variants.lookup_path(path)
+            if stat_result is not None:
+                return full_path, stat_result
+        return self.lookup_path(path)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code not in (200, 304):
+            return response
+        response.headers["Cache-Control"] = IMMUTABLE
+        response.headers["Vary"] = "Accept-Encoding"
+        if response.status_code != 200:
+            return response
+
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self._lookup_variant, path + suffix)
+            if stat_result is not None and full_path:
+                return FileResponse(
+                    full_path,
+                    stat_result=stat_result,
+                    media_type=response.media_type,
+                    headers={
+                        "Content-Encoding": encoding,
+                        "Cache-Control": IMMUTABLE,
+                        "Vary": "Accept-Encoding",
+                    },
+                )
+        return response
+
+
+class IndexHtml:
+    """index.html held in memory (plain and gzipped) and revalidated by ETag."""
+
+    def __init__(self, path: Path):
+        self.body = Path(path).read_bytes()
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+
+    def response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if "gzip" in _accepted_encodings(request.headers.get("accept-encoding", "")):
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzipped, media_type="text/html", headers=headers)
+        return Response(self.body, media_type="text/html", headers=headers)
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).parent / "static"
+    out = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+    print(f"Precompressed {precompress(target, out)} files from {target} into {out or target}")
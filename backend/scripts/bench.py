@@ -0,0 +1,120 @@
+"""Time the heavy report and import queries against one database backend.
+
+    python scripts/bench.py sqlite:////tmp/bench.db --transactions 200000
+    python scripts/bench.py postgresql+psycopg://localhost:5432/mxbcash_bench
+
+The target database is wiped and filled with a synthetic book first, so never
+point this at a real one. Run from backend/.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base, _make_engine, init_book  # noqa: E402
+from app.models.account import Account, AccountType  # noqa: E402
+from app.models.commodity import Commodity  # noqa: E402
+from app.models.transaction import Transaction, Split, date_keys, split_date_keys  # noqa: E402
+from app.schemas.transaction import TransactionCreate  # noqa: E402
+from app.services import duplicate_service, report_service  # noqa: E402
+
+START = date(2015, 1, 1)
+DAYS = 10 * 365
+WORDS = ["grocer", "fuel", "coffee", "rent", "payroll", "pharmacy", "books", "transit", "hardware", "cinema"]
+
+
+def build(eng, n_txns: int, seed: int):
+    Base.metadata.drop_all(bind=eng)
+    init_book(eng)
+    rng = random.Random(seed)
+    with sessionmaker(bind=eng)() as db:
+        usd = db.execute(select(Commodity.id).where(Commodity.mnemonic == "USD")).scalar_one()
+        accounts = {}
+        for name, kind in [("Bench Checking", AccountType.ASSET), ("Bench Salary", AccountType.INCOME)] + [
+            (f"Bench {w.title()}", AccountType.EXPENSE) for w in WORDS
+        ]:
+            acct = Account(name=name, full_name=name, account_type=kind, commodity_id=usd)
+            db.add(acct)
+            db.flush()
+            accounts[name] = acct.id
+        checking, salary = accounts.pop("Bench Checking"), accounts.pop("Bench Salary")
+        expenses = list(accounts.values())
+
+        first_id = (db.execute(select(func.max(Transaction.id))).scalar() or 0) + 1
+        chunk = 10000
+        for lo in range(0, n_txns, chunk):
+            txns, splits = [], []
+            for i in range(lo, min(lo + chunk, n_txns)):
+                tid = first_id + i
+                d = START + timedelta(days=rng.randrange(DAYS))
+                if rng.random() < 0.05:
+                    other, amount, word = salary, rng.randrange(200000, 600000), "payroll"
+                else:
+                    k = rng.randrange(len(expenses))
+                    other, amount, word = expenses[k], -rng.randrange(100, 50000), WORDS[k]
+                txns.append({"id": tid, "date": d, **date_keys(d), "description": f"{word} {rng.randrange(1000)}",
+                             "currency_id": usd})
+                keys = split_date_keys(d)
+                splits.append({"transaction_id": tid, "account_id": checking,
+                               "value_minor": amount, "quantity_minor": amount, **keys})
+                splits.append({"transaction_id": tid, "account_id": other,
+                               "value_minor": -amount, "quantity_minor": -amount, **keys})
+            db.execute(insert(Transaction), txns)
+            db.execute(insert(Split), splits)
+        db.commit()
+    return usd, checking, expenses
+
+
+def timed(label: str, fn) -> None:
+    started = time.perf_counter()
+    fn()
+    print(f"{label:<24}{time.perf_counter() - started:8.3f}s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url", help="SQLAlchemy URL of a scratch database")
+    parser.add_argument("--transactions", type=int, default=100000)
+    parser.add_argument("--incoming", type=int, default=2000, help="rows sent to the duplicate check")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    eng = _make_engine(args.url)
+    print(f"{eng.dialect.name}: {args.transactions} transactions")
+    started = time.perf_counter()
+    usd, checking, expenses = build(eng, args.transactions, args.seed)
+    print(f"{'build':<24}{time.perf_counter() - started:8.3f}s")
+
+    rng = random.Random(args.seed + 1)
+    incoming = [
+        TransactionCreate(
+            date=START + timedelta(days=rng.randrange(DAYS)),
+            description=f"{WORDS[k]} {rng.randrange(1000)}",
+            currency_id=usd,
+            splits=[
+                {"account_id": checking, "value_minor": -a, "quantity_minor": -a},
+                {"account_id": expenses[k], "value_minor": a, "quantity_minor": a},
+            ],
+        )
+        for k, a in ((rng.randrange(len(expenses)), rng.randrange(100, 50000)) for _ in range(args.incoming))
+    ]
+    end = (START + timedelta(days=DAYS)).isoformat()
+    with sessionmaker(bind=eng)() as db:
+        timed("pnl by month", lambda: report_service.get_pnl(db, START.isoformat(), end, "month", "USD"))
+        timed("balance history", lambda: report_service.get_balance_history(
+            db, checking, START.isoformat(), end, "month", "USD"))
+        timed("trial balance", lambda: report_service.get_trial_balance(db, end, "USD"))
+        timed("duplicate check", lambda: duplicate_service.check(db, incoming))
+    eng.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
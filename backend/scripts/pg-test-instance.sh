@@ -0,0 +1,32 @@
+#!/bin/sh
+# Throwaway local PostgreSQL cluster for `make test-matrix` and `make bench`.
+#
+#   scripts/pg-test-instance.sh start   # initdb (first time) and start on $PGPORT
+#   scripts/pg-test-instance.sh stop
+#
+# Needs initdb/pg_ctl/createdb on PATH. Data lives in $PGDATA (default
+# /tmp/mxbcash-pg) and uses trust auth, so keep it to local testing.
+set -eu
+
+PGDATA=${PGDATA:-/tmp/mxbcash-pg}
+PGPORT=${PGPORT:-5432}
+export PGDATA PGPORT
+
+case "${1:-}" in
+  start)
+    if [ ! -f "$PGDATA/PG_VERSION" ]; then
+      initdb -A trust -U "$(id -un)" >/dev/null
+    fi
+    pg_ctl -w -l "$PGDATA/server.log" -o "-p $PGPORT -k /tmp -c fsync=off" start
+    for db in mxbcash_test mxbcash_bench; do
+      createdb -h localhost -p "$PGPORT" "$db" 2>/dev/null || true
+    done
+    ;;
+  stop)
+    pg_ctl -w stop -m fast
+    ;;
+  *)
+    echo "usage: $0 start|stop" >&2
+    exit 2
+    ;;
+esac
@@ -1,24 +1,32 @@
+import os
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
-from app.database import Base, get_db
+from app.database import Base, _make_engine, get_db
 from app.main import app
 from app.seed import run_seed
 
-# StaticPool reuses a single connection so all sessions see the same in-memory DB
-TEST_DB_URL = "sqlite:///:memory:"
+# MXBCASH_TEST_DATABASE_URL runs the suite against another backend, e.g. a
+# SQLite file or a throwaway PostgreSQL database (see `make test-matrix`)
+TEST_DB_URL = os.environ.get("MXBCASH_TEST_DATABASE_URL", "sqlite:///:memory:")
 
 
 @pytest.fixture(scope="session")
 def engine():
-    eng = create_engine(
-        TEST_DB_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    if TEST_DB_URL == "sqlite:///:memory:":
+        # StaticPool reuses a single connection so all sessions see the same in-memory DB
+        eng = create_engine(
+            TEST_DB_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        eng = _make_engine(TEST_DB_URL)
+        Base.metadata.drop_all(bind=eng)
     Base.metadata.create_all(bind=eng)
     return eng
 
@@ -44,3 +52,42 @@ def client(engine, db_session):
     with TestClient(app, raise_server_exceptions=True) as c:
         yield c
     app.dependency_overrides.clear()
+
+
+class BookFactory:
+    """Creates accounts and USD transactions through the API, for tests that build a small book."""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.usd = next(c for c in client.get("/api/v1/commodities").json() if c["mnemonic"] == "USD")
+
+    def account(self, name, account_type, parent_id=None, commodity_id=None) -> dict:
+        resp = self.client.post("/api/v1/accounts", json={
+            "name": name, "account_type": account_type, "parent_id": parent_id,
+            "commodity_id": commodity_id or self.usd["id"],
+        })
+        assert resp.status_code == 201, resp.text
+        return resp.json()
+
+    @staticmethod
+    def split(account_id, value, quantity=None, **fields) -> dict:
+        return dict(fields, account_id=account_id, value_minor=value,
+                    quantity_minor=value if quantity is None else quantity)
+
+    def txn(self, d, description, *splits, **fields) -> dict:
+        """A transaction body; splits are split() dicts or (account_id, value[, quantity]) tuples."""
+        return {"currency_id": self.usd["id"], **fields, "date": d, "description": description,
+                "splits": [s if isinstance(s, dict) else self.split(*s) for s in splits]}
+
+    def post(self, body: dict) -> dict:
+        resp = self.client.post("/api/v1/transactions", json=body)
+        assert resp.status_code == 201, resp.text
+        return resp.json()
+
+    def transaction(self, d, description, *splits, **fields) -> dict:
+        return self.post(self.txn(d, description, *splits, **fields))
+
+
+@pytest.fixture(scope="session")
+def make(client):
+    return BookFactory(client)
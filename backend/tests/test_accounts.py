@@ -2,6 +2,8 @@
 import pytest
 from fastapi.testclient import TestClient
 
+from app.services import account_service
+
 
 def test_list_accounts(client: TestClient):
     resp = client.get("/api/v1/accounts")
@@ -85,3 +87,106 @@ def test_full_name_with_parent(client: TestClient):
     })
     child = child_resp.json()
     assert child["full_name"] == "TestParent:TestChild"
+
+
+def test_refdata_cache_resolves_paths_and_invalidates_on_write(client: TestClient):
+    usd = next(c for c in client.get("/api/v1/commodities").json() if c["mnemonic"] == "USD")
+    parent = client.post("/api/v1/accounts", json={
+        "name": "Cache Parent", "account_type": "EXPENSE", "commodity_id": usd["id"], "placeholder": True,
+    }).json()
+    child = client.post("/api/v1/accounts", json={
+        "name": "Leaf", "account_type": "EXPENSE", "commodity_id": usd["id"], "parent_id": parent["id"],
+    }).json()
+
+    resp = client.get("/api/v1/accounts/by-path", params={"path": "Cache Parent:Leaf"})
+    assert resp.status_code == 200 and resp.json()["id"] == child["id"]
+    before = client.get("/api/v1/admin/refdata-cache").json()
+    assert before["cached"] is True
+    client.get("/api/v1/accounts/by-path", params={"path": "Cache Parent:Leaf"})
+    after = client.get("/api/v1/admin/refdata-cache").json()
+    assert after["hits"] == before["hits"] + 1 and after["loads"] == before["loads"]
+
+    # Renaming the parent moves the whole subtree's paths
+    client.patch(f"/api/v1/accounts/{parent['id']}", json={"name": "Cache Renamed"})
+    stats = client.get("/api/v1/admin/refdata-cache").json()
+    assert stats["invalidations"] > after["invalidations"] and stats["cached"] is False
+    assert client.get("/api/v1/accounts/by-path", params={"path": "Cache Parent:Leaf"}).status_code == 404
+    assert client.get("/api/v1/accounts/by-path", params={"path": "Cache Renamed:Leaf"}).json()["id"] == child["id"]
+
+
+def test_refdata_cache_ignores_uncommitted_writes(tmp_path):
+    from sqlalchemy.orm import sessionmaker
+    from app.database import _make_engine, init_book
+    from app.schemas.account import AccountCreate
+    from app.services import account_service, refdata_service
+
+    eng = _make_engine(f"sqlite:///{tmp_path / 'refdata.db'}")
+    init_book(eng)
+    factory = sessionmaker(bind=eng)
+    seeded = refdata_service.stats(eng).invalidations
+    with factory() as db:
+        usd = refdata_service.commodity_by_mnemonic(db, "USD")
+        account_service._create_account(db, AccountCreate(
+            name="Pending", account_type="ASSET", commodity_id=usd.id,
+        ))
+        # The writer sees its own account; the shared snapshot does not keep it
+        assert refdata_service.account_by_path(db, "Pending") is not None
+        db.rollback()
+    with factory() as db:
+        assert refdata_service.account_by_path(db, "Pending") is None
+        assert refdata_service.stats(eng).invalidations == seeded
+    eng.dispose()
+
+
+def test_subtree_register_merges_children_with_keyset_pages(client: TestClient, monkeypatch):
+    usd = next(c for c in client.get("/api/v1/commodities").json() if c["mnemonic"] == "USD")
+
+    def account(name, parent=None, placeholder=False):
+        return client.post("/api/v1/accounts", json={
+            "name": name, "account_type": "EXPENSE", "commodity_id": usd["id"],
+            "parent_id": parent, "placeholder": placeholder,
+        }).json()["id"]
+
+    food = account("Subtree Food", placeholder=True)
+    groceries = account("Groceries", food)
+    dining = account("Dining", food)
+    snacks = account("Snacks", dining)
+    bank = client.post("/api/v1/accounts", json={
+        "name": "Subtree Bank", "account_type": "ASSET", "commodity_id": usd["id"],
+    }).json()["id"]
+
+    entries = [("2024-01-05", groceries, 100), ("2024-01-03", snacks, 20), ("2024-01-05", dining, 300),
+               ("2024-01-09", groceries, 40), ("2024-01-05", snacks, 5)]
+    for d, acct, amount in entries:
+        client.post("/api/v1/transactions", json={
+            "date": d, "description": f"food {amount}", "currency_id": usd["id"], "splits": [
+                {"account_id": acct, "value_minor": amount, "quantity_minor": amount},
+                {"account_id": bank, "value_minor": -amount, "quantity_minor": -amount},
+            ],
+        })
+
+    rows, cursor = [], None
+    while True:
+        page = client.get(f"/api/v1/accounts/{food}/subtree-register",
+                          params={"limit": 2, **({"after": cursor} if cursor else {})}).json()
+        assert sorted(page["account_ids"]) == sorted([food, groceries, dining, snacks])
+        rows += page["rows"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [(r["date"], r["quantity_minor"]) for r in rows] == [
+        ("2024-01-03", 20), ("2024-01-05", 100), ("2024-01-05", 300), ("2024-01-05", 5), ("2024-01-09", 40),
+    ]
+    assert [r["running_subtotal"] for r in rows] == [20, 120, 420, 425, 465]
+    assert rows[0]["account_name"] == "Subtree Food:Dining:Snacks"
+
+    # A child's own subtree only sees its descendants
+    dining_rows = client.get(f"/api/v1/accounts/{dining}/subtree-register").json()["rows"]
+    assert [r["running_subtotal"] for r in dining_rows] == [20, 320, 325]
+    assert client.get(f"/api/v1/accounts/{food}/subtree-register", params={"after": "x"}).status_code == 422
+
+    # Seeks split across several statements merge the same way
+    monkeypatch.setattr(account_service, "_SEEKS_PER_QUERY", 1)
+    page = client.get(f"/api/v1/accounts/{food}/subtree-register", params={"limit": 4}).json()
+    assert [r["split_id"] for r in page["rows"]] == [r["split_id"] for r in rows[:4]]
+    assert page["rows"][-1]["memo"] == rows[3]["memo"] and page["next_cursor"] is not None
@@ -0,0 +1,123 @@
+"""Tests for online backups, retention, verify and restore."""
+import sqlite3
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app import cli
+from app.config import settings
+from app.database import _make_engine, init_book
+from app.services import backup_service, close_service
+
+
+@pytest.fixture
+def book(tmp_path):
+    path = tmp_path / "ledger.db"
+    eng = _make_engine(f"sqlite:///{path}")
+    init_book(eng)
+    yield eng
+    eng.dispose()
+
+
+def test_stepped_backup_prunes_and_restores(book, tmp_path):
+    backup_dir = str(tmp_path / "backups")
+    results = [
+        backup_service.backup(book, backup_dir, keep=2, pages_per_step=1, step_sleep_ms=0)
+        for _ in range(3)
+    ]
+    first, last = results[0], results[-1]
+    assert first.compressed and first.name.startswith("ledger-") and first.name.endswith(".db.gz")
+    assert first.steps > 1 and first.pages > 1
+    assert first.db_bytes > first.size_bytes  # compressed
+    assert last.pruned == [first.name]
+    assert [b.name for b in backup_service.list_backups("ledger", backup_dir)] == [
+        results[2].name, results[1].name,
+    ]
+
+    path = backup_service.resolve(last.name, backup_dir)
+    check = backup_service.verify(path)
+    assert check.ok and check.schema_version > 0
+
+    target = tmp_path / "restored.db"
+    backup_service.restore(path, target)
+    conn = sqlite3.connect(target)
+    assert conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0] > 0
+    conn.close()
+
+
+def test_verify_rejects_corrupt_file(tmp_path):
+    bad = tmp_path / "ledger-20260101T000000000000.db"
+    bad.write_bytes(b"not a database" * 100)
+    assert backup_service.verify(bad).ok is False
+    assert cli.main(["verify", str(bad)]) == 1
+    with pytest.raises(Exception):
+        backup_service.restore(bad, tmp_path / "x.db")
+
+
+def test_admin_endpoint_reports_throughput(client: TestClient, engine, tmp_path, monkeypatch):
+    if engine.dialect.name != "sqlite":
+        pytest.skip("online backups are SQLite-only")
+    monkeypatch.setattr(settings, "backup_dir", str(tmp_path))
+    resp = client.post("/api/v1/admin/backups")
+    assert resp.status_code == 201
+    body = resp.json()
+    assert body["duration_s"] >= 0 and body["throughput_mb_s"] >= 0 and body["pages"] > 0
+
+    listed = client.get("/api/v1/admin/backups").json()
+    assert [b["name"] for b in listed] == [body["name"]]
+    assert client.post(f"/api/v1/admin/backups/{body['name']}/verify").json()["ok"] is True
+    assert client.post("/api/v1/admin/backups/missing.db/verify").status_code == 404
+
+
+def test_archive_is_backed_up_and_restored_with_its_book(book, tmp_path, monkeypatch):
+    with Session(book) as db:
+        close_service.close_books(db, date(2020, 12, 31), archive=True)
+    archive = close_service.archive_path(tmp_path / "ledger.db")
+    assert archive.is_file()
+
+    backup_dir = tmp_path / "backups"
+    result = backup_service.backup(book, str(backup_dir), keep=5, step_sleep_ms=0)
+    assert result.archive == result.name.replace(".db.gz", ".archive.db.gz")
+    path = backup_service.resolve(result.name, str(backup_dir))
+    assert backup_service.verify(path).ok
+
+    target = tmp_path / "restored.db"
+    backup_service.restore(path, target)
+    conn = sqlite3.connect(close_service.archive_path(target))
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 0
+    conn.close()
+
+    # A damaged archive fails the pair
+    (backup_dir / result.archive).write_bytes(b"garbage" * 100)
+    check = backup_service.verify(path)
+    assert not check.ok and check.detail.startswith("archive")
+
+    # The scheduler backs up books_dir archives with their book, never as books
+    books_dir = tmp_path / "books"
+    books_dir.mkdir()
+    (tmp_path / "ledger.db").rename(books_dir / "ledger.db")
+    archive.rename(close_service.archive_path(books_dir / "ledger.db"))
+    monkeypatch.setattr(settings, "db_path", str(tmp_path / "missing.db"))
+    monkeypatch.setattr(settings, "books_dir", str(books_dir))
+    monkeypatch.setattr(settings, "backup_dir", str(tmp_path / "scheduled"))
+    results = backup_service.BackupScheduler(0).run_once()
+    assert [(r.name.split("-")[0], r.archive is not None) for r in results] == [("ledger", True)]
+
+
+def test_backup_under_constant_writes_fails_instead_of_locking(tmp_path):
+    class Churning:
+        """A source that changes under every pass, as a busy book would."""
+        passes = 0
+
+        def backup(self, dst, pages, progress, sleep):
+            Churning.passes += 1
+            progress(0, 5, 10)
+            progress(0, 8, 10)
+
+    with pytest.raises(HTTPException) as exc:
+        backup_service._step_copy(Churning(), None, 1, 0)
+    assert exc.value.status_code == 503
+    assert Churning.passes == backup_service._MAX_RESTARTS + 1
@@ -0,0 +1,81 @@
+"""Tests for the atomic batch endpoint."""
+from fastapi.testclient import TestClient
+
+API = "/api/v1"
+
+
+def _usd(client):
+    return next(c for c in client.get(f"{API}/commodities").json() if c["mnemonic"] == "USD")
+
+
+def test_batch_with_back_references(client: TestClient):
+    usd = _usd(client)
+    eur = next(c for c in client.get(f"{API}/commodities").json() if c["mnemonic"] == "EUR")
+    resp = client.post(f"{API}/batch", json={"operations": [
+        {"op": "create_account", "ref": "wallet",
+         "data": {"name": "BatchWallet", "account_type": "ASSET", "commodity_id": usd["id"]}},
+        {"op": "create_account",
+         "data": {"name": "BatchSnacks", "account_type": "EXPENSE", "commodity_id": usd["id"]}},
+        {"op": "create_transaction", "ref": "t", "data": {
+            "date": "2032-01-02", "description": "snack", "currency_id": usd["id"], "splits": [
+                {"account_id": "$1", "value_minor": 300, "quantity_minor": 300},
+                {"account_id": "$wallet", "value_minor": -300, "quantity_minor": -300},
+            ]}},
+        {"op": "update_transaction", "id": "$t", "data": {"description": "snacks"}},
+        {"op": "update_account", "id": "$wallet", "data": {"description": "cash"}},
+        {"op": "create_price", "data": {
+            "date": "2032-01-02", "commodity_id": eur["id"], "currency_id": usd["id"], "numerator": 11,
+            "denominator": 10}},
+    ]})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert [r["status"] for r in results] == [201, 201, 201, 200, 200, 201]
+    wallet_id, txn_id = results[0]["id"], results[2]["id"]
+    assert results[2]["body"]["splits"][1]["account_id"] == wallet_id
+    assert results[3]["body"]["description"] == "snacks" and results[3]["id"] == txn_id
+    assert client.get(f"{API}/accounts/{wallet_id}").json()["description"] == "cash"
+
+
+def test_batch_is_all_or_nothing(client: TestClient):
+    usd = _usd(client)
+    before = len(client.get(f"{API}/accounts").json())
+    resp = client.post(f"{API}/batch", json={"operations": [
+        {"op": "create_account", "ref": "a",
+         "data": {"name": "BatchRolledBack", "account_type": "ASSET", "commodity_id": usd["id"]}},
+        {"op": "create_transaction", "data": {
+            "date": "2032-01-03", "currency_id": usd["id"], "splits": [
+                {"account_id": "$a", "value_minor": 100, "quantity_minor": 100},
+                {"account_id": "$a", "value_minor": -99, "quantity_minor": -99},
+            ]}},
+    ]})
+    assert resp.status_code == 422
+    assert resp.json()["detail"]["index"] == 1
+    assert len(client.get(f"{API}/accounts").json()) == before
+
+    missing = client.post(f"{API}/batch", json={"operations": [{"op": "delete_transaction", "id": "$nope"}]})
+    assert missing.status_code == 422
+    assert client.post(f"{API}/batch", json={"operations": [
+        {"op": "delete_account", "id": 999999},
+    ]}).json()["detail"]["detail"] == "Account not found"
+
+
+def test_batch_leaves_dollar_text_alone(client: TestClient):
+    usd = _usd(client)
+    resp = client.post(f"{API}/batch", json={"operations": [
+        {"op": "create_account", "ref": "fees",
+         "data": {"name": "BatchFees", "account_type": "EXPENSE", "commodity_id": usd["id"], "description": "$0"}},
+        {"op": "create_account",
+         "data": {"name": "BatchCash", "account_type": "ASSET", "commodity_id": usd["id"]}},
+        {"op": "create_transaction", "data": {
+            "date": "2032-01-04", "description": "$0 fee refund", "currency_id": usd["id"], "splits": [
+                {"account_id": "$fees", "value_minor": -50, "quantity_minor": -50, "memo": "$1"},
+                {"account_id": "$1", "value_minor": 50, "quantity_minor": 50},
+            ]}},
+    ]})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert results[0]["body"]["description"] == "$0"
+    txn = results[2]["body"]
+    assert txn["description"] == "$0 fee refund"
+    assert [s["memo"] for s in txn["splits"]] == ["$1", ""]
+    assert txn["splits"][1]["account_id"] == results[1]["id"]
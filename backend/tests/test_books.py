@@ -0,0 +1,58 @@
+"""Tests for per-request book selection and the bounded engine registry."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.database import BookRegistry, get_db
+from app.main import app
+
+
+@pytest.fixture
+def books(tmp_path, monkeypatch):
+    registry = BookRegistry(str(tmp_path), max_open=2, memory_budget_bytes=1 << 30, autocreate=True)
+    monkeypatch.setattr(database, "books", registry)
+    override = app.dependency_overrides.pop(get_db, None)
+    yield registry
+    registry.close_all()
+    if override is not None:
+        app.dependency_overrides[get_db] = override
+
+
+def test_books_are_isolated(client: TestClient, books):
+    accounts = client.get("/books/alpha/api/v1/accounts").json()
+    usd = next(c for c in client.get("/books/alpha/api/v1/commodities").json() if c["mnemonic"] == "USD")
+    assert any(a["full_name"] == "Assets" for a in accounts)  # seeded on first open
+
+    resp = client.post("/books/alpha/api/v1/accounts", json={
+        "name": "AlphaOnly", "account_type": "ASSET", "commodity_id": usd["id"],
+    })
+    assert resp.status_code == 201
+
+    beta = client.get("/api/v1/accounts", headers={"X-Mxbcash-Book": "beta"}).json()
+    assert not any(a["name"] == "AlphaOnly" for a in beta)
+    alpha = client.get("/api/v1/accounts", headers={"X-Mxbcash-Book": "alpha"}).json()
+    assert any(a["name"] == "AlphaOnly" for a in alpha)
+
+
+def test_lru_bounds_open_books(client: TestClient, books):
+    for name in ["one", "two", "three"]:
+        assert client.get(f"/books/{name}/api/v1/commodities").status_code == 200
+    assert books.open_books() == ["two", "three"]
+
+    # Reopening an evicted book works and keeps its data file
+    assert client.get("/books/one/api/v1/commodities").status_code == 200
+    assert books.open_books() == ["three", "one"]
+
+
+def test_invalid_and_missing_books(client: TestClient, books):
+    assert client.get("/api/v1/accounts", headers={"X-Mxbcash-Book": "../etc"}).status_code == 400
+    books.autocreate = False
+    assert client.get("/books/missing/api/v1/accounts").status_code == 404
+
+
+def test_newer_schema_rejected(client: TestClient, books, tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(tmp_path / "future.db")
+    conn.execute(f"PRAGMA user_version = {database.SCHEMA_VERSION + 1}")
+    conn.close()
+    assert client.get("/books/future/api/v1/accounts").status_code == 409
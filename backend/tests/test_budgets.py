@@ -0,0 +1,110 @@
+"""Tests for budgets and the budget-vs-actual report."""
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _setup(client):
+    commodities = client.get("/api/v1/commodities").json()
+    usd = next(c for c in commodities if c["mnemonic"] == "USD")
+
+    def make(name, account_type, parent_id=None):
+        return client.post("/api/v1/accounts", json={
+            "name": name, "account_type": account_type, "commodity_id": usd["id"], "parent_id": parent_id,
+        }).json()
+
+    bank = make("BudgetTestBank", "ASSET")
+    food = make("BudgetTestFood", "EXPENSE")
+    groceries = make("Groceries", "EXPENSE", food["id"])
+    dining = make("Dining", "EXPENSE", food["id"])
+
+    for day, acct, amount in [
+        ("2025-01-05", groceries, 30000), ("2025-01-20", dining, 8000), ("2025-02-03", groceries, 25000),
+    ]:
+        client.post("/api/v1/transactions", json={
+            "date": day,
+            "currency_id": usd["id"],
+            "splits": [
+                {"account_id": acct["id"], "value_minor": amount, "quantity_minor": amount},
+                {"account_id": bank["id"], "value_minor": -amount, "quantity_minor": -amount},
+            ],
+        })
+    return food, groceries, dining
+
+
+def test_budget_vs_actual(client: TestClient):
+    food, groceries, dining = _setup(client)
+    budget = client.post("/api/v1/budgets", json={
+        "name": "2025",
+        "amounts": [
+            {"account_id": groceries["id"], "period": "2025-01-01", "amount_minor": 40000},
+            {"account_id": groceries["id"], "period": "2025-02-15", "amount_minor": 20000},
+        ],
+    })
+    assert budget.status_code == 201
+    budget_id = budget.json()["id"]
+
+    resp = client.get("/api/v1/reports/budget-vs-actual", params={
+        "budget_id": budget_id, "from_date": "2025-01-01", "to_date": "2025-02-28",
+    })
+    assert resp.status_code == 200
+    rows = {r["period"]: r for r in resp.json()["rows"]}
+    assert set(rows) == {"2025-01-01", "2025-02-01"}
+    assert rows["2025-01-01"]["actual_minor"] == 30000
+    assert rows["2025-01-01"]["variance_minor"] == -10000
+    assert rows["2025-01-01"]["percent_used"] == 75.0
+    assert rows["2025-02-01"]["percent_used"] == 125.0
+
+
+def test_budget_rollup_and_upsert(client: TestClient):
+    food, groceries, dining = _setup(client)
+    budget_id = client.post("/api/v1/budgets", json={"name": "Food"}).json()["id"]
+
+    resp = client.put(f"/api/v1/budgets/{budget_id}/amounts", json=[
+        {"account_id": groceries["id"], "period": "2025-01-01", "amount_minor": 10000},
+        {"account_id": dining["id"], "period": "2025-01-01", "amount_minor": 10000},
+    ])
+    assert len(resp.json()["amounts"]) == 2
+    resp = client.put(f"/api/v1/budgets/{budget_id}/amounts", json=[
+        {"account_id": groceries["id"], "period": "2025-01-01", "amount_minor": 35000},
+    ])
+    assert len(resp.json()["amounts"]) == 2
+
+    report = client.get("/api/v1/reports/budget-vs-actual", params={
+        "budget_id": budget_id, "from_date": "2025-01-01", "to_date": "2025-01-31", "rollup": True,
+    }).json()
+    rows = {r["account_id"]: r for r in report["rows"]}
+    assert rows[food["id"]]["budget_minor"] == 45000
+    assert rows[food["id"]]["actual_minor"] == 38000
+    assert rows[dining["id"]]["actual_minor"] == 8000
+
+
+def test_budget_not_found(client: TestClient):
+    resp = client.get("/api/v1/reports/budget-vs-actual", params={
+        "budget_id": 99999, "from_date": "2025-01-01", "to_date": "2025-01-31",
+    })
+    assert resp.status_code == 404
+
+
+def test_budget_accounts_must_exist_and_stay(client: TestClient):
+    usd = next(c for c in client.get("/api/v1/commodities").json() if c["mnemonic"] == "USD")
+    gifts = client.post("/api/v1/accounts", json={
+        "name": "BudgetTestGifts", "account_type": "EXPENSE", "commodity_id": usd["id"],
+    }).json()
+    bogus = [{"account_id": 999999, "period": "2025-01-01", "amount_minor": 100}]
+    assert client.post("/api/v1/budgets", json={"name": "Bogus", "amounts": bogus}).status_code == 422
+    budget_id = client.post("/api/v1/budgets", json={"name": "Guarded", "amounts": [
+        {"account_id": gifts["id"], "period": "2025-01-01", "amount_minor": 100},
+    ]}).json()["id"]
+    assert client.put(f"/api/v1/budgets/{budget_id}/amounts", json=bogus).status_code == 422
+
+    resp = client.delete(f"/api/v1/accounts/{gifts['id']}")
+    assert resp.status_code == 400 and f"budget {budget_id}" in resp.json()["detail"]
+    resp = client.post("/api/v1/batch", json={"operations": [{"op": "delete_account", "id": gifts["id"]}]})
+    assert resp.status_code == 400
+    report = client.get("/api/v1/reports/budget-vs-actual", params={
+        "budget_id": budget_id, "from_date": "2025-01-01", "to_date": "2025-01-31",
+    })
+    assert report.status_code == 200 and [r["account_id"] for r in report.json()["rows"]] == [gifts["id"]]
+
+    client.delete(f"/api/v1/budgets/{budget_id}")
+    assert client.delete(f"/api/v1/accounts/{gifts['id']}").status_code == 204
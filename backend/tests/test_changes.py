@@ -0,0 +1,85 @@
+"""Tests for the change log, since-cursor feed and event stream."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import change_service
+
+
+def _cursor(client):
+    return client.get("/api/v1/changes", params={"since": 0, "limit": 10000}).json()["last_seq"]
+
+
+def test_changes_since_cursor(client: TestClient):
+    since = _cursor(client)
+    commodities = client.get("/api/v1/commodities").json()
+    usd = next(c for c in commodities if c["mnemonic"] == "USD")
+    eur = next(c for c in commodities if c["mnemonic"] == "EUR")
+
+    acct = client.post("/api/v1/accounts", json={
+        "name": "ChangesTest", "account_type": "ASSET", "commodity_id": usd["id"],
+    }).json()
+    other = next(a for a in client.get("/api/v1/accounts").json() if a["account_type"] == "INCOME" and not a["placeholder"])
+    txn = client.post("/api/v1/transactions", json={
+        "date": "2024-08-01",
+        "currency_id": usd["id"],
+        "splits": [
+            {"account_id": acct["id"], "value_minor": 100, "quantity_minor": 100},
+            {"account_id": other["id"], "value_minor": -100, "quantity_minor": -100},
+        ],
+    }).json()
+    client.patch(f"/api/v1/transactions/{txn['id']}", json={"description": "edited"})
+    price = client.post("/api/v1/prices", json={
+        "date": "2024-08-01", "commodity_id": eur["id"], "currency_id": usd["id"], "numerator": 11, "denominator": 10,
+    }).json()
+
+    feed = client.get("/api/v1/changes", params={"since": since}).json()
+    entries = {(c["entity"], c["entity_id"]): c for c in feed["changes"]}
+    assert ("account", acct["id"]) in entries
+    assert ("price", price["id"]) in entries
+    # Create and edit are compacted into one entry carrying the touched accounts
+    txn_change = entries[("transaction", txn["id"])]
+    assert txn_change["op"] == "upsert"
+    assert txn_change["account_ids"] == sorted([acct["id"], other["id"]])
+    assert [c["entity"] for c in feed["changes"]].count("transaction") == 1
+
+    client.delete(f"/api/v1/transactions/{txn['id']}")
+    feed = client.get("/api/v1/changes", params={"since": feed["last_seq"]}).json()
+    assert feed["changes"][-1]["op"] == "delete"
+    assert feed["changes"][-1]["entity_id"] == txn["id"]
+
+    empty = client.get("/api/v1/changes", params={"since": feed["last_seq"]}).json()
+    assert empty["changes"] == [] and empty["last_seq"] == feed["last_seq"]
+
+
+def test_change_stream_announces_new_seq(client: TestClient):
+    since = _cursor(client)
+    commodities = client.get("/api/v1/commodities").json()
+    usd = next(c for c in commodities if c["mnemonic"] == "USD")
+    client.post("/api/v1/accounts", json={"name": "StreamTest", "account_type": "ASSET", "commodity_id": usd["id"]})
+
+    with client.stream("GET", "/api/v1/changes/stream", params={"since": since, "max_events": 1}) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        body = "".join(resp.iter_text())
+    assert f"id: {since + 1}" in body
+    assert "event: change" in body
+
+
+def test_postgres_change_writers_hold_the_seq_lock():
+    class Recording:
+        """Stands in for a PostgreSQL session; records what would be executed."""
+        def __init__(self):
+            self.statements = []
+
+        def get_bind(self):
+            return type("Bind", (), {"dialect": type("Dialect", (), {"name": "postgresql"})})()
+
+        def execute(self, stmt, params=None):
+            self.statements.append(str(stmt))
+
+        def add(self, obj):
+            pass
+
+    db = Recording()
+    change_service.record(db, "account", 1)
+    change_service.record_many(db, "account", [(2, None)])
+    assert sum("pg_advisory_xact_lock" in s for s in db.statements) == 2
@@ -0,0 +1,229 @@
+"""Tests for period close, closing snapshots and archiving."""
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.database import BookRegistry, get_db
+from app.main import app
+
+# A file-backed book of its own, so closing it does not lock the shared test book
+BOOK = "/books/closing/api/v1"
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch, client):
+    registry = BookRegistry(str(tmp_path), max_open=2, memory_budget_bytes=1 << 30, autocreate=True)
+    monkeypatch.setattr(database, "books", registry)
+    override = app.dependency_overrides.pop(get_db, None)
+
+    usd = next(c for c in client.get(f"{BOOK}/commodities").json() if c["mnemonic"] == "USD")
+    accounts = client.get(f"{BOOK}/accounts").json()
+    income = next(a for a in accounts if a["account_type"] == "INCOME" and not a["placeholder"])
+    checking = client.post(f"{BOOK}/accounts", json={
+        "name": "CloseChecking", "account_type": "ASSET", "commodity_id": usd["id"],
+    }).json()
+    for d, amount in [("2023-03-10", 1000), ("2023-06-15", 2000), ("2023-06-20", 4000), ("2024-01-05", 8000)]:
+        resp = client.post(f"{BOOK}/transactions", json={
+            "date": d, "description": "Pay", "currency_id": usd["id"],
+            "splits": [
+                {"account_id": checking["id"], "value_minor": amount, "quantity_minor": amount},
+                {"account_id": income["id"], "value_minor": -amount, "quantity_minor": -amount},
+            ],
+        })
+        assert resp.status_code == 201
+
+    yield {"path": tmp_path, "usd": usd, "checking": checking, "income": income}
+    registry.close_all()
+    if override is not None:
+        app.dependency_overrides[get_db] = override
+
+
+def _pnl(client, from_date, to_date, group_by="month"):
+    resp = client.get(f"{BOOK}/reports/pnl", params={
+        "from_date": from_date, "to_date": to_date, "group_by": group_by,
+    })
+    return resp
+
+
+def test_close_locks_period_and_keeps_balances(client: TestClient, book):
+    checking = book["checking"]
+    resp = client.post(f"{BOOK}/close", json={"through": "2023-06-15"})
+    assert resp.status_code == 201
+    assert resp.json()["archived"] is False
+
+    # Writes on or before the close date are rejected
+    txns = client.get(f"{BOOK}/transactions", params={"to_date": "2023-06-30"}).json()
+    closed = next(t for t in txns if t["date"] == "2023-06-15")
+    assert client.delete(f"{BOOK}/transactions/{closed['id']}").status_code == 409
+    open_txn = next(t for t in txns if t["date"] == "2023-06-20")
+    moved = client.patch(f"{BOOK}/transactions/{open_txn['id']}", json={"date": "2023-06-01"})
+    assert moved.status_code == 409
+
+    # Closes only move forward
+    assert client.post(f"{BOOK}/close", json={"through": "2023-01-01"}).status_code == 409
+
+    assert client.get(f"{BOOK}/accounts/{checking['id']}/balance").json()["balance_minor"] == 15000
+    history = client.get(f"{BOOK}/reports/balance-history", params={
+        "account_id": checking["id"], "from_date": "2023-06-16", "to_date": "2024-12-31",
+    }).json()
+    assert [p["balance_minor"] for p in history["points"]] == [7000, 15000]
+
+
+def test_archive_moves_rows_and_reports_use_snapshots(client: TestClient, book):
+    checking, income = book["checking"], book["income"]
+    before = _pnl(client, "2023-01-01", "2024-12-31").json()["rows"]
+
+    resp = client.post(f"{BOOK}/close", json={"through": "2023-06-15", "archive": True})
+    assert resp.status_code == 201
+    assert resp.json()["archived"] is True
+
+    archive = sqlite3.connect(book["path"] / "closing.archive.db")
+    assert archive.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 2
+    assert archive.execute("SELECT COUNT(*) FROM splits").fetchone()[0] == 4
+    archive.close()
+    live = client.get(f"{BOOK}/transactions", params={"to_date": "2023-12-31"}).json()
+    assert [t["date"] for t in live] == ["2023-06-20"]
+
+    # Month totals are stitched from the snapshot and the live remainder of June
+    after = _pnl(client, "2023-01-01", "2024-12-31").json()["rows"]
+    key = lambda r: (r["account_id"], r["period"])  # noqa: E731
+    assert sorted(after, key=key) == sorted(before, key=key)
+    june = next(r for r in after if r["account_id"] == income["id"] and r["period"] == "2023-06-01")
+    assert june["amount_minor"] == -6000
+    assert _pnl(client, "2023-01-01", "2023-12-31", "day").status_code == 422
+
+    assert client.get(f"{BOOK}/accounts/{checking['id']}/balance").json()["balance_minor"] == 15000
+    register = client.get(f"{BOOK}/accounts/{checking['id']}/register").json()
+    assert [r["running_balance"] for r in register] == [7000, 15000]
+    history = client.get(f"{BOOK}/reports/balance-history", params={
+        "account_id": checking["id"], "from_date": "2023-01-01", "to_date": "2024-12-31",
+    }).json()
+    assert [p["balance_minor"] for p in history["points"]] == [1000, 7000, 15000]
+
+
+def test_archive_needs_file_book(client: TestClient, engine):
+    if engine.dialect.name == "sqlite" and engine.url.database not in (None, "", ":memory:"):
+        pytest.skip("the shared test book is file-backed")
+    resp = client.post("/api/v1/close", json={"through": "1990-01-01", "archive": True})
+    assert resp.status_code == 400
+    assert client.get("/api/v1/close").json() == []
+
+
+def test_reports_after_a_later_close_archives_the_gap(client: TestClient, book):
+    checking, income = book["checking"], book["income"]
+    assert client.post(f"{BOOK}/close", json={"through": "2023-04-30"}).status_code == 201
+    resp = client.post(f"{BOOK}/close", json={"through": "2023-12-31", "archive": True})
+    assert resp.status_code == 201
+
+    # The June splits between the two snapshots now only exist as monthly totals
+    history = client.get(f"{BOOK}/reports/balance-history", params={
+        "account_id": checking["id"], "from_date": "2023-07-01", "to_date": "2024-12-31",
+    }).json()
+    assert [p["balance_minor"] for p in history["points"]] == [15000]
+    trial = client.get(f"{BOOK}/reports/trial-balance", params={"as_of": "2023-06-30"}).json()
+    assert next(r for r in trial["rows"] if r["account_id"] == checking["id"])["balance_minor"] == 7000
+    balances = client.get(f"{BOOK}/accounts/balances", params={
+        "ids": [checking["id"], income["id"]], "as_of": "2023-05-31",
+    }).json()
+    assert [r["balance_minor"] for r in balances["rows"]] == [1000, -1000]
+
+    june = _pnl(client, "2023-05-01", "2023-06-30").json()["rows"]
+    assert [(r["period"], r["amount_minor"]) for r in june if r["account_id"] == income["id"]] == [
+        ("2023-06-01", -6000)
+    ]
+    # Partial archived months cannot be answered from monthly totals
+    assert _pnl(client, "2023-06-10", "2023-06-30").status_code == 422
+    assert _pnl(client, "2023-05-01", "2023-06-18").status_code == 422
+    assert client.get(f"{BOOK}/reports/trial-balance", params={"as_of": "2023-06-18"}).status_code == 422
+
+
+def test_partial_archived_months_split_at_close_dates(client: TestClient, book):
+    income = book["income"]
+    assert client.post(f"{BOOK}/close", json={"through": "2023-06-15"}).status_code == 201
+    assert client.post(f"{BOOK}/close", json={"through": "2023-12-31", "archive": True}).status_code == 201
+
+    # June is stored as two totals, one per close, so both halves are exact
+    first = _pnl(client, "2023-06-01", "2023-06-15").json()["rows"]
+    second = _pnl(client, "2023-06-16", "2023-06-30").json()["rows"]
+    assert [r["amount_minor"] for r in first if r["account_id"] == income["id"]] == [-2000]
+    assert [r["amount_minor"] for r in second if r["account_id"] == income["id"]] == [-4000]
+
+
+def test_account_with_archived_history_cannot_be_deleted(client: TestClient, book):
+    usd = book["usd"]
+    savings = client.post(f"{BOOK}/accounts", json={
+        "name": "CloseSavings", "account_type": "ASSET", "commodity_id": usd["id"],
+    }).json()
+    client.post(f"{BOOK}/transactions", json={
+        "date": "2023-02-01", "description": "Move", "currency_id": usd["id"], "splits": [
+            {"account_id": savings["id"], "value_minor": 500, "quantity_minor": 500},
+            {"account_id": book["checking"]["id"], "value_minor": -500, "quantity_minor": -500},
+        ],
+    })
+    assert client.post(f"{BOOK}/close", json={"through": "2023-12-31", "archive": True}).status_code == 201
+    resp = client.delete(f"{BOOK}/accounts/{savings['id']}")
+    assert resp.status_code == 400
+    assert "closed-period" in resp.json()["detail"]
+
+
+def test_lots_keep_archived_buys_through_replays(client: TestClient, book):
+    usd, checking = book["usd"], book["checking"]
+    stock = client.post(f"{BOOK}/commodities", json={
+        "mnemonic": "ARCX", "name": "Archived Inc", "fraction": 1000, "namespace": "NYSE",
+    }).json()
+    shares = client.post(f"{BOOK}/accounts", json={
+        "name": "ArcX Shares", "account_type": "ASSET", "commodity_id": stock["id"],
+    }).json()
+
+    def trade(d, qty, value):
+        resp = client.post(f"{BOOK}/transactions", json={
+            "date": d, "description": "trade", "currency_id": usd["id"], "splits": [
+                {"account_id": shares["id"], "value_minor": value, "quantity_minor": qty},
+                {"account_id": checking["id"], "value_minor": -value, "quantity_minor": -value},
+            ],
+        })
+        assert resp.status_code == 201
+
+    trade("2023-03-10", 10000, 10000)
+    assert client.post(f"{BOOK}/close", json={"through": "2023-12-31", "archive": True}).status_code == 201
+    trade("2024-02-01", -4000, -8000)
+
+    def realized():
+        return sum(r["gain_minor"] for r in client.get(f"{BOOK}/lots/realized", params={
+            "from_date": "2024-01-01", "to_date": "2024-12-31", "account_id": shares["id"],
+        }).json()["rows"])
+
+    assert realized() == 4000
+    client.put(f"{BOOK}/lots/accounts/{shares['id']}", json={"method": "lifo"})
+    assert client.post(f"{BOOK}/lots/recompute").status_code == 200
+    assert realized() == 4000
+    lots = client.get(f"{BOOK}/lots", params={"account_id": shares["id"]}).json()
+    assert [(lot["opened"], lot["remaining_minor"]) for lot in lots] == [("2023-03-10", 6000)]
+
+
+def test_scheduled_run_skips_closed_occurrences(client: TestClient, book):
+    usd, checking, income = book["usd"], book["checking"], book["income"]
+
+    def template(name, start):
+        return client.post(f"{BOOK}/scheduled", json={
+            "name": name, "currency_id": usd["id"], "frequency": "MONTHLY", "start_date": start,
+            "splits": [
+                {"account_id": checking["id"], "value_minor": 100, "quantity_minor": 100},
+                {"account_id": income["id"], "value_minor": -100, "quantity_minor": -100},
+            ],
+        }).json()
+
+    late = template("Late", "2023-05-01")
+    template("Fresh", "2023-08-01")
+    assert client.post(f"{BOOK}/close", json={"through": "2023-06-30"}).status_code == 201
+
+    resp = client.post(f"{BOOK}/scheduled/run", params={"until": "2023-09-30"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["created"] == 5  # Late from July, and all of Fresh
+    assert [(s["scheduled_transaction_id"], s["date"], s["reason"]) for s in body["skipped"]] == [
+        (late["id"], "2023-05-01", "closed"), (late["id"], "2023-06-01", "closed"),
+    ]
+    assert client.post(f"{BOOK}/scheduled/run", params={"until": "2023-09-30"}).json()["created"] == 0
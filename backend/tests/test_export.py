@@ -0,0 +1,97 @@
+"""Tests for the streaming ledger export."""
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app import cli
+from app.config import settings
+from app.database import _make_engine, init_book
+from app.models.account import Account
+from app.services import export_service
+
+API = "/api/v1"
+
+
+def _ledger(client):
+    usd = next(c for c in client.get(f"{API}/commodities").json() if c["mnemonic"] == "USD")
+    parent = client.post(f"{API}/accounts", json={
+        "name": "ExportHome", "account_type": "EXPENSE", "commodity_id": usd["id"], "placeholder": True,
+    }).json()
+    rent = client.post(f"{API}/accounts", json={
+        "name": "Rent", "account_type": "EXPENSE", "commodity_id": usd["id"], "parent_id": parent["id"],
+    }).json()
+    bank = client.post(f"{API}/accounts", json={
+        "name": "ExportBank", "account_type": "ASSET", "commodity_id": usd["id"],
+    }).json()
+    ids = []
+    for d in ("2034-01-01", "2034-02-01", "2034-03-01"):
+        ids.append(client.post(f"{API}/transactions", json={
+            "date": d, "description": f"rent {d}", "currency_id": usd["id"], "splits": [
+                {"account_id": rent["id"], "value_minor": 100000, "quantity_minor": 100000},
+                {"account_id": bank["id"], "value_minor": -100000, "quantity_minor": -100000},
+            ],
+        }).json()["id"])
+    return parent, rent, bank, ids
+
+
+def test_ndjson_export_filters(client: TestClient):
+    parent, rent, bank, ids = _ledger(client)
+    resp = client.get(f"{API}/export", params={
+        "account_id": parent["id"], "subtree": True, "from_date": "2034-02-01",
+    })
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    accounts = [r["id"] for r in records if r["type"] == "account"]
+    txns = [r for r in records if r["type"] == "transaction"]
+    assert sorted(accounts) == sorted([parent["id"], rent["id"]])
+    assert [t["id"] for t in txns] == ids[1:]
+    assert {s["account_id"] for s in txns[0]["splits"]} == {rent["id"], bank["id"]}
+
+    seq = client.get(f"{API}/changes", params={"since": 0, "limit": 10000}).json()["last_seq"]
+    client.delete(f"{API}/transactions/{ids[0]}")
+    changed = [json.loads(line) for line in client.get(f"{API}/export", params={"changed_since": seq}).text.splitlines()]
+    assert changed == [{"type": "deleted", "seq": seq + 1, "entity": "transaction", "id": ids[0]}]
+
+
+def test_csv_export_one_row_per_split(client: TestClient):
+    _, rent, _, ids = _ledger(client)
+    resp = client.get(f"{API}/export", params={"kind": "transactions", "format": "csv", "account_id": rent["id"]})
+    rows = list(csv.DictReader(io.StringIO(resp.text)))
+    assert len(rows) == 6
+    assert {int(r["transaction_id"]) for r in rows} == set(ids)
+    assert client.get(f"{API}/export", params={"format": "csv"}).status_code == 422
+    assert client.get(f"{API}/export", params={"account_id": 999999}).status_code == 404
+
+
+def test_cli_export(tmp_path, monkeypatch):
+    path = tmp_path / "book.db"
+    eng = _make_engine(f"sqlite:///{path}")
+    init_book(eng)
+    eng.dispose()
+    monkeypatch.setattr(settings, "db_path", str(path))
+    out = tmp_path / "accounts.csv"
+    assert cli.main(["export", "--kind", "accounts", "--format", "csv", "--out", str(out)]) == 0
+    rows = list(csv.DictReader(out.open()))
+    assert rows and rows[0].keys() >= {"id", "full_name", "account_type"}
+
+
+def test_subtree_export_binds_no_id_list(client: TestClient, make):
+    root = make.account("ExportDeep", "EXPENSE")
+    parent = root
+    for depth in range(4):
+        parent = make.account(f"Level{depth}", "EXPENSE", parent["id"])
+    bank = make.account("ExportDeepBank", "ASSET")
+    txn = make.transaction("2035-01-01", "deep", (parent["id"], 700), (bank["id"], -700))
+
+    f = export_service.ExportFilter(account_id=root["id"], subtree=True)
+    assert len(select(Account.id).where(export_service._in_scope(Account.id, f)).compile().params) == 1
+
+    records = [json.loads(line) for line in client.get(f"{API}/export", params={
+        "account_id": root["id"], "subtree": True,
+    }).text.splitlines()]
+    assert len([r for r in records if r["type"] == "account"]) == 5
+    assert [r["id"] for r in records if r["type"] == "transaction"] == [txn["id"]]
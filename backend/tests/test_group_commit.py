@@ -0,0 +1,68 @@
+"""Tests for the group-commit write coordinator."""
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import _make_engine, init_book
+from app.models.commodity import Commodity
+from app.models.account import Account
+from app.models.transaction import Transaction
+from app.schemas.transaction import TransactionCreate, TransactionRead
+from app.services import transaction_service
+from app.services.write_coordinator import WriteCoordinator
+
+
+@pytest.fixture
+def book(tmp_path):
+    eng = _make_engine(f"sqlite:///{tmp_path / 'group.db'}")
+    init_book(eng)
+    yield eng
+    eng.dispose()
+
+
+def _payload(db_engine, amount, imbalance=0):
+    from sqlalchemy.orm import Session
+    with Session(db_engine) as db:
+        usd = db.query(Commodity).filter(Commodity.mnemonic == "USD").one().id
+        a, b = [acc.id for acc in db.query(Account).filter(Account.placeholder.is_(False)).limit(2)]
+    return TransactionCreate(
+        date="2024-07-01",
+        description=f"batched {amount}",
+        currency_id=usd,
+        splits=[
+            {"account_id": a, "value_minor": amount, "quantity_minor": amount},
+            {"account_id": b, "value_minor": -amount + imbalance, "quantity_minor": -amount},
+        ],
+    )
+
+
+def test_concurrent_writes_share_commits(book):
+    coordinator = WriteCoordinator(book, window_ms=50, max_batch=100)
+    payloads = [_payload(book, 100 + i, imbalance=1 if i == 3 else 0) for i in range(20)]
+    results = [None] * len(payloads)
+
+    def worker(i):
+        try:
+            results[i] = coordinator.submit(
+                transaction_service._create_transaction, payloads[i], serialize=TransactionRead.model_validate
+            )
+        except HTTPException as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(payloads))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # The invalid write fails alone; every other caller gets its own committed row
+    assert isinstance(results[3], HTTPException) and results[3].status_code == 422
+    ok = [r for i, r in enumerate(results) if i != 3]
+    assert all(isinstance(r, TransactionRead) and len(r.splits) == 2 for r in ok)
+    assert coordinator.writes == 20
+    assert coordinator.batches < 20
+
+    from sqlalchemy.orm import Session
+    with Session(book) as db:
+        assert db.query(Transaction).count() == 19
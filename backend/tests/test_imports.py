@@ -0,0 +1,75 @@
+"""Tests for duplicate detection and batch import."""
+import pytest
+from fastapi.testclient import TestClient
+
+API = "/api/v1"
+
+
+def _purchase(ledger, d, amount, description, **fields):
+    return ledger["make"].txn(
+        d, description, (ledger["food"]["id"], amount), (ledger["bank"]["id"], -amount), **fields
+    )
+
+
+@pytest.fixture(scope="module")
+def ledger(make):
+    ledger = {"make": make, "bank": make.account("Import Bank", "ASSET"),
+              "food": make.account("Import Food", "EXPENSE")}
+    ledger["existing"] = [make.post(body) for body in (
+        _purchase(ledger, "2025-03-01", 450, "POS 88213 STARBUCKS #1142"),
+        _purchase(ledger, "2025-03-05", 9900, "Grocery Outlet"),
+        _purchase(ledger, "2025-03-05", 9900, "Grocery Outlet"),
+        _purchase(ledger, "2025-03-10", 1200, "Parking", import_ref="bank:0310-1"),
+    )]
+    return ledger
+
+
+def test_check_scores_blocked_candidates(client: TestClient, ledger):
+    existing = ledger["existing"]
+    resp = client.post(f"{API}/transactions/duplicates", json={"transactions": [
+        _purchase(ledger, "2025-03-02", 450, "POS 99120 STARBUCKS #1142"),  # same payee, reference differs
+        _purchase(ledger, "2025-03-01", 450, "Shell fuel station"),         # same amount, other payee
+        _purchase(ledger, "2025-03-20", 450, "POS 88213 STARBUCKS #1142"),  # outside the window
+        _purchase(ledger, "2025-03-10", 1200, "PARKING", import_ref="bank:0310-1"),
+    ]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["checked"] == 4 and body["duplicates"] == 2
+    rows = {r["index"]: r for r in body["rows"]}
+    assert rows[0]["duplicate_of"] == existing[0]["id"] and not rows[0]["exact"]
+    assert rows[0]["candidates"][0]["date_diff_days"] == 1
+    assert rows[1]["duplicate_of"] is None and rows[1]["candidates"][0]["score"] < 0.75
+    assert 2 not in rows
+    assert rows[3]["exact"] and rows[3]["duplicate_of"] == existing[3]["id"]
+
+
+def test_import_skips_duplicates_once_each(client: TestClient, ledger):
+    existing, bank = ledger["existing"], ledger["bank"]
+    batch = [
+        _purchase(ledger, "2025-03-05", 9900, "GROCERY OUTLET"),
+        _purchase(ledger, "2025-03-06", 9900, "Grocery Outlet 0042"),
+        _purchase(ledger, "2025-03-06", 9900, "Grocery Outlet"),  # a third purchase is new
+        _purchase(ledger, "2025-03-10", 1200, "Parking", import_ref="bank:0310-1"),
+        _purchase(ledger, "2025-03-11", 300, "Bus fare", import_ref="bank:0311-1"),
+    ]
+    resp = client.post(f"{API}/transactions/import", json={"transactions": batch})
+    assert resp.status_code == 201
+    body = resp.json()
+    skipped = {r["index"]: r["duplicate_of"] for r in body["skipped"]}
+    assert skipped[3] == existing[3]["id"]
+    assert {skipped[0], skipped[1]} == {existing[1]["id"], existing[2]["id"]}
+    assert len(body["created_ids"]) == 2
+
+    register = client.get(f"{API}/accounts/{bank['id']}/register").json()
+    assert len(register) == len(existing) + 2
+
+    # With skipping off only the exact import_ref match is dropped
+    again = client.post(f"{API}/transactions/import", json={
+        "transactions": batch[3:], "skip_duplicates": False,
+    }).json()
+    assert [r["index"] for r in again["skipped"]] == [0, 1]
+
+    bad = _purchase(ledger, "2025-03-12", 100, "x")
+    bad["splits"][0]["value_minor"] = 99
+    resp = client.post(f"{API}/transactions/import", json={"transactions": [bad]})
+    assert resp.status_code == 422 and resp.json()["detail"].startswith("Row 0: Splits do not sum to zero")
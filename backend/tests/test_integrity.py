@@ -0,0 +1,123 @@
+"""Tests for the ledger integrity verifier."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from app import cli
+from app.config import settings
+from app.database import _make_engine, init_book
+from app.models.account import Account
+from app.services import integrity_service
+from app.services.transaction_service import create_transaction
+from app.schemas.transaction import TransactionCreate
+
+
+def book_accounts(db):
+    return db.query(Account).filter(Account.placeholder.is_(False)).order_by(Account.id).limit(2).all()
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    path = tmp_path / "audit.db"
+    eng = _make_engine(f"sqlite:///{path}")
+    init_book(eng)
+    db = sessionmaker(bind=eng)()
+    accounts = book_accounts(db)
+    for d in ["2024-01-05", "2024-01-20", "2024-02-10"]:
+        create_transaction(db, TransactionCreate(
+            date=d, description="x", currency_id=accounts[0].commodity_id,
+            splits=[
+                {"account_id": accounts[0].id, "value_minor": 500, "quantity_minor": 500},
+                {"account_id": accounts[1].id, "value_minor": -500, "quantity_minor": -500},
+            ],
+        ))
+    monkeypatch.setattr(settings, "verify_batch_size", 2)
+    yield db, path
+    db.close()
+    eng.dispose()
+
+
+def test_incremental_runs_skip_unchanged_months(book):
+    db, _ = book
+    first = integrity_service.verify(db)
+    assert first.ok and first.months_total == 2 and first.months_verified == 2
+    assert first.splits_scanned == 6
+
+    again = integrity_service.verify(db)
+    assert again.months_skipped == 2 and again.splits_scanned == 0
+    assert again.root_checksum == first.root_checksum
+
+    # A write through the service re-fingerprints only the month it names
+    create_transaction(db, TransactionCreate(
+        date="2024-02-20", description="y", currency_id=book_accounts(db)[0].commodity_id, splits=[
+            {"account_id": book_accounts(db)[0].id, "value_minor": 100, "quantity_minor": 100},
+            {"account_id": book_accounts(db)[1].id, "value_minor": -100, "quantity_minor": -100},
+        ],
+    ))
+    written = integrity_service.verify(db)
+    assert written.ok and written.months_verified == 1 and written.splits_scanned == 4
+    assert written.root_checksum != first.root_checksum
+
+    # Drift from direct SQL bypasses the change log; a full run finds it and the
+    # failing month stays dirty
+    db.execute(text(
+        "UPDATE splits SET value_minor = 400 WHERE id = "
+        "(SELECT s.id FROM splits s JOIN transactions t ON t.id = s.transaction_id "
+        "WHERE t.date = '2024-02-10' LIMIT 1)"
+    ))
+    db.commit()
+    assert integrity_service.verify(db).ok
+    drift = integrity_service.verify(db, full=True)
+    assert not drift.ok and drift.months_verified == 2 and drift.splits_scanned == 8
+    assert [i.kind for i in drift.issues] == ["zero_sum"]
+    again = integrity_service.verify(db)
+    assert again.months_verified == 1 and again.splits_scanned == 4 and not again.ok
+
+
+def test_transactions_without_splits_are_flagged(book):
+    db, _ = book
+    db.execute(text("INSERT INTO transactions (date, description, currency_id) VALUES ('2024-03-01', 'empty', 1)"))
+    db.commit()
+    report = integrity_service.verify(db)
+    assert [(i.kind, i.detail) for i in report.issues] == [("too_few_splits", "0 splits")]
+
+
+def test_reference_and_full_name_checks(book, monkeypatch):
+    db, path = book
+    db.execute(text("UPDATE accounts SET full_name = 'Wrong' WHERE parent_id IS NOT NULL AND id = "
+                    "(SELECT MIN(id) FROM accounts WHERE parent_id IS NOT NULL)"))
+    db.execute(text("INSERT INTO splits (transaction_id, account_id, value_minor, quantity_minor, memo, reconciled) "
+                    "VALUES (99999, 1, 0, 0, '', 'n')"))
+    db.execute(text("UPDATE transactions SET currency_id = 4242 WHERE id = (SELECT MIN(id) FROM transactions)"))
+    db.commit()
+
+    report = integrity_service.verify(db, full=True)
+    kinds = {i.kind for i in report.issues}
+    assert {"full_name", "orphan_split", "dangling_commodity"} <= kinds
+    assert report.issue_count == len(report.issues)
+
+    monkeypatch.setattr(settings, "db_path", str(path))
+    assert cli.main(["check"]) == 1
+
+
+def test_check_never_migrates_the_book(book, monkeypatch):
+    db, path = book
+    monkeypatch.setattr(settings, "db_path", str(path))
+    assert cli.main(["check"]) == 0
+
+    db.execute(text("DROP TABLE ledger_checksums"))
+    db.commit()
+    assert cli.main(["check"]) == 1
+    assert db.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE name = 'ledger_checksums'")).scalar() == 0
+
+    db.execute(text("PRAGMA user_version = 3"))
+    db.commit()
+    assert cli.main(["check"]) == 1
+    assert db.execute(text("PRAGMA user_version")).scalar() == 3
+
+
+def test_admin_endpoint(client):
+    resp = client.post("/api/v1/admin/integrity", params={"full": True})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["months_verified"] == body["months_total"]
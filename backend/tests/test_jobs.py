@@ -0,0 +1,125 @@
+"""Tests for background report jobs."""
+import json
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.database import _make_engine, init_book
+from app.services import job_service
+from app.services.job_service import JobManager
+
+
+@pytest.fixture(scope="module")
+def manager():
+    m = JobManager(max_workers=1, max_store_bytes=1 << 20)
+    yield m
+    m.shutdown()
+
+
+@pytest.fixture(scope="module")
+def book_url(tmp_path_factory):
+    path = tmp_path_factory.mktemp("jobs") / "jobs.db"
+    eng = _make_engine(f"sqlite:///{path}")
+    init_book(eng)
+    eng.dispose()
+    return f"sqlite:///{path}"
+
+
+def _wait(manager, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while manager.get(job_id).status in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    return manager.get(job_id)
+
+
+def test_report_job_runs_and_dedups(manager, book_url):
+    params = {"from_date": "2024-01-01", "to_date": "2024-12-31", "group_by": "day"}
+    job = manager.submit(book_url, "pnl", params)
+    again = manager.submit(book_url, "pnl", dict(params))
+    assert again.id == job.id
+
+    assert _wait(manager, job.id).status == "done"
+    report = json.loads(manager.result(job.id))
+    assert report["from_date"] == "2024-01-01"
+    assert manager.get(job.id).read().finished_at is not None
+
+
+def test_failed_job_reports_error(manager, book_url):
+    job = manager.submit(book_url, "budget-vs-actual", {
+        "budget_id": 424242, "from_date": "2024-01-01", "to_date": "2024-12-31",
+    })
+    assert _wait(manager, job.id).status == "failed"
+    assert "Budget not found" in job.error
+    with pytest.raises(HTTPException):
+        manager.result(job.id)
+
+
+def test_crashed_worker_pool_is_replaced(book_url):
+    m = JobManager(max_workers=1, max_store_bytes=1 << 20)
+    try:
+        crash = m._pool().submit(os._exit, 1)
+        # Lands in the dying pool and fails, or finds it broken and starts a new one
+        first = m.submit(book_url, "net-worth", {})
+        with pytest.raises(BrokenProcessPool):
+            crash.result(timeout=60)
+        assert _wait(m, first.id).status in ("done", "failed")
+
+        job = m.submit(book_url, "net-worth", {"reporting_currency": "USD"})
+        assert job.read().progress in (0.0, 0.5)
+        assert _wait(m, job.id).status == "done"
+        assert job.read().progress == 1.0
+    finally:
+        m.shutdown()
+
+
+def test_worker_engines_come_from_the_book_engine_factory(book_url, monkeypatch):
+    # Runs the worker entry point in-process; _make_engine picks each dialect's connect arguments
+    made = []
+
+    def make(url):
+        made.append(url)
+        return _make_engine(url)
+
+    monkeypatch.setattr(job_service, "_make_engine", make)
+    monkeypatch.setattr(job_service, "_worker_engines", {})
+    report = json.loads(job_service._run_report(book_url, "net-worth", {}))
+    assert made == [book_url] and "reporting_currency" in report
+    job_service._run_report(book_url, "net-worth", {})
+    assert made == [book_url]  # cached per book URL
+    job_service._worker_engines[book_url].kw["bind"].dispose()
+
+
+def test_invalid_submission_rejected(client: TestClient):
+    resp = client.post("/api/v1/jobs/reports", json={"kind": "nope", "params": {}})
+    assert resp.status_code == 422
+    resp = client.post("/api/v1/jobs/reports", json={"kind": "pnl", "params": {"bogus": 1}})
+    assert resp.status_code == 422
+    assert client.get("/api/v1/jobs/does-not-exist").status_code == 404
+
+
+def test_finished_jobs_are_forgotten_by_count_and_age(book_url):
+    m = JobManager(max_workers=1, max_store_bytes=1 << 20, max_jobs=2)
+    try:
+        done = [
+            _wait(m, m.submit(book_url, "pnl", {"from_date": f"202{i}-01-01", "to_date": f"202{i}-12-31"}).id)
+            for i in range(3)
+        ]
+        with pytest.raises(HTTPException) as exc:
+            m.get(done[0].id)
+        assert exc.value.status_code == 404
+        assert m.result(done[2].id)
+
+        m.ttl = timedelta(0)
+        m.submit(book_url, "net-worth", {})
+        for job in done[1:]:
+            with pytest.raises(HTTPException):
+                m.get(job.id)
+        assert not set(m._results) & {job.id for job in done}
+    finally:
+        m.shutdown()
@@ -0,0 +1,102 @@
+"""Tests for lot tracking, cost basis methods and gains."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models.lot import LotAccount
+
+API = "/api/v1"
+
+
+@pytest.fixture(scope="module")
+def brokerage(client: TestClient, make):
+    resp = client.post(f"{API}/commodities", json={
+        "mnemonic": "LOTX", "name": "Lot Test Inc", "fraction": 1000, "namespace": "NASDAQ",
+    })
+    assert resp.status_code == 201
+    stock = resp.json()
+    assert client.post(f"{API}/commodities", json={"mnemonic": "LOTX", "name": "dup"}).status_code == 409
+
+    shares = make.account("LotX Shares", "ASSET", commodity_id=stock["id"])
+    cash = make.account("LotX Cash", "ASSET")
+
+    # Buy 10 @ 10, buy 10 @ 20, sell 15 @ 30
+    make.transaction("2024-01-10", "trade", (shares["id"], 10000, 10000), (cash["id"], -10000))
+    second = make.transaction("2024-02-10", "trade", (shares["id"], 20000, 10000), (cash["id"], -20000))
+    make.transaction("2024-03-10", "trade", (shares["id"], -45000, -15000), (cash["id"], 45000))
+    client.post(f"{API}/prices", json={
+        "date": "2024-03-31", "commodity_id": stock["id"], "currency_id": make.usd["id"], "numerator": 40,
+    })
+    return {"stock": stock, "shares": shares, "second": second}
+
+
+def _realized(client, account_id):
+    rows = client.get(f"{API}/lots/realized", params={
+        "from_date": "2024-01-01", "to_date": "2024-12-31", "account_id": account_id,
+    }).json()["rows"]
+    return sum(r["gain_minor"] for r in rows)
+
+
+def test_fifo_lots_and_gains(client: TestClient, brokerage):
+    shares = brokerage["shares"]
+    lots = client.get(f"{API}/lots", params={"account_id": shares["id"]}).json()
+    assert [(lot["remaining_minor"], lot["remaining_cost_minor"]) for lot in lots] == [(5000, 10000)]
+    # 45000 proceeds - (10000 + 10000 cost)
+    assert _realized(client, shares["id"]) == 25000
+
+    unrealized = client.get(f"{API}/lots/unrealized", params={
+        "as_of": "2024-03-31", "account_id": shares["id"],
+    }).json()
+    row = unrealized["rows"][0]
+    assert row["quantity_minor"] == 5000 and row["market_value_minor"] == 20000
+    assert row["gain_minor"] == 10000
+
+    # Holdings as they stood before the sale
+    earlier = client.get(f"{API}/lots/unrealized", params={
+        "as_of": "2024-02-15", "account_id": shares["id"],
+    }).json()["rows"]
+    assert [(r["quantity_minor"], r["cost_minor"]) for r in earlier] == [(20000, 30000)]
+
+
+def test_methods_and_incremental_recompute(client: TestClient, brokerage):
+    shares = brokerage["shares"]
+    url = f"{API}/lots/accounts/{shares['id']}"
+    assert client.put(url, json={"method": "lifo"}).json()["dirty_from"] is None
+    assert _realized(client, shares["id"]) == 45000 - 20000 - 5000
+
+    client.put(url, json={"method": "average"})
+    assert _realized(client, shares["id"]) == 45000 - 22500
+
+    # Editing the second buy only replays from its date onward
+    second = brokerage["second"]
+    splits = [
+        {"id": s["id"], "account_id": s["account_id"],
+         "value_minor": 30000 if s["account_id"] == shares["id"] else -30000,
+         "quantity_minor": s["quantity_minor"] if s["account_id"] == shares["id"] else -30000}
+        for s in second["splits"]
+    ]
+    assert client.patch(f"{API}/transactions/{second['id']}", json={"splits": splits}).status_code == 200
+    # The commit replayed the account from the edited buy onward
+    assert client.get(url).json()["dirty_from"] is None
+    lots = client.get(f"{API}/lots", params={"account_id": shares["id"], "include_closed": True}).json()
+    assert [lot["cost_minor"] for lot in lots] == [10000, 30000]
+    incremental = _realized(client, shares["id"])
+    assert incremental == 45000 - 30000  # average cost 2.0/share over 15 shares
+
+    client.put(url, json={"method": "fifo"})
+    client.put(url, json={"method": "average"})  # full replay
+    assert _realized(client, shares["id"]) == incremental
+
+    assert client.get(f"{API}/lots/accounts/1").status_code == 422  # currency account
+
+
+def test_reads_never_write_and_recompute_is_explicit(client: TestClient, db_session, make, brokerage):
+    idle = make.account("LotX Idle", "ASSET", commodity_id=brokerage["stock"]["id"])
+    url = f"{API}/lots/accounts/{idle['id']}"
+    assert client.get(url).json()["dirty_from"] == "0001-01-01"
+    assert db_session.get(LotAccount, idle["id"]) is None
+
+    resp = client.post(f"{API}/lots/recompute", params={"account_id": idle["id"]})
+    assert resp.status_code == 200
+    assert [(s["account_id"], s["dirty_from"]) for s in resp.json()] == [(idle["id"], None)]
+    assert client.get(url).json()["dirty_from"] is None
+    assert client.post(f"{API}/lots/recompute", params={"account_id": 1}).status_code == 422
@@ -0,0 +1,85 @@
+"""Tests for bulk reconcile state changes, balances and statement matching."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import reconcile_service
+
+
+def _setup_card(client):
+    commodities = client.get("/api/v1/commodities").json()
+    usd = next(c for c in commodities if c["mnemonic"] == "USD")
+    accounts = client.get("/api/v1/accounts").json()
+    expense = next(a for a in accounts if a["account_type"] == "EXPENSE" and not a["placeholder"])
+
+    card = client.post("/api/v1/accounts", json={
+        "name": "ReconcileTestCard",
+        "account_type": "LIABILITY",
+        "commodity_id": usd["id"],
+    }).json()
+
+    split_ids = []
+    for day, amount in [("2024-02-01", 1200), ("2024-02-03", 4550), ("2024-02-10", 1200)]:
+        txn = client.post("/api/v1/transactions", json={
+            "date": day,
+            "description": f"Card purchase {day}",
+            "currency_id": usd["id"],
+            "splits": [
+                {"account_id": expense["id"], "value_minor": amount, "quantity_minor": amount},
+                {"account_id": card["id"], "value_minor": -amount, "quantity_minor": -amount},
+            ],
+        }).json()
+        split_ids.append(next(s["id"] for s in txn["splits"] if s["account_id"] == card["id"]))
+    return card, split_ids
+
+
+def test_bulk_state_and_balances(client: TestClient):
+    card, split_ids = _setup_card(client)
+
+    resp = client.post("/api/v1/reconcile/state", json={"split_ids": split_ids[:2], "state": "c"})
+    assert resp.status_code == 200
+    assert resp.json()["updated"] == 2
+
+    client.post("/api/v1/reconcile/state", json={"split_ids": split_ids[:1], "state": "y"})
+
+    balances = client.get(f"/api/v1/reconcile/{card['id']}/balances").json()
+    assert balances["total_minor"] == -6950
+    assert balances["cleared_minor"] == -5750
+    assert balances["reconciled_minor"] == -1200
+
+
+def test_large_state_change_is_chunked(client: TestClient, monkeypatch):
+    card, split_ids = _setup_card(client)
+    monkeypatch.setattr(reconcile_service, "_CHUNK", 2)
+    # Ids beyond any one statement's list, plus a repeat and one that does not exist
+    resp = client.post("/api/v1/reconcile/state", json={
+        "split_ids": split_ids + split_ids[:1] + [999999], "state": "c",
+    })
+    assert resp.status_code == 200 and resp.json()["updated"] == 3
+    assert client.get(f"/api/v1/reconcile/{card['id']}/balances").json()["cleared_minor"] == -6950
+
+
+def test_invalid_state_rejected(client: TestClient):
+    resp = client.post("/api/v1/reconcile/state", json={"split_ids": [1], "state": "x"})
+    assert resp.status_code == 422
+
+
+def test_match_statement(client: TestClient):
+    card, split_ids = _setup_card(client)
+
+    resp = client.post(f"/api/v1/reconcile/{card['id']}/match", json={
+        "lines": [
+            {"date": "2024-02-11", "amount_minor": -1200},
+            {"date": "2024-02-02", "amount_minor": -1200},
+            {"date": "2024-02-04", "amount_minor": -9999},
+        ],
+        "window_days": 2,
+        "apply": True,
+    })
+    assert resp.status_code == 200
+    data = resp.json()
+    matched = {m["line_index"]: m["split_id"] for m in data["matches"]}
+    assert matched == {0: split_ids[2], 1: split_ids[0]}
+    assert data["unmatched_lines"] == [2]
+
+    balances = client.get(f"/api/v1/reconcile/{card['id']}/balances").json()
+    assert balances["cleared_minor"] == -2400
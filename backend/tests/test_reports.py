@@ -79,3 +79,112 @@ def test_net_worth(client: TestClient):
     data = resp.json()
     assert "net_worth_minor" in data
     assert data["reporting_currency"] == "USD"
+
+
+def test_cash_flow(client: TestClient):
+    commodities = client.get("/api/v1/commodities").json()
+    usd = next(c for c in commodities if c["mnemonic"] == "USD")
+    accounts = client.get("/api/v1/accounts").json()
+    income = next(a for a in accounts if a["account_type"] == "INCOME" and not a["placeholder"])
+    expense = next(a for a in accounts if a["account_type"] == "EXPENSE" and not a["placeholder"])
+
+    bank = client.post("/api/v1/accounts", json={
+        "name": "CashFlowBank", "account_type": "ASSET", "commodity_id": usd["id"], "placeholder": True,
+    }).json()
+    checking, savings = [
+        client.post("/api/v1/accounts", json={
+            "name": name, "account_type": "ASSET", "commodity_id": usd["id"], "parent_id": bank["id"],
+        }).json()
+        for name in ("Checking", "Savings")
+    ]
+
+    def txn(d, *splits):
+        client.post("/api/v1/transactions", json={
+            "date": d, "description": "cf", "currency_id": usd["id"],
+            "splits": [{"account_id": a, "value_minor": v, "quantity_minor": v} for a, v in splits],
+        })
+
+    # Salary split between checking and savings: one inflow, not two
+    txn("2030-01-05", (checking["id"], 70000), (savings["id"], 30000), (income["id"], -100000))
+    txn("2030-01-10", (expense["id"], 2500), (checking["id"], -2500))
+    txn("2030-02-01", (savings["id"], 5000), (checking["id"], -5000))  # internal transfer
+
+    resp = client.get("/api/v1/reports/cash-flow", params={
+        "account_id": bank["id"], "subtree": True, "from_date": "2030-01-01", "to_date": "2030-12-31",
+    })
+    assert resp.status_code == 200
+    data = resp.json()
+    assert sorted(data["account_ids"]) == sorted([bank["id"], checking["id"], savings["id"]])
+    by_account = {r["account_id"]: r for r in data["rows"]}
+    assert set(by_account) == {income["id"], expense["id"]}
+    assert by_account[income["id"]]["inflow_minor"] == 100000
+    assert by_account[expense["id"]]["outflow_minor"] == 2500
+    assert {(link["source"], link["target"]) for link in data["links"]} == {
+        (f"in:{income['id']}", "selected"), ("selected", f"out:{expense['id']}"),
+    }
+
+    # Checking alone sees the transfer to savings as an outflow
+    only = client.get("/api/v1/reports/cash-flow", params={
+        "account_id": checking["id"], "from_date": "2030-01-01", "to_date": "2030-12-31",
+    }).json()
+    flows = {(r["account_id"], r["period"]): r for r in only["rows"]}
+    assert flows[(savings["id"], "2030-02-01")]["outflow_minor"] == 5000
+    # ...and only its 70% of the salary, with none of it passing on to savings
+    assert flows[(income["id"], "2030-01-01")]["inflow_minor"] == 70000
+    assert (savings["id"], "2030-01-01") not in flows
+
+    # Savings alone gets the other 30%, plus the transfer in
+    only = client.get("/api/v1/reports/cash-flow", params={
+        "account_id": savings["id"], "from_date": "2030-01-01", "to_date": "2030-12-31",
+    }).json()
+    flows = {(r["account_id"], r["period"]): r for r in only["rows"]}
+    assert flows[(income["id"], "2030-01-01")]["inflow_minor"] == 30000
+    assert flows[(checking["id"], "2030-02-01")]["inflow_minor"] == 5000
+
+
+def test_trial_balance_and_as_of_balances(client: TestClient):
+    usd = next(c for c in client.get("/api/v1/commodities").json() if c["mnemonic"] == "USD")
+    cash, card, food = [
+        client.post("/api/v1/accounts", json={"name": name, "account_type": kind, "commodity_id": usd["id"]}).json()
+        for name, kind in (("TBCash", "ASSET"), ("TBCard", "LIABILITY"), ("TBFood", "EXPENSE"))
+    ]
+    for d, account, amount in (("2031-01-10", cash, 4000), ("2031-02-10", card, 6000)):
+        client.post("/api/v1/transactions", json={
+            "date": d, "description": "tb", "currency_id": usd["id"], "splits": [
+                {"account_id": food["id"], "value_minor": amount, "quantity_minor": amount},
+                {"account_id": account["id"], "value_minor": -amount, "quantity_minor": -amount},
+            ],
+        })
+
+    ids = [cash["id"], card["id"], food["id"]]
+    resp = client.get("/api/v1/accounts/balances", params={"ids": ids, "as_of": "2031-01-31"})
+    assert resp.status_code == 200
+    data = resp.json()
+    rows = {r["account_id"]: r for r in data["rows"]}
+    assert rows[food["id"]]["debit_minor"] == 4000 and rows[cash["id"]]["credit_minor"] == 4000
+    assert rows[card["id"]]["balance_minor"] == 0
+    assert data["balanced"] and data["total_debit_minor"] == 4000
+
+    # as_of includes the whole day
+    later = client.get("/api/v1/accounts/balances", params={"ids": ids, "as_of": "2031-02-10"}).json()
+    assert {r["account_id"]: r["balance_minor"] for r in later["rows"]}[food["id"]] == 10000
+    assert client.get("/api/v1/accounts/balances", params={"ids": [999999]}).status_code == 404
+
+    tb = client.get("/api/v1/reports/trial-balance", params={"as_of": "2031-12-31"}).json()
+    assert all(r["balance_minor"] != 0 for r in tb["rows"])
+    usd_total = next(t for t in tb["commodity_totals"] if t["commodity_id"] == usd["id"])
+    assert usd_total["debit_minor"] >= 10000
+    assert tb["as_of"] == "2031-12-31"
+    assert client.get("/api/v1/reports/trial-balance", params={"as_of": "garbage"}).status_code == 422
+    assert client.get("/api/v1/accounts/balances", params={"ids": ids, "as_of": "2031-02-30"}).status_code == 422
+
+
+def test_malformed_report_dates_are_rejected(client: TestClient):
+    for path, extra in [("pnl", {}), ("balance-history", {"account_id": 1}), ("cash-flow", {"account_id": 1}),
+                        ("budget-vs-actual", {"budget_id": 1})]:
+        for bad in ({"from_date": "2024-02-30", "to_date": "2024-03-31"},
+                    {"from_date": "2024-01-01", "to_date": "soon"}):
+            resp = client.get(f"/api/v1/reports/{path}", params={**extra, **bad})
+            assert resp.status_code == 422, (path, bad)
+    resp = client.get("/api/v1/lots/realized", params={"from_date": "2024-13-01", "to_date": "2024-12-31"})
+    assert resp.status_code == 422
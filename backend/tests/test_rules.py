@@ -0,0 +1,148 @@
+"""Tests for auto-categorization rules."""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.rule_service import PatternMatcher
+
+API = "/api/v1"
+
+
+def test_pattern_matcher_finds_overlapping_patterns():
+    matcher = PatternMatcher(["he", "she", "his", "hers", "shell"])
+    assert matcher.search("USHERS") == {0, 1, 3}
+    assert matcher.search("Shell Oil") == {0, 1, 4}
+    assert matcher.search("nothing") == set()
+
+
+def _rule(client, **body):
+    resp = client.post(f"{API}/rules", json=body)
+    assert resp.status_code == 201
+    return resp.json()
+
+
+def _entry(books, d, amount, description, source="bank"):
+    """An uncategorized entry against the source account, as a bank import delivers it."""
+    accts = books["accts"]
+    return books["make"].txn(d, description, (accts[source]["id"], amount), (accts["unc"]["id"], -amount))
+
+
+@pytest.fixture(scope="module")
+def books(client: TestClient, make):
+    accts = {
+        key: make.account(name, kind)
+        for key, name, kind in (
+            ("bank", "Rules Bank", "ASSET"),
+            ("card", "Rules Card", "LIABILITY"),
+            ("unc", "Rules Uncategorized", "EXPENSE"),
+            ("coffee", "Rules Coffee", "EXPENSE"),
+            ("fuel", "Rules Fuel", "EXPENSE"),
+            ("big", "Rules Big Purchases", "EXPENSE"),
+            ("salary", "Rules Salary", "INCOME"),
+        )
+    }
+    rules = {
+        "coffee": _rule(client, name="Coffee", pattern="starbucks", target_account_id=accts["coffee"]["id"]),
+        "fuel": _rule(client, name="Fuel", pattern="SHELL", target_account_id=accts["fuel"]["id"],
+                      source_account_id=accts["card"]["id"]),
+        "big": _rule(client, name="Big", priority=10, max_amount_minor=-50000,
+                     target_account_id=accts["big"]["id"]),
+        "salary": _rule(client, name="Salary", pattern="payroll", min_amount_minor=1,
+                        target_account_id=accts["salary"]["id"]),
+    }
+    return {"make": make, "accts": accts, "rules": rules}
+
+
+def test_apply_classifies_incoming_in_priority_order(client: TestClient, books):
+    accts, rules = books["accts"], books["rules"]
+    batch = [
+        _entry(books, "2025-04-01", -450, "STARBUCKS #11"),
+        _entry(books, "2025-04-02", -4000, "Shell Oil 1234", source="card"),
+        _entry(books, "2025-04-02", -4000, "Shell Oil 1234"),                # fuel rule is card-only
+        _entry(books, "2025-04-03", -90000, "Starbucks catering"),           # big wins on priority
+        _entry(books, "2025-04-04", 500000, "ACME PAYROLL"),
+        _entry(books, "2025-04-05", -500000, "payroll correction"),          # salary needs inflow
+    ]
+    resp = client.post(f"{API}/rules/apply", json={
+        "transactions": batch, "uncategorized_account_id": accts["unc"]["id"],
+    })
+    assert resp.status_code == 200
+    body = resp.json()
+    by_index = {m["index"]: m["rule_id"] for m in body["matches"]}
+    assert by_index == {
+        0: rules["coffee"]["id"], 1: rules["fuel"]["id"], 3: rules["big"]["id"],
+        4: rules["salary"]["id"], 5: rules["big"]["id"],
+    }
+    assert body["transactions"][0]["splits"][1]["account_id"] == accts["coffee"]["id"]
+    assert body["transactions"][2]["splits"][1]["account_id"] == accts["unc"]["id"]
+
+
+def test_import_with_rules_and_bulk_reapply(client: TestClient, books):
+    accts, rules = books["accts"], books["rules"]
+    resp = client.post(f"{API}/transactions/import", json={
+        "transactions": [
+            _entry(books, "2025-05-01", -375, "Starbucks 55"), _entry(books, "2025-05-02", -1200, "Parking"),
+        ],
+        "uncategorized_account_id": accts["unc"]["id"],
+    })
+    assert resp.status_code == 201 and resp.json()["categorized"] == 1
+
+    # Saved without rules, then re-categorized in bulk
+    for i in range(3):
+        books["make"].post(_entry(books, f"2025-06-0{i + 1}", -3000, f"SHELL {i}", source="card"))
+    dry = client.post(f"{API}/rules/reapply", json={"uncategorized_account_id": accts["unc"]["id"]}).json()
+    fuel_changes = [c for c in dry["changes"] if c["rule_id"] == rules["fuel"]["id"]]
+    assert dry["dry_run"] and dry["updated"] == 0 and len(fuel_changes) == 3
+    assert all(c["to_account_id"] == accts["fuel"]["id"] for c in fuel_changes)
+
+    applied = client.post(f"{API}/rules/reapply", json={
+        "uncategorized_account_id": accts["unc"]["id"], "from_date": "2025-06-01", "dry_run": False,
+    }).json()
+    assert applied["updated"] == 3
+    register = client.get(f"{API}/accounts/{accts['fuel']['id']}/register").json()
+    assert len(register) == 3
+
+    again = client.post(f"{API}/rules/reapply", json={
+        "uncategorized_account_id": accts["unc"]["id"], "from_date": "2025-06-01",
+    }).json()
+    assert again["matched"] == 0
+
+
+def test_rule_crud(client: TestClient, books):
+    accts = books["accts"]
+    rule = client.post(f"{API}/rules", json={
+        "name": "Temp", "pattern": "x", "target_account_id": accts["coffee"]["id"],
+    }).json()
+    updated = client.put(f"{API}/rules/{rule['id']}", json={
+        "name": "Temp", "pattern": "y", "target_account_id": accts["coffee"]["id"], "enabled": False,
+    }).json()
+    assert updated["pattern"] == "y" and updated["enabled"] is False
+    assert client.delete(f"{API}/rules/{rule['id']}").status_code == 204
+    assert client.get(f"{API}/rules/{rule['id']}").status_code == 404
+    assert client.post(f"{API}/rules", json={"name": "Bad", "target_account_id": 999999}).status_code == 422
+
+
+def test_rules_keep_their_accounts_and_commodity(client: TestClient, books):
+    accts = books["accts"]
+    eur = next((c for c in client.get(f"{API}/commodities").json() if c["mnemonic"] == "EUR"), None) or \
+        client.post(f"{API}/commodities", json={"mnemonic": "EUR", "name": "Euro", "fraction": 100}).json()
+    euro_fees = client.post(f"{API}/accounts", json={
+        "name": "Rules Euro Fees", "account_type": "EXPENSE", "commodity_id": eur["id"],
+    }).json()
+    rule = client.post(f"{API}/rules", json={
+        "name": "Euro fee", "pattern": "eurofee", "target_account_id": euro_fees["id"],
+    }).json()
+
+    # The uncategorized split would keep its USD quantity in a EUR account
+    resp = client.post(f"{API}/rules/apply", json={
+        "transactions": [_entry(books, "2025-07-01", -100, "EUROFEE 1")],
+        "uncategorized_account_id": accts["unc"]["id"],
+    }).json()
+    assert resp["matches"] == []
+
+    resp = client.delete(f"{API}/accounts/{euro_fees['id']}")
+    assert resp.status_code == 400 and "rule" in resp.json()["detail"]
+    client.delete(f"{API}/rules/{rule['id']}")
+    assert client.delete(f"{API}/accounts/{euro_fees['id']}").status_code == 204
+    assert client.post(f"{API}/rules/apply", json={
+        "transactions": [], "uncategorized_account_id": 999999,
+    }).status_code == 422
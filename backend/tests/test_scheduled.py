@@ -0,0 +1,84 @@
+"""Tests for scheduled transaction templates, preview and batched catch-up."""
+import pytest
+from fastapi.testclient import TestClient
+
+
+def _accounts(client):
+    commodities = client.get("/api/v1/commodities").json()
+    usd = next(c for c in commodities if c["mnemonic"] == "USD")
+    accounts = client.get("/api/v1/accounts").json()
+    expense = next(a for a in accounts if a["account_type"] == "EXPENSE" and not a["placeholder"])
+    checking = client.post("/api/v1/accounts", json={
+        "name": "ScheduledTestChecking",
+        "account_type": "ASSET",
+        "commodity_id": usd["id"],
+    }).json()
+    return usd, expense, checking
+
+
+def _template(client, usd, expense, checking, **kwargs):
+    body = {
+        "name": "Rent",
+        "description": "Monthly rent",
+        "currency_id": usd["id"],
+        "frequency": "MONTHLY",
+        "start_date": "2023-01-31",
+        "splits": [
+            {"account_id": expense["id"], "value_minor": 150000, "quantity_minor": 150000},
+            {"account_id": checking["id"], "value_minor": -150000, "quantity_minor": -150000},
+        ],
+    }
+    body.update(kwargs)
+    return client.post("/api/v1/scheduled", json=body)
+
+
+def test_imbalanced_template_rejected(client: TestClient):
+    usd, expense, checking = _accounts(client)
+    resp = _template(client, usd, expense, checking, splits=[
+        {"account_id": expense["id"], "value_minor": 100, "quantity_minor": 100},
+        {"account_id": checking["id"], "value_minor": -99, "quantity_minor": -99},
+    ])
+    assert resp.status_code == 422
+
+
+def test_preview_clamps_month_end(client: TestClient):
+    usd, expense, checking = _accounts(client)
+    tmpl = _template(client, usd, expense, checking).json()
+
+    resp = client.get("/api/v1/scheduled/preview", params={"until": "2023-04-30", "template_id": tmpl["id"]})
+    assert resp.status_code == 200
+    assert [o["date"] for o in resp.json()] == ["2023-01-31", "2023-02-28", "2023-03-31", "2023-04-30"]
+
+    # Preview writes nothing
+    register = client.get(f"/api/v1/accounts/{checking['id']}/register").json()
+    assert register == []
+
+
+def test_run_is_idempotent(client: TestClient):
+    usd, expense, checking = _accounts(client)
+    tmpl = _template(client, usd, expense, checking, frequency="DAILY", start_date="2020-01-01").json()
+
+    resp = client.post("/api/v1/scheduled/run", params={"until": "2022-12-31", "template_id": tmpl["id"]})
+    assert resp.status_code == 200
+    assert resp.json()["created"] == 1096
+
+    again = client.post("/api/v1/scheduled/run", params={"until": "2022-12-31", "template_id": tmpl["id"]})
+    assert again.json()["created"] == 0
+
+    balance = client.get(f"/api/v1/accounts/{checking['id']}/balance").json()
+    assert balance["balance_minor"] == -150000 * 1096
+
+    more = client.post("/api/v1/scheduled/run", params={"until": "2023-01-02", "template_id": tmpl["id"]})
+    assert more.json()["created"] == 2
+
+
+def test_template_accounts_must_exist_and_stay(client: TestClient):
+    usd, expense, checking = _accounts(client)
+    resp = _template(client, usd, expense, {"id": 999999})
+    assert resp.status_code == 422 and "999999" in resp.json()["detail"]
+
+    tmpl = _template(client, usd, expense, checking, name="Guarded").json()
+    resp = client.delete(f"/api/v1/accounts/{checking['id']}")
+    assert resp.status_code == 400 and str(tmpl["id"]) in resp.json()["detail"]
+    client.delete(f"/api/v1/scheduled/{tmpl['id']}")
+    assert client.delete(f"/api/v1/accounts/{checking['id']}").status_code == 204
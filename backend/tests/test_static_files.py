@@ -0,0 +1,104 @@
+"""Tests for precompressed asset serving and the in-memory index.html."""
+import gzip
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.static_files import PrecompressedStaticFiles, IndexHtml, precompress, IMMUTABLE
+
+
+@pytest.fixture
+def static_client(tmp_path):
+    assets = tmp_path / "assets"
+    assets.mkdir()
+    (assets / "index-3f2a1b.js").write_text("console.log('mxbcash');\n" * 200)
+    (assets / "tiny-9c1d.css").write_text("body{}")
+    (tmp_path / "index.html").write_text("<html><body><div id=root></div></body></html>")
+    assert precompress(assets) >= 1
+    assert (assets / "index-3f2a1b.js.gz").exists()
+    assert not (assets / "tiny-9c1d.css.gz").exists()
+    assert precompress(assets) == 0  # variants are up to date
+
+    app = FastAPI()
+    app.mount("/assets", PrecompressedStaticFiles(directory=assets), name="assets")
+    index = IndexHtml(tmp_path / "index.html")
+
+    @app.get("/{full_path:path}")
+    async def spa(full_path: str, request: Request):
+        return index.response(request)
+
+    return TestClient(app)
+
+
+def test_gzip_variant_served(static_client):
+    resp = static_client.get("/assets/index-3f2a1b.js", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["cache-control"] == IMMUTABLE
+    assert resp.headers["content-type"].startswith("text/javascript")
+    assert resp.text.startswith("console.log")  # httpx decodes gzip
+
+
+def test_brotli_variant_preferred(static_client, tmp_path):
+    (tmp_path / "assets" / "index-3f2a1b.js.br").write_bytes(b"br")
+    # Streamed so the body is not decoded; only the chosen variant matters here
+    with static_client.stream("GET", "/assets/index-3f2a1b.js", headers={"Accept-Encoding": "gzip, br"}) as resp:
+        assert resp.headers["content-encoding"] == "br"
+        assert resp.headers["content-length"] == "2"
+    with static_client.stream("GET", "/assets/index-3f2a1b.js", headers={"Accept-Encoding": "gzip, br;q=0"}) as resp:
+        assert resp.headers["content-encoding"] == "gzip"
+
+
+def test_precompress_writes_brotli_when_installed(tmp_path):
+    brotli = pytest.importorskip("brotli")
+    (tmp_path / "app-1a2b.css").write_text("body{color:red}\n" * 200)
+    assert precompress(tmp_path) == 2
+    assert brotli.decompress((tmp_path / "app-1a2b.css.br").read_bytes()).startswith(b"body{")
+
+
+def test_identity_when_not_accepted(static_client):
+    resp = static_client.get("/assets/index-3f2a1b.js", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["cache-control"] == IMMUTABLE
+
+
+def test_index_etag(static_client):
+    first = static_client.get("/some/client/route")
+    assert first.status_code == 200
+    assert "<div id=root>" in first.text
+    etag = first.headers["etag"]
+    again = static_client.get("/other", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_large_api_responses_compressed(client: TestClient, make):
+    # Enough transactions of its own to pass the threshold, whatever ran before
+    asset = make.account("CompressedAsset", "ASSET")
+    income = make.account("CompressedIncome", "INCOME")
+    for day in range(1, 29):
+        make.transaction(f"2042-02-{day:02d}", "Compressible " * 50, (asset["id"], day), (income["id"], -day))
+    resp = client.get("/api/v1/transactions", headers={"Accept-Encoding": "gzip"}, params={
+        "from_date": "2042-02-01", "to_date": "2042-02-28", "limit": 500,
+    })
+    assert resp.status_code == 200
+    assert len(resp.content) >= settings.gzip_min_bytes
+    assert resp.headers.get("content-encoding") == "gzip"
+    small = client.get("/api/v1/commodities", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_variants_served_from_cache_dir(tmp_path):
+    assets, cache = tmp_path / "assets", tmp_path / "cache"
+    (assets / "chunks").mkdir(parents=True)
+    (assets / "chunks" / "vendor-77aa.js").write_text("export const x = 1;\n" * 200)
+    assert precompress(assets, cache) >= 1
+    assert (cache / "chunks" / "vendor-77aa.js.gz").exists()
+    assert not list(assets.rglob("*.gz"))  # the asset directory is left untouched
+
+    app = FastAPI()
+    app.mount("/assets", PrecompressedStaticFiles(directory=assets, variants_dir=cache), name="assets")
+    resp = TestClient(app).get("/assets/chunks/vendor-77aa.js", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.text.startswith("export const x")
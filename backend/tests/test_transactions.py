@@ -169,3 +169,140 @@ def test_delete_transaction(client: TestClient):
 
     get_resp = client.get(f"/api/v1/transactions/{txn['id']}")
     assert get_resp.status_code == 404
+
+
+def test_update_splits_diff(client: TestClient):
+    """Splits sent with ids are updated in place; omitted ones are deleted."""
+    accounts = [a for a in client.get("/api/v1/accounts").json() if not a["placeholder"]]
+    acct1, acct2, acct3 = accounts[0], accounts[1], accounts[2]
+    usd_id = _get_usd_id(client)
+
+    txn = client.post("/api/v1/transactions", json={
+        "date": "2024-07-01",
+        "description": "Diff",
+        "currency_id": usd_id,
+        "splits": [
+            {"account_id": acct1["id"], "value_minor": 1000, "quantity_minor": 1000, "memo": "a", "reconciled": "c"},
+            {"account_id": acct2["id"], "value_minor": -1000, "quantity_minor": -1000},
+        ],
+    }).json()
+    s1, s2 = txn["splits"]
+
+    # Memo-only edit keeps ids and the reconciled flag, and touches no balances
+    resp = client.patch(f"/api/v1/transactions/{txn['id']}", json={"splits": [
+        {"id": s1["id"], "account_id": acct1["id"], "value_minor": 1000, "quantity_minor": 1000, "memo": "b"},
+        {"id": s2["id"], "account_id": acct2["id"], "value_minor": -1000, "quantity_minor": -1000},
+    ]})
+    assert resp.status_code == 200
+    data = resp.json()
+    by_id = {s["id"]: s for s in data["splits"]}
+    assert set(by_id) == {s1["id"], s2["id"]}
+    assert by_id[s1["id"]]["memo"] == "b"
+    assert by_id[s1["id"]]["reconciled"] == "c"
+    assert data["affected_account_ids"] == []
+
+    # Replace the second split with a new one in another account
+    resp = client.patch(f"/api/v1/transactions/{txn['id']}", json={"splits": [
+        {"id": s1["id"], "account_id": acct1["id"], "value_minor": 1000, "quantity_minor": 1000},
+        {"account_id": acct3["id"], "value_minor": -1000, "quantity_minor": -1000},
+    ]})
+    data = resp.json()
+    assert {s["account_id"] for s in data["splits"]} == {acct1["id"], acct3["id"]}
+    assert s2["id"] not in {s["id"] for s in data["splits"]}
+    assert sorted(data["affected_account_ids"]) == sorted([acct2["id"], acct3["id"]])
+    assert data["affected_dates"] == ["2024-07-01"]
+
+
+def test_update_splits_foreign_id_rejected(client: TestClient):
+    acct1, acct2 = _get_two_accounts(client)
+    usd_id = _get_usd_id(client)
+    txn = client.post("/api/v1/transactions", json={
+        "date": "2024-07-02",
+        "currency_id": usd_id,
+        "splits": [
+            {"account_id": acct1["id"], "value_minor": 10, "quantity_minor": 10},
+            {"account_id": acct2["id"], "value_minor": -10, "quantity_minor": -10},
+        ],
+    }).json()
+    resp = client.patch(f"/api/v1/transactions/{txn['id']}", json={"splits": [
+        {"id": 999999, "account_id": acct1["id"], "value_minor": 10, "quantity_minor": 10},
+        {"account_id": acct2["id"], "value_minor": -10, "quantity_minor": -10},
+    ]})
+    assert resp.status_code == 422
+
+
+def test_list_sparse_fields(client: TestClient):
+    usd_id = _get_usd_id(client)
+    acct = client.post("/api/v1/accounts", json={
+        "name": "SparseChecking", "account_type": "ASSET", "commodity_id": usd_id,
+    }).json()
+    other = _get_two_accounts(client)[0]
+    client.post("/api/v1/transactions", json={
+        "date": "2033-01-01", "description": "two splits here", "notes": "long notes", "currency_id": usd_id,
+        "splits": [
+            {"account_id": acct["id"], "value_minor": 700, "quantity_minor": 700},
+            {"account_id": acct["id"], "value_minor": 300, "quantity_minor": 300},
+            {"account_id": other["id"], "value_minor": -1000, "quantity_minor": -1000},
+        ],
+    })
+
+    full = client.get("/api/v1/transactions", params={"account_id": acct["id"]}).json()
+    assert len(full) == 1 and len(full[0]["splits"]) == 3
+
+    sparse = client.get("/api/v1/transactions", params={
+        "account_id": acct["id"], "fields": "id,date,description,amount_minor",
+    }).json()
+    assert sparse == [{
+        "id": full[0]["id"], "date": "2033-01-01", "description": "two splits here", "amount_minor": 1000,
+    }]
+
+    with_splits = client.get("/api/v1/transactions", params={
+        "account_id": acct["id"], "fields": "id", "include": "splits",
+    }).json()
+    assert [s["quantity_minor"] for s in with_splits[0]["splits"]] == [700, 300, -1000]
+
+    assert client.get("/api/v1/transactions", params={"fields": "amount_minor"}).status_code == 422
+    assert client.get("/api/v1/transactions", params={"fields": "secret"}).status_code == 422
+    assert client.get("/api/v1/transactions", params={"fields": "id", "include": "x"}).status_code == 422
+
+
+def test_integer_date_keys_follow_date(client: TestClient, db_session, tmp_path):
+    from sqlalchemy import text
+    from app.database import _make_engine, init_book
+    from app.models.transaction import Split, Transaction, day_number
+
+    acct1, acct2 = _get_two_accounts(client)
+    txn = client.post("/api/v1/transactions", json={
+        "date": "2024-02-29", "description": "Keys", "currency_id": _get_usd_id(client),
+        "splits": [
+            {"account_id": acct1["id"], "value_minor": 100, "quantity_minor": 100},
+            {"account_id": acct2["id"], "value_minor": -100, "quantity_minor": -100},
+        ],
+    }).json()
+
+    def keys():
+        db_session.expire_all()
+        t = db_session.get(Transaction, txn["id"])
+        splits = db_session.query(Split.date_num, Split.month_key).filter(Split.transaction_id == t.id)
+        return t.date_num, set(splits)
+
+    assert keys() == (day_number("2024-02-29"), {(day_number("2024-02-29"), 202402)})
+    assert client.patch(f"/api/v1/transactions/{txn['id']}", json={"date": "2025-01-03"}).status_code == 200
+    assert keys() == (day_number("2025-01-03"), {(day_number("2025-01-03"), 202501)})
+
+    # Books from before the columns existed are backfilled on open
+    eng = _make_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    init_book(eng)
+    with eng.begin() as conn:
+        usd = conn.execute(text("SELECT id FROM commodities WHERE mnemonic = 'USD'")).scalar()
+        account = conn.execute(text("SELECT MIN(id) FROM accounts")).scalar()
+        conn.execute(text("INSERT INTO transactions (id, date, description, currency_id) "
+                          "VALUES (1, '1999-12-31', 'old', :usd)"), {"usd": usd})
+        conn.execute(text("INSERT INTO splits (transaction_id, account_id, value_minor, quantity_minor, reconciled) "
+                          "VALUES (1, :a, 5, 5, 'n')"), {"a": account})
+        conn.execute(text("PRAGMA user_version = 11"))
+    init_book(eng)
+    with eng.connect() as conn:
+        assert conn.execute(text("SELECT date_num FROM transactions")).scalar() == day_number("1999-12-31")
+        assert conn.execute(text("SELECT date_num, month_key FROM splits")).one() == (day_number("1999-12-31"), 199912)
+    eng.dispose()